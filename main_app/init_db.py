@@ -29,6 +29,18 @@ from src.db.models import (
     ResourcePanelTemplate
 )
 from src.app_logic.authentication import get_password_hash
+from src.app_logic.capacity_index import (
+    rebuild_usage_breakpoints,
+    check_usage_breakpoints
+)
+from src.app_logic.quota_operations import (
+    rebuild_quota_usage,
+    check_quota_usage
+)
+from src.app_logic.group_hierarchy import (
+    rebuild_group_closure,
+    check_group_closure
+)
 import argparse
 from sqlalchemy import Engine
 from sqlmodel import Session
@@ -62,6 +74,7 @@ def insert_default_data(engine: Engine) -> None:
         )
         session.add(user)
         session.commit()
+        rebuild_group_closure(db_session=session)
         session.close()
 
 def insert_test_data(engine: Engine) -> None:
@@ -253,6 +266,10 @@ def insert_test_data(engine: Engine) -> None:
             ]
         ))
         session.commit()
+        # test tasks are inserted directly, so usage breakpoints and quota
+        # usage ledger are computed from them afterwards
+        rebuild_usage_breakpoints(db_session=session)
+        rebuild_quota_usage(db_session=session)
         session.close()
 
 def parse_args() -> argparse.Namespace:
@@ -277,6 +294,36 @@ def parse_args() -> argparse.Namespace:
         help="Initialize new database with test data",
         action="store_true"
     )
+    parser.add_argument(
+        "--rebuild-usage",
+        help="Rebuild resource usage breakpoints from existing tasks",
+        action="store_true"
+    )
+    parser.add_argument(
+        "--check-usage",
+        help="Check resource usage breakpoints against existing tasks",
+        action="store_true"
+    )
+    parser.add_argument(
+        "--rebuild-group-closure",
+        help="Rebuild group closure table from group hierarchy",
+        action="store_true"
+    )
+    parser.add_argument(
+        "--check-group-closure",
+        help="Check group closure table against group hierarchy",
+        action="store_true"
+    )
+    parser.add_argument(
+        "--rebuild-quota-usage",
+        help="Rebuild quota usage ledger from existing tasks",
+        action="store_true"
+    )
+    parser.add_argument(
+        "--check-quota-usage",
+        help="Check quota usage ledger against existing tasks",
+        action="store_true"
+    )
     return parser.parse_args()
 
 def main() -> None:
@@ -290,6 +337,39 @@ def main() -> None:
         insert_default_data(get_db_engine())
     if args.init_test:
         insert_test_data(get_db_engine())
+    if args.rebuild_usage:
+        with Session(bind=get_db_engine()) as session:
+            rebuild_usage_breakpoints(db_session=session)
+    if args.check_usage:
+        with Session(bind=get_db_engine()) as session:
+            differences = check_usage_breakpoints(db_session=session)
+        for difference in differences:
+            print(difference)
+        if differences:
+            exit(1)
+        print("Resource usage breakpoints are consistent.")
+    if args.rebuild_group_closure:
+        with Session(bind=get_db_engine()) as session:
+            rebuild_group_closure(db_session=session)
+    if args.check_group_closure:
+        with Session(bind=get_db_engine()) as session:
+            differences = check_group_closure(db_session=session)
+        for difference in differences:
+            print(difference)
+        if differences:
+            exit(1)
+        print("Group closure table is consistent.")
+    if args.rebuild_quota_usage:
+        with Session(bind=get_db_engine()) as session:
+            rebuild_quota_usage(db_session=session)
+    if args.check_quota_usage:
+        with Session(bind=get_db_engine()) as session:
+            differences = check_quota_usage(db_session=session)
+        for difference in differences:
+            print(difference)
+        if differences:
+            exit(1)
+        print("Quota usage ledger is consistent.")
 
 if __name__ == '__main__':
     main()
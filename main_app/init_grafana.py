@@ -8,9 +8,29 @@ from src.db.connection import (
 from src.db.models import User
 from sqlmodel import Session, select
 from src.app_logic.grafana_user_operations import grafana_create_or_update_user
+from src.app_logic.grafana_general_operations import (
+    grafana_create_service_account_token
+)
 from src.app_logic.user_operations import get_all_users
+import argparse
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--create-token",
+        help="Create Grafana service account token (set it as GRAFANA_TOKEN)",
+        action="store_true"
+    )
+    return parser.parse_args()
 
 def main() -> None:
+    args = parse_args()
+    if args.create_token:
+        token = grafana_create_service_account_token()
+        print("Grafana service account token (set it as GRAFANA_TOKEN):")
+        print(token)
+        return
+
     init_db_engine()
     session = Session(bind=get_db_engine())
     
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+from src.db.connection import (
+    init_db_engine,
+    init_db_model,
+    get_db_engine
+)
+from src.app_logic.group_hierarchy import rebuild_group_closure
+from src.app_logic.quota_operations import rebuild_quota_usage
+from src.app_logic.capacity_index import rebuild_usage_breakpoints
+from sqlalchemy import text
+from sqlmodel import Session
+
+# Migrations of existing databases to the current model. Missing tables are
+# created by init_db_model, changes of existing tables are listed below.
+# All statements can be safely executed repeatedly.
+MIGRATIONS = {
+    "task_during_range": [
+        "ALTER TABLE task ADD COLUMN IF NOT EXISTS during tsrange"
+        " GENERATED ALWAYS AS (tsrange(start_time, end_time, '[)')) STORED",
+        "CREATE INDEX IF NOT EXISTS ix_task_during ON task USING gist (during)"
+    ],
+    "task_status_start_time_id_index": [
+        "CREATE INDEX IF NOT EXISTS ix_task_status_start_time_id"
+        " ON task (status, start_time, id)"
+    ],
+    "task_owner_id_status_start_time_index": [
+        "CREATE INDEX IF NOT EXISTS ix_task_owner_id_status_start_time"
+        " ON task (owner_id, status, start_time)"
+    ],
+    "limit_shared": [
+        'ALTER TABLE "limit" ADD COLUMN IF NOT EXISTS shared boolean'
+        " NOT NULL DEFAULT false"
+    ]
+}
+
+def migrate() -> None:
+    with get_db_engine().begin() as connection:
+        for name, statements in MIGRATIONS.items():
+            print(f"Applying migration {name}")
+            for statement in statements:
+                connection.execute(text(statement))
+
+def main() -> None:
+    init_db_engine()
+    init_db_model(get_db_engine())
+    migrate()
+    # fill group closure table of databases created before it existed
+    print("Rebuilding group closure table")
+    with Session(bind=get_db_engine()) as session:
+        rebuild_group_closure(db_session=session)
+    # fill usage breakpoints from existing tasks, admission checks and task
+    # removals rely on them
+    print("Rebuilding usage breakpoints")
+    with Session(bind=get_db_engine()) as session:
+        rebuild_usage_breakpoints(db_session=session)
+    # fill quota usage ledger from existing tasks
+    print("Rebuilding quota usage ledger")
+    with Session(bind=get_db_engine()) as session:
+        rebuild_quota_usage(db_session=session)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+if __name__ == "__main__":
+    """
+    This runs the event processor (task status changes and notifications)
+    as a standalone process. API processes only signal it through database
+    notifications. Use with EVENT_PROCESSOR_MODE=external for API processes.
+    Multiple instances can run, only one of them processes events.
+    """
+    import signal
+    import logging
+    from threading import Event
+    from src.config import get_settings
+    from src.db.connection import init_db_engine
+    from src.app_logic.grafana_general_operations import (
+        init_grafana_client,
+        close_grafana_client
+    )
+    from src.app_logic.scheduled_event_processing import (
+        init_scheduler,
+        shutdown_scheduler
+    )
+
+    logging.basicConfig(
+        level=logging.DEBUG if get_settings().debug else logging.INFO
+    )
+
+    stop = Event()
+    signal.signal(signal.SIGINT, lambda signum, frame: stop.set())
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+
+    init_db_engine()
+    init_grafana_client()
+    init_scheduler()
+    stop.wait()
+    shutdown_scheduler()
+    close_grafana_client()
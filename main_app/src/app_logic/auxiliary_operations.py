@@ -5,6 +5,12 @@ from src.db.models import (
     NotificationType
 )
 from src.schemas.notification_entities import GroupNotifications
+from src.app_logic.group_hierarchy import (
+    get_group_ancestors,
+    get_group_descendant_members,
+    is_group_descendant_of,
+    ADMIN_GROUP_ID
+)
 from sqlmodel import Session
 
 # This file contains various auxiliary operations that were extracted from
@@ -14,16 +20,18 @@ def get_all_notifications_for_group(group: Group) -> list[GroupNotifications]:
     """
     Returns all notifications for group and parent groups.
     """
-    notifications = [
+    return [
         GroupNotifications(
+            group_id=ancestor.id,
+            group_name=ancestor.name,
+            notifications=ancestor.notifications
+        )
+        for ancestor in get_group_ancestors(
             group_id=group.id,
-            group_name=group.name,
-            notifications=group.notifications
+            db_session=Session.object_session(group),
+            load_notifications=True
         )
     ]
-    if group.parent:
-        notifications += get_all_notifications_for_group(group=group.parent)
-    return notifications
 
 def get_all_notifications_for_user(user: User) -> list[GroupNotifications]:
     """
@@ -69,24 +77,10 @@ def get_members_including_subgroups(group: Group) -> list[User]:
     :param group (Group): group to get members from
     :return (list[User]): list of users
     """
-    members = []
-    for user in group.members:
-        if user not in members:
-            members.append(user)
-    
-    processed_groups = []
-    groups = [g for g in group.children]
-    while groups:
-        group = groups.pop()
-        processed_groups.append(group)
-        for user in group.members:
-            if user not in members:
-                members.append(user)
-        for subgroup in group.children:
-            if subgroup not in groups and subgroup not in processed_groups:
-                groups.append(subgroup)
-    
-    return members
+    return get_group_descendant_members(
+        group_id=group.id,
+        db_session=Session.object_session(group)
+    )
 
 def is_admin(user: User) -> bool:
     """
@@ -97,10 +91,8 @@ def is_admin(user: User) -> bool:
                         session.
     :return (bool): True if user is admin, False otherwise
     """
-    group = user.group
-    while group:
-        if group.id == 2:
-            return True
-        group = group.parent
-
-    return False
+    return is_group_descendant_of(
+        group_id=user.group_id,
+        ancestor_id=ADMIN_GROUP_ID,
+        db_session=Session.object_session(user)
+    )
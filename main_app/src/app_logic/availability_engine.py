@@ -0,0 +1,161 @@
+from src.schemas.task_entities import UsagePeriod, ResourceAvailability
+from sqlalchemy import Row
+import numpy as np
+
+# Vectorized engine for resource availability schedule. Resource allocations
+# are converted to arrays of (time, node resource, amount delta) events,
+# usage of each node resource is computed using cumulative sum over sorted
+# event times and periods are merged using differences between consecutive
+# rows. Response objects are created only for the merged periods.
+
+
+def get_usage_columns(
+    allocations: list[Row]
+) -> (list[tuple[int, int]], list[tuple[int, int]]):
+    """
+    Returns columns of usage matrix (node resources) and of user presence
+    matrix (node resources and users using them). Node resources are ordered
+    by first appearance of the node and then by first appearance of the
+    resource on the node.
+    :param allocations (list[Row]): allocations ordered by task start time
+    :return (list[tuple[int, int]], list[tuple[int, int]]):
+        (node_id, resource_id) columns,
+        (node resource column index, user_id) columns
+    """
+    node_resources = {}
+    for a in allocations:
+        if a.node_id not in node_resources:
+            node_resources[a.node_id] = []
+        if a.resource_id not in node_resources[a.node_id]:
+            node_resources[a.node_id].append(a.resource_id)
+    resource_columns = [
+        (node_id, resource_id)
+        for node_id, resources in node_resources.items()
+        for resource_id in resources
+    ]
+    resource_index = {
+        column: i for i, column in enumerate(resource_columns)
+    }
+    user_columns = sorted(set([
+        (resource_index[(a.node_id, a.resource_id)], a.owner_id)
+        for a in allocations
+    ]))
+    return resource_columns, user_columns
+
+def get_availability_periods(
+    allocations: list[Row],
+    provided_node_resources: dict[int, dict[int, int]]
+) -> list[UsagePeriod]:
+    """
+    Returns merged usage periods for given allocations.
+    :param allocations (list[Row]): rows with owner_id, start_time, end_time,
+        node_id, resource_id and amount ordered by task start time
+    :param provided_node_resources (dict[int, dict[int, int]]): amounts of
+        resources provided by the nodes
+    :return (list[UsagePeriod]): list of usage periods
+    """
+    if not allocations:
+        return []
+
+    resource_columns, user_columns = get_usage_columns(
+        allocations=allocations
+    )
+    resource_index = {
+        column: i for i, column in enumerate(resource_columns)
+    }
+    user_index = {column: i for i, column in enumerate(user_columns)}
+
+    # Event arrays
+    starts = np.array(
+        [a.start_time for a in allocations],
+        dtype='datetime64[us]'
+    )
+    ends = np.array(
+        [a.end_time for a in allocations],
+        dtype='datetime64[us]'
+    )
+    amounts = np.array([a.amount for a in allocations], dtype=np.int64)
+    resource_cols = np.array(
+        [resource_index[(a.node_id, a.resource_id)] for a in allocations],
+        dtype=np.int64
+    )
+    user_cols = np.array(
+        [
+            user_index[(
+                resource_index[(a.node_id, a.resource_id)],
+                a.owner_id
+            )]
+            for a in allocations
+        ],
+        dtype=np.int64
+    )
+
+    # Times when usage changes, each row of the matrices is usage in
+    # period [times[i], times[i+1])
+    times = np.unique(np.concatenate([starts, ends]))
+    start_rows = np.searchsorted(times, starts)
+    end_rows = np.searchsorted(times, ends)
+
+    usage = np.zeros((len(times), len(resource_columns)), dtype=np.int64)
+    np.add.at(usage, (start_rows, resource_cols), amounts)
+    np.add.at(usage, (end_rows, resource_cols), -amounts)
+    usage = np.cumsum(usage, axis=0)
+
+    # number of user tasks using the node resource
+    users = np.zeros((len(times), len(user_columns)), dtype=np.int64)
+    np.add.at(users, (start_rows, user_cols), 1)
+    np.add.at(users, (end_rows, user_cols), -1)
+    users = np.cumsum(users, axis=0) > 0
+
+    # Last row has no period end time
+    usage = usage[:-1]
+    users = users[:-1]
+    used = usage != 0
+    is_used_period = used.any(axis=1)
+
+    # Period continues previous one if both are used and nothing changed
+    continues_previous = np.zeros(len(usage), dtype=bool)
+    continues_previous[1:] = is_used_period[1:] \
+        & is_used_period[:-1] \
+        & (usage[1:] == usage[:-1]).all(axis=1) \
+        & (users[1:] == users[:-1]).all(axis=1)
+    period_starts = np.flatnonzero(is_used_period & ~continues_previous)
+    is_last_row = np.ones(len(usage), dtype=bool)
+    is_last_row[:-1] = ~continues_previous[1:]
+    period_ends = np.flatnonzero(is_used_period & is_last_row) + 1
+
+    # Users of each node resource sorted by user id
+    column_users = [[] for _ in resource_columns]
+    for i, (column, user_id) in enumerate(user_columns):
+        column_users[column].append((i, user_id))
+
+    provided = np.array(
+        [
+            provided_node_resources[node_id][resource_id] or 0
+            for node_id, resource_id in resource_columns
+        ],
+        dtype=np.int64
+    )
+    available = provided - usage
+
+    times = times.astype('datetime64[us]').tolist()
+    periods = []
+    for start_row, end_row in zip(period_starts, period_ends):
+        periods.append(UsagePeriod(
+            start_time=times[start_row],
+            end_time=times[end_row],
+            available_resources=[
+                ResourceAvailability(
+                    node_id=resource_columns[column][0],
+                    resource_id=resource_columns[column][1],
+                    amount=int(available[start_row, column]),
+                    user_ids=[
+                        user_id
+                        for i, user_id in column_users[column]
+                        if users[start_row, i]
+                    ]
+                )
+                for column in np.flatnonzero(used[start_row])
+            ]
+        ))
+    return periods
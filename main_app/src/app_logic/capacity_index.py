@@ -0,0 +1,803 @@
+from src.db.models import (
+    Task,
+    TaskStatus,
+    ResourceAllocation,
+    NodeResourceUsage
+)
+from sqlmodel import select, Session
+from sqlalchemy import (
+    func,
+    tuple_,
+    and_,
+    exists,
+    union_all,
+    delete,
+    update,
+    text,
+    values,
+    column,
+    Integer,
+    DateTime,
+    Select,
+    CTE
+)
+from sqlalchemy.orm import aliased
+from sqlalchemy.dialects.postgresql import insert
+from datetime import datetime, timedelta
+from collections.abc import Callable
+
+# Capacity index used for task admission. Usage of each node resource is
+# stored as a list of start/end events, so the peak usage in the requested
+# time window can be found with a single sweep over sorted events.
+# Index is loaded from usage breakpoints (NodeResourceUsage table), that are
+# updated whenever task is scheduled, rescheduled, removed or finished.
+#
+# Structure format:
+# {
+#     node_id: {
+#         resource_id: [(time, amount_delta), ...]
+#     }
+# }
+
+# Namespace (first key) of advisory locks used for locking nodes when
+# scheduling tasks. Second key of the lock is the node id.
+NODE_SCHEDULING_LOCK_NAMESPACE = 1
+
+
+def get_required_pairs(
+    required_nodes_resources: dict[int, dict[int, int]]
+) -> list[tuple[int, int]]:
+    """
+    Returns list of required (node_id, resource_id) pairs.
+    :param required_nodes_resources (dict[int, dict[int, int]]): required
+        nodes and resources
+    :return (list[tuple[int, int]]): required node resources
+    """
+    return [
+        (node_id, resource_id)
+        for node_id, resources in required_nodes_resources.items()
+        for resource_id in resources.keys()
+    ]
+
+def add_usage_interval(
+    capacity_index: dict[int, dict[int, list[tuple[datetime, int]]]],
+    node_id: int,
+    resource_id: int,
+    start_time: datetime,
+    end_time: datetime,
+    amount: int
+) -> None:
+    """
+    Adds usage interval [start_time, end_time) to the capacity index.
+    Modifies index in place.
+    :param capacity_index (dict[int, dict[int, list[tuple[datetime, int]]]]):
+        capacity index to modify
+    :param node_id (int): id of the node
+    :param resource_id (int): id of the resource
+    :param start_time (datetime): start of the usage
+    :param end_time (datetime): end of the usage
+    :param amount (int): amount of the resource used in the interval
+    """
+    if node_id not in capacity_index:
+        capacity_index[node_id] = {}
+    if resource_id not in capacity_index[node_id]:
+        capacity_index[node_id][resource_id] = []
+    capacity_index[node_id][resource_id].append((start_time, amount))
+    capacity_index[node_id][resource_id].append((end_time, -amount))
+
+def get_capacity_index(
+    required_nodes_resources: dict[int, dict[int, int]],
+    start_time: datetime,
+    end_time: datetime,
+    db_session: Session,
+    exclude_task_id: int | None = None
+) -> dict[int, dict[int, list[tuple[datetime, int]]]]:
+    """
+    Builds capacity index of required nodes and resources for given time
+    window from usage breakpoints. Index contains usage at the window start
+    and all changes of the usage inside the window.
+    :param required_nodes_resources (dict[int, dict[int, int]]): required
+        nodes and resources
+    :param start_time (datetime): start of the time window
+    :param end_time (datetime): end of the time window
+    :param db_session (Session): database session
+    :param exclude_task_id (int | None): id of task to skip (task that is
+        being rescheduled)
+    :return (dict[int, dict[int, list[tuple[datetime, int]]]]): capacity index
+    """
+    required_pairs = get_required_pairs(
+        required_nodes_resources=required_nodes_resources
+    )
+
+    # last breakpoint before or at the window start of each node resource
+    window_start = select(
+        NodeResourceUsage.node_id,
+        NodeResourceUsage.resource_id,
+        func.max(NodeResourceUsage.time).label('time')
+    ).where(
+        tuple_(
+            NodeResourceUsage.node_id,
+            NodeResourceUsage.resource_id
+        ).in_(required_pairs),
+        NodeResourceUsage.time <= start_time
+    ).group_by(
+        NodeResourceUsage.node_id,
+        NodeResourceUsage.resource_id
+    ).subquery()
+
+    breakpoints = db_session.execute(
+        select(
+            NodeResourceUsage.node_id,
+            NodeResourceUsage.resource_id,
+            NodeResourceUsage.time,
+            NodeResourceUsage.amount
+        ).outerjoin(
+            window_start,
+            and_(
+                window_start.c.node_id == NodeResourceUsage.node_id,
+                window_start.c.resource_id == NodeResourceUsage.resource_id
+            )
+        ).where(
+            tuple_(
+                NodeResourceUsage.node_id,
+                NodeResourceUsage.resource_id
+            ).in_(required_pairs),
+            NodeResourceUsage.time >= func.coalesce(
+                window_start.c.time,
+                start_time
+            ),
+            NodeResourceUsage.time < end_time
+        ).order_by(
+            NodeResourceUsage.node_id,
+            NodeResourceUsage.resource_id,
+            NodeResourceUsage.time
+        )
+    ).all()
+
+    # convert cumulative amounts to usage changes
+    capacity_index = {}
+    previous = {}
+    for b in breakpoints:
+        if b.node_id not in capacity_index:
+            capacity_index[b.node_id] = {}
+        if b.resource_id not in capacity_index[b.node_id]:
+            capacity_index[b.node_id][b.resource_id] = []
+        capacity_index[b.node_id][b.resource_id].append((
+            b.time,
+            b.amount - previous.get((b.node_id, b.resource_id), 0)
+        ))
+        previous[(b.node_id, b.resource_id)] = b.amount
+
+    # remove usage of the task that is being rescheduled
+    if exclude_task_id is not None:
+        allocations = db_session.execute(
+            select(
+                ResourceAllocation.node_id,
+                ResourceAllocation.resource_id,
+                ResourceAllocation.amount,
+                Task.start_time,
+                Task.end_time
+            ).join(
+                Task, Task.id == ResourceAllocation.task_id
+            ).where(
+                Task.id == exclude_task_id,
+                Task.status.in_([TaskStatus.scheduled, TaskStatus.running]),
+                tuple_(
+                    ResourceAllocation.node_id,
+                    ResourceAllocation.resource_id
+                ).in_(required_pairs)
+            )
+        ).all()
+        for a in allocations:
+            add_usage_interval(
+                capacity_index=capacity_index,
+                node_id=a.node_id,
+                resource_id=a.resource_id,
+                start_time=a.start_time,
+                end_time=a.end_time,
+                amount=-a.amount
+            )
+    return capacity_index
+
+def get_owner_capacity_index(
+    required_nodes_resources: dict[int, dict[int, int]],
+    start_time: datetime,
+    end_time: datetime,
+    owner_ids: list[int] | Select,
+    db_session: Session,
+    exclude_task_id: int | None = None
+) -> dict[int, dict[int, list[tuple[datetime, int]]]]:
+    """
+    Builds capacity index of required nodes and resources for given time
+    window from scheduled and running tasks of given owners only.
+    :param required_nodes_resources (dict[int, dict[int, int]]): required
+        nodes and resources
+    :param start_time (datetime): start of the time window
+    :param end_time (datetime): end of the time window
+    :param owner_ids (list[int] | Select): ids of task owners or query
+        selecting them
+    :param db_session (Session): database session
+    :param exclude_task_id (int | None): id of task to skip (task that is
+        being rescheduled)
+    :return (dict[int, dict[int, list[tuple[datetime, int]]]]): capacity index
+    """
+    query = select(
+        ResourceAllocation.node_id,
+        ResourceAllocation.resource_id,
+        ResourceAllocation.amount,
+        Task.start_time,
+        Task.end_time
+    ).join(
+        Task, Task.id == ResourceAllocation.task_id
+    ).where(
+        Task.owner_id.in_(owner_ids),
+        Task.status.in_([TaskStatus.scheduled, TaskStatus.running]),
+        Task.start_time < end_time,
+        Task.end_time > start_time,
+        tuple_(
+            ResourceAllocation.node_id,
+            ResourceAllocation.resource_id
+        ).in_(get_required_pairs(
+            required_nodes_resources=required_nodes_resources
+        ))
+    )
+    if exclude_task_id is not None:
+        query = query.where(Task.id != exclude_task_id)
+
+    capacity_index = {}
+    for a in db_session.execute(query).all():
+        add_usage_interval(
+            capacity_index=capacity_index,
+            node_id=a.node_id,
+            resource_id=a.resource_id,
+            start_time=a.start_time,
+            end_time=a.end_time,
+            amount=a.amount
+        )
+    return capacity_index
+
+def get_peak_usage(
+    events: list[tuple[datetime, int]],
+    start_time: datetime,
+    end_time: datetime
+) -> int:
+    """
+    Returns peak usage of the resource in time window [start_time, end_time).
+    :param events (list[tuple[datetime, int]]): usage events of the resource
+    :param start_time (datetime): start of the time window
+    :param end_time (datetime): end of the time window
+    :return (int): peak usage in the time window
+    """
+    # Ending events are sorted before starting events at the same time,
+    # because usage intervals are half-open.
+    usage = 0
+    peak = 0
+    for time, delta in sorted(events):
+        if time >= end_time:
+            break
+        usage += delta
+        if time <= start_time:
+            # usage at the window start is carried into the window
+            peak = usage
+        else:
+            peak = max(peak, usage)
+    return peak
+
+def check_capacity(
+    capacity_index: dict[int, dict[int, list[tuple[datetime, int]]]],
+    required_nodes_resources: dict[int, dict[int, int]],
+    node_resources: dict[int, dict[int, int]],
+    start_time: datetime,
+    end_time: datetime
+) -> bool:
+    """
+    Checks if peak usage in [start_time, end_time) plus required amount
+    does not exceed amount of resource provided by the node.
+    :param capacity_index (dict[int, dict[int, list[tuple[datetime, int]]]]):
+        capacity index of overlapping usage
+    :param required_nodes_resources (dict[int, dict[int, int]]): required
+        nodes and resources
+    :param node_resources (dict[int, dict[int, int]]): provided node resources
+    :param start_time (datetime): start of the time window
+    :param end_time (datetime): end of the time window
+    :return (bool): True if there is enough resources, False otherwise
+    """
+    for node_id, resources in required_nodes_resources.items():
+        for resource_id, amount in resources.items():
+            # provided amount is None if node does not provide the resource
+            provided = node_resources.get(node_id, {}).get(resource_id) or 0
+            peak = get_peak_usage(
+                events=capacity_index.get(node_id, {}).get(resource_id, []),
+                start_time=start_time,
+                end_time=end_time
+            )
+            if peak + amount > provided:
+                return False
+    return True
+
+def find_free_slots(
+    capacity_index: dict[int, dict[int, list[tuple[datetime, int]]]],
+    required_nodes_resources: dict[int, dict[int, int]],
+    node_resources: dict[int, dict[int, int]],
+    search_start_time: datetime,
+    search_end_time: datetime,
+    duration: timedelta,
+    max_results: int = 1,
+    constraints: list[tuple[dict, dict, dict]] | None = None,
+    slot_filter: Callable[[datetime], bool] | None = None
+) -> list[datetime]:
+    """
+    Finds earliest start times in [search_start_time, search_end_time) where
+    required resources are available for the whole duration. All required
+    node resources (and additional constraints) are evaluated in a single
+    sweep over the usage events.
+    :param capacity_index (dict[int, dict[int, list[tuple[datetime, int]]]]):
+        capacity index of usage in the searched time window
+    :param required_nodes_resources (dict[int, dict[int, int]]): required
+        nodes and resources
+    :param node_resources (dict[int, dict[int, int]]): provided node resources
+    :param search_start_time (datetime): start of the searched time window
+    :param search_end_time (datetime): end of the searched time window
+        (slot must end before or at this time)
+    :param duration (timedelta): required duration of the slot
+    :param max_results (int): maximum number of start times to return
+    :param constraints (list[tuple[dict, dict, dict]] | None): additional
+        capacity constraints (e.g. concurrent usage limits), each given
+        as capacity index, required and maximal amounts by node and resource
+    :param slot_filter (Callable[[datetime], bool] | None): additional
+        check of slot start time, slots failing the check are skipped
+    :return (list[datetime]): sorted start times of free slots
+    """
+    # Maximal usage of each node resource that still allows the request
+    max_usage = {}
+    usage = {}
+    events = []
+    for i, (index, required, provided_resources) in enumerate(
+        [(capacity_index, required_nodes_resources, node_resources)]
+        + (constraints or [])
+    ):
+        for node_id, resources in required.items():
+            for resource_id, amount in resources.items():
+                key = (i, node_id, resource_id)
+                provided = provided_resources.get(node_id, {}).get(
+                    resource_id
+                ) or 0
+                max_usage[key] = provided - amount
+                usage[key] = 0
+                for time, delta in index.get(node_id, {}).get(
+                    resource_id,
+                    []
+                ):
+                    events.append((time, delta, key))
+    events.sort(key=lambda e: e[0])
+
+    # number of node resources that can't fit the request
+    exceeded = len([key for key in max_usage if max_usage[key] < 0])
+
+    # start of the current free period and possible start times in it
+    free_start = None
+    candidates = []
+    slots = []
+
+    def add_slots(free_end: datetime) -> None:
+        for candidate in candidates:
+            if len(slots) >= max_results:
+                return
+            if candidate + duration <= free_end \
+            and (slot_filter is None or slot_filter(candidate)):
+                slots.append(candidate)
+
+    times = [search_start_time] + sorted(set([
+        e[0] for e in events
+        if search_start_time < e[0] < search_end_time
+    ]))
+    i = 0
+    for time in times:
+        # apply all events up to current time
+        while i < len(events) and events[i][0] <= time:
+            _, delta, key = events[i]
+            was_exceeded = usage[key] > max_usage[key]
+            usage[key] += delta
+            exceeded += int(usage[key] > max_usage[key]) - int(was_exceeded)
+            i += 1
+
+        if exceeded == 0:
+            if free_start is None:
+                free_start = time
+                candidates = []
+            candidates.append(time)
+        elif free_start is not None:
+            add_slots(free_end=time)
+            free_start = None
+        if len(slots) >= max_results:
+            return slots
+
+    if free_start is not None:
+        add_slots(free_end=search_end_time)
+    return slots
+
+# USAGE BREAKPOINTS MAINTENANCE
+def lock_nodes(node_ids: list[int], db_session: Session) -> None:
+    """
+    Acquires transaction level advisory lock for each node. Locks are
+    acquired in sorted order to prevent deadlocks.
+    :param node_ids (list[int]): ids of nodes to lock
+    :param db_session (Session): database session
+    """
+    for node_id in sorted(set(node_ids)):
+        db_session.execute(
+            select(func.pg_advisory_xact_lock(
+                NODE_SCHEDULING_LOCK_NAMESPACE,
+                node_id
+            ))
+        )
+
+def get_task_nodes_resources(task: Task) -> dict[int, dict[int, int]]:
+    """
+    Returns dictionary of nodes and resources allocated by the task.
+    :param task (Task): task to get allocations for
+    :return (dict[int, dict[int, int]]): allocated nodes and resources
+    """
+    nodes_resources = {}
+    for ra in task.resource_allocations:
+        if ra.node_id not in nodes_resources:
+            nodes_resources[ra.node_id] = {}
+        nodes_resources[ra.node_id][ra.resource_id] = ra.amount
+    return nodes_resources
+
+def update_usage_breakpoints(
+    node_id: int,
+    resource_id: int,
+    start_time: datetime,
+    end_time: datetime,
+    amount: int,
+    db_session: Session
+) -> None:
+    """
+    Adds amount to the usage of the node resource in [start_time, end_time).
+    Breakpoints that do not change the usage are removed afterwards.
+    Node must be locked by the caller.
+    :param node_id (int): id of the node
+    :param resource_id (int): id of the resource
+    :param start_time (datetime): start of the usage
+    :param end_time (datetime): end of the usage
+    :param amount (int): amount to add (negative to remove usage)
+    :param db_session (Session): database session
+    """
+    def previous_amount(time: datetime):
+        # aliased, so it is not correlated with the deleted breakpoint
+        previous = aliased(NodeResourceUsage)
+        return func.coalesce(
+            select(previous.amount).where(
+                previous.node_id == node_id,
+                previous.resource_id == resource_id,
+                previous.time < time
+            ).order_by(
+                previous.time.desc()
+            ).limit(1).scalar_subquery(),
+            0
+        )
+
+    for time in (start_time, end_time):
+        db_session.execute(
+            insert(NodeResourceUsage).values(
+                node_id=node_id,
+                resource_id=resource_id,
+                time=time,
+                amount=previous_amount(time)
+            ).on_conflict_do_nothing()
+        )
+    db_session.execute(
+        update(NodeResourceUsage).where(
+            NodeResourceUsage.node_id == node_id,
+            NodeResourceUsage.resource_id == resource_id,
+            NodeResourceUsage.time >= start_time,
+            NodeResourceUsage.time < end_time
+        ).values(amount=NodeResourceUsage.amount + amount)
+    )
+    for time in (start_time, end_time):
+        db_session.execute(
+            delete(NodeResourceUsage).where(
+                NodeResourceUsage.node_id == node_id,
+                NodeResourceUsage.resource_id == resource_id,
+                NodeResourceUsage.time == time,
+                NodeResourceUsage.amount == previous_amount(time)
+            )
+        )
+
+def add_usage(
+    nodes_resources: dict[int, dict[int, int]],
+    start_time: datetime,
+    end_time: datetime,
+    db_session: Session,
+    remove: bool = False
+) -> None:
+    """
+    Adds (or removes) usage of nodes resources to usage breakpoints.
+    Nodes must be locked by the caller (see lock_nodes).
+    :param nodes_resources (dict[int, dict[int, int]]): used nodes resources
+    :param start_time (datetime): start of the usage
+    :param end_time (datetime): end of the usage
+    :param db_session (Session): database session
+    :param remove (bool): remove the usage instead of adding it
+    """
+    for node_id, resources in nodes_resources.items():
+        for resource_id, amount in resources.items():
+            update_usage_breakpoints(
+                node_id=node_id,
+                resource_id=resource_id,
+                start_time=start_time,
+                end_time=end_time,
+                amount=-amount if remove else amount,
+                db_session=db_session
+            )
+
+def add_task_usage(task: Task, db_session: Session) -> None:
+    """
+    Adds usage of scheduled or running task to usage breakpoints.
+    Nodes of the task must be locked by the caller.
+    :param task (Task): task to add
+    :param db_session (Session): database session
+    """
+    if task.status not in (TaskStatus.scheduled, TaskStatus.running):
+        return
+    add_usage(
+        nodes_resources=get_task_nodes_resources(task=task),
+        start_time=task.start_time,
+        end_time=task.end_time,
+        db_session=db_session
+    )
+
+def remove_task_usage(task: Task, db_session: Session) -> None:
+    """
+    Removes usage of scheduled or running task from usage breakpoints.
+    Must be called before task status, times or allocations are changed.
+    Nodes of the task must be locked by the caller.
+    :param task (Task): task to remove
+    :param db_session (Session): database session
+    """
+    if task.status not in (TaskStatus.scheduled, TaskStatus.running):
+        return
+    add_usage(
+        nodes_resources=get_task_nodes_resources(task=task),
+        start_time=task.start_time,
+        end_time=task.end_time,
+        db_session=db_session,
+        remove=True
+    )
+
+def remove_tasks_usage(task_ids: Select, db_session: Session) -> None:
+    """
+    Removes usage of multiple scheduled or running tasks from usage
+    breakpoints with set-based statements instead of updating breakpoints
+    task by task. Must be called before task statuses, times or allocations
+    are changed. Nodes of the tasks are known only from the query, so they
+    are locked here.
+    :param task_ids (Select): query selecting ids of tasks to remove
+    :param db_session (Session): database session
+    """
+    allocations = select(
+        ResourceAllocation.node_id,
+        ResourceAllocation.resource_id,
+        Task.start_time,
+        Task.end_time,
+        ResourceAllocation.amount
+    ).join(
+        Task, Task.id == ResourceAllocation.task_id
+    ).where(
+        Task.id.in_(task_ids),
+        Task.status.in_([TaskStatus.scheduled, TaskStatus.running])
+    ).cte(name="removed_allocations")
+
+    node_ids = db_session.scalars(
+        select(allocations.c.node_id).distinct()
+    ).all()
+    if not node_ids:
+        return
+    lock_nodes(node_ids=node_ids, db_session=db_session)
+
+    # usage decreases at task start and increases back at task end
+    apply_usage_deltas(deltas=union_all(
+        select(
+            allocations.c.node_id,
+            allocations.c.resource_id,
+            allocations.c.start_time.label('time'),
+            (-allocations.c.amount).label('delta')
+        ),
+        select(
+            allocations.c.node_id,
+            allocations.c.resource_id,
+            allocations.c.end_time.label('time'),
+            allocations.c.amount.label('delta')
+        )
+    ).cte(name="usage_deltas"), db_session=db_session)
+
+def add_usages(
+    usages: list[tuple[dict[int, dict[int, int]], datetime, datetime]],
+    db_session: Session
+) -> None:
+    """
+    Adds usage of multiple tasks to usage breakpoints with set-based
+    statements instead of updating breakpoints task by task.
+    Nodes must be locked by the caller.
+    :param usages (list[tuple[dict[int, dict[int, int]], datetime, datetime]]):
+        used nodes resources, start and end of each usage
+    :param db_session (Session): database session
+    """
+    # usage increases at task start and decreases back at task end,
+    # deltas at the same time are summed up
+    time_deltas = {}
+    for nodes_resources, start_time, end_time in usages:
+        for node_id, resources in nodes_resources.items():
+            for resource_id, amount in resources.items():
+                for time, delta in ((start_time, amount), (end_time, -amount)):
+                    key = (node_id, resource_id, time)
+                    time_deltas[key] = time_deltas.get(key, 0) + delta
+    if not time_deltas:
+        return
+    apply_usage_deltas(deltas=select(
+        values(
+            column('node_id', Integer),
+            column('resource_id', Integer),
+            column('time', DateTime),
+            column('delta', Integer),
+            name='time_deltas'
+        ).data([
+            (node_id, resource_id, time, delta)
+            for (node_id, resource_id, time), delta in time_deltas.items()
+        ])
+    ).cte(name="usage_deltas"), db_session=db_session)
+
+def apply_usage_deltas(deltas: CTE, db_session: Session) -> None:
+    """
+    Applies usage deltas to usage breakpoints. Each breakpoint changes
+    by the sum of deltas up to its time, breakpoints that do not change
+    the usage are removed afterwards. Nodes must be locked by the caller.
+    :param deltas (CTE): node_id, resource_id, time and delta of usage
+    :param db_session (Session): database session
+    """
+    def previous_amount(usage):
+        previous = aliased(NodeResourceUsage)
+        return func.coalesce(
+            select(previous.amount).where(
+                previous.node_id == usage.node_id,
+                previous.resource_id == usage.resource_id,
+                previous.time < usage.time
+            ).order_by(
+                previous.time.desc()
+            ).limit(1).scalar_subquery(),
+            0
+        )
+
+    # breakpoints at the start and end of each usage
+    db_session.execute(
+        insert(NodeResourceUsage).from_select(
+            ['node_id', 'resource_id', 'time', 'amount'],
+            select(
+                deltas.c.node_id,
+                deltas.c.resource_id,
+                deltas.c.time,
+                previous_amount(usage=deltas.c)
+            ).distinct()
+        ).on_conflict_do_nothing()
+    )
+    # each breakpoint changes by the sum of deltas up to its time
+    node_resource_deltas = and_(
+        deltas.c.node_id == NodeResourceUsage.node_id,
+        deltas.c.resource_id == NodeResourceUsage.resource_id,
+        deltas.c.time <= NodeResourceUsage.time
+    )
+    db_session.execute(
+        update(NodeResourceUsage).where(
+            exists().where(node_resource_deltas)
+        ).values(
+            amount=NodeResourceUsage.amount + select(
+                func.sum(deltas.c.delta)
+            ).where(node_resource_deltas).scalar_subquery()
+        )
+    )
+    db_session.execute(
+        delete(NodeResourceUsage).where(
+            tuple_(
+                NodeResourceUsage.node_id,
+                NodeResourceUsage.resource_id,
+                NodeResourceUsage.time
+            ).in_(
+                select(deltas.c.node_id, deltas.c.resource_id, deltas.c.time)
+            ),
+            NodeResourceUsage.amount == previous_amount(
+                usage=NodeResourceUsage
+            )
+        )
+    )
+
+def get_expected_usage_breakpoints():
+    """
+    Returns select of usage breakpoints computed from tasks
+    and resource allocations.
+    :return (Select): select of node_id, resource_id, time and amount
+    """
+    intervals = select(
+        ResourceAllocation.node_id,
+        ResourceAllocation.resource_id,
+        Task.start_time.label('time'),
+        ResourceAllocation.amount.label('delta')
+    ).join(
+        Task, Task.id == ResourceAllocation.task_id
+    ).where(
+        Task.status.in_([TaskStatus.scheduled, TaskStatus.running])
+    ).union_all(
+        select(
+            ResourceAllocation.node_id,
+            ResourceAllocation.resource_id,
+            Task.end_time.label('time'),
+            (-ResourceAllocation.amount).label('delta')
+        ).join(
+            Task, Task.id == ResourceAllocation.task_id
+        ).where(
+            Task.status.in_([TaskStatus.scheduled, TaskStatus.running])
+        )
+    ).subquery()
+    changes = select(
+        intervals.c.node_id,
+        intervals.c.resource_id,
+        intervals.c.time,
+        func.sum(intervals.c.delta).label('delta')
+    ).group_by(
+        intervals.c.node_id,
+        intervals.c.resource_id,
+        intervals.c.time
+    ).having(
+        func.sum(intervals.c.delta) != 0
+    ).subquery()
+    return select(
+        changes.c.node_id,
+        changes.c.resource_id,
+        changes.c.time,
+        func.sum(changes.c.delta).over(
+            partition_by=(changes.c.node_id, changes.c.resource_id),
+            order_by=changes.c.time
+        ).label('amount')
+    )
+
+def rebuild_usage_breakpoints(db_session: Session) -> None:
+    """
+    Recomputes all usage breakpoints from tasks and resource allocations.
+    :param db_session (Session): database session
+    """
+    db_session.execute(
+        text(f'LOCK TABLE {NodeResourceUsage.__tablename__} IN EXCLUSIVE MODE')
+    )
+    db_session.execute(delete(NodeResourceUsage))
+    db_session.execute(
+        insert(NodeResourceUsage).from_select(
+            ['node_id', 'resource_id', 'time', 'amount'],
+            get_expected_usage_breakpoints()
+        )
+    )
+    db_session.commit()
+
+def check_usage_breakpoints(db_session: Session) -> list[str]:
+    """
+    Compares usage breakpoints with usage computed from tasks
+    and resource allocations.
+    :param db_session (Session): database session
+    :return (list[str]): list of differences, empty if breakpoints
+        are consistent
+    """
+    expected = {
+        (b.node_id, b.resource_id, b.time): b.amount
+        for b in db_session.execute(get_expected_usage_breakpoints()).all()
+    }
+    stored = {
+        (b.node_id, b.resource_id, b.time): b.amount
+        for b in db_session.scalars(select(NodeResourceUsage)).all()
+    }
+    differences = []
+    for key in sorted(set(expected.keys()) | set(stored.keys())):
+        if expected.get(key) != stored.get(key):
+            differences.append(
+                f"Node {key[0]}, resource {key[1]}, time {key[2]}: "
+                f"expected {expected.get(key)}, stored {stored.get(key)}"
+            )
+    return differences
@@ -15,7 +15,8 @@ import httpx
 import json
 from fastapi import HTTPException
 from sqlalchemy.orm import Session
-from datetime import datetime, timedelta
+from sqlalchemy import func
+from datetime import datetime
 from src.schemas.grafana_entities import GrafanaAlertLabels
 from src.app_logic.grafana_general_operations import (
     upload_grafana_config,
@@ -27,9 +28,165 @@ from src.app_logic.auxiliary_operations import (
     get_user_notifications_by_type,
     get_members_including_subgroups
 )
-from src.config import get_settings
 import logging
 
+# Alert rules are listed from Grafana at once (there is no filtering in the
+# provisioning API). Listing is fetched once per operation batch to the
+# snapshot, which is indexed by alert labels and updated when alert rules
+# are created, updated or removed, so it can be passed to all operations
+# of the batch (e.g. alert update for all members of a group).
+
+def get_alert_key(
+    username: str | None,
+    notification_id: int | str | None,
+    node_id: int | str | None,
+    resource_id: int | str | None
+) -> tuple[str | None, str | None, str | None, str | None]:
+    """
+    Returns key of alert rule in the alert snapshot index. Label values
+    in Grafana are strings.
+    """
+    return (
+        username,
+        None if notification_id is None else str(notification_id),
+        None if node_id is None else str(node_id),
+        None if resource_id is None else str(resource_id)
+    )
+
+def get_alert_rule_key(
+    alert: dict
+) -> tuple[str | None, str | None, str | None, str | None]:
+    """
+    Returns key of alert rule from Grafana in the alert snapshot index.
+    """
+    labels = alert.get('labels', {})
+    return get_alert_key(
+        username=labels.get('username', None),
+        notification_id=labels.get('notification_id', None),
+        node_id=labels.get('node_id', None),
+        resource_id=labels.get('resource_id', None)
+    )
+
+class GrafanaAlertSnapshot:
+    """
+    Snapshot of alert rules in Grafana indexed by username and by
+    (username, notification_id, node_id, resource_id) labels.
+    """
+    def __init__(self, alerts: list[dict]):
+        # alert rules of each user by uid
+        self.user_alerts: dict[str | None, dict[str, dict]] = {}
+        # alert rule with given labels (duplicate rules with the same labels
+        # are listed only in user alerts)
+        self.alerts: dict[tuple, dict] = {}
+        for alert in alerts:
+            self.add(alert=alert)
+
+    def add(self, alert: dict) -> None:
+        """
+        Adds created or updated alert rule to the snapshot.
+        :param alert (dict): alert rule from Grafana
+        """
+        username = alert.get('labels', {}).get('username', None)
+        if username not in self.user_alerts:
+            self.user_alerts[username] = {}
+        self.user_alerts[username][alert.get('uid', None)] = alert
+        self.alerts[get_alert_rule_key(alert=alert)] = alert
+
+    def remove(self, alert: dict) -> None:
+        """
+        Removes deleted (or replaced) alert rule from the snapshot.
+        :param alert (dict): alert rule from Grafana
+        """
+        username = alert.get('labels', {}).get('username', None)
+        user_alerts = self.user_alerts.get(username, {})
+        user_alerts.pop(alert.get('uid', None), None)
+        key = get_alert_rule_key(alert=alert)
+        if self.alerts.get(key) is alert:
+            del self.alerts[key]
+            # other alert rule with the same labels
+            for other in user_alerts.values():
+                if get_alert_rule_key(alert=other) == key:
+                    self.alerts[key] = other
+                    break
+
+    def get_alert(
+        self,
+        username: str,
+        notification_id: int,
+        node_id: int,
+        resource_id: int
+    ) -> dict | None:
+        """
+        Returns alert rule with given labels.
+        :return (dict | None): alert rule or None if it does not exist
+        """
+        return self.alerts.get(get_alert_key(
+            username=username,
+            notification_id=notification_id,
+            node_id=node_id,
+            resource_id=resource_id
+        ))
+
+    def get_user_alerts(self, username: str) -> list[dict]:
+        """
+        Returns alert rules of the user.
+        :param username (str): username of the user
+        :return (list[dict]): alert rules
+        """
+        return list(self.user_alerts.get(username, {}).values())
+
+    def get_notification_alerts(
+        self,
+        notification_id: int,
+        node_id: int | None = None
+    ) -> list[dict]:
+        """
+        Returns alert rules created from the notification.
+        :param notification_id (int): id of the notification
+        :param node_id (int | None): return only alert rules for the node
+        :return (list[dict]): alert rules
+        """
+        return [
+            alert
+            for user_alerts in self.user_alerts.values()
+            for alert in user_alerts.values()
+            if get_alert_rule_key(alert=alert)[1] == str(notification_id)
+            and (
+                node_id is None
+                or get_alert_rule_key(alert=alert)[2] == str(node_id)
+            )
+        ]
+
+def get_grafana_alert_snapshot() -> GrafanaAlertSnapshot:
+    """
+    Gets all alert rules from Grafana.
+    :return (GrafanaAlertSnapshot): snapshot of alert rules
+    """
+    try:
+        alerts = get_grafana_config('/api/v1/provisioning/alert-rules').json()
+    except httpx.HTTPStatusError as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to get alerts from Grafana!"
+        )
+    return GrafanaAlertSnapshot(alerts=alerts)
+
+def grafana_remove_alert_rule(
+    alert: dict,
+    alert_snapshot: GrafanaAlertSnapshot | None = None
+) -> None:
+    """
+    Removes alert rule from Grafana (and from the snapshot).
+    :param alert (dict): alert rule from Grafana
+    :param alert_snapshot (GrafanaAlertSnapshot | None): snapshot to update
+    :raises httpx.HTTPStatusError: when alert rule cannot be removed
+    """
+    remove_grafana_config(
+        path=f'/api/v1/provisioning/alert-rules/{alert["uid"]}'
+    )
+    if alert_snapshot is not None:
+        alert_snapshot.remove(alert=alert)
+
 def grafana_add_or_update_alert_rule(
     user: User,
     node: Node,
@@ -38,7 +195,8 @@ def grafana_add_or_update_alert_rule(
     folder_uid: str,
     resource_amount: int,
     allocation_amount: int | None = None,
-    existing_alert: dict | None = None
+    existing_alert: dict | None = None,
+    alert_snapshot: GrafanaAlertSnapshot | None = None
 ) -> None:
     """
     Adds alert rule to Grafana or updates existing one.
@@ -52,6 +210,9 @@ def grafana_add_or_update_alert_rule(
     :param existing_alert (dict): existing alert from Grafana to update 
         (alert can be passed in for update, so it doesn't have to be searched
         for again)
+    :param alert_snapshot (GrafanaAlertSnapshot | None): snapshot of alert
+        rules to search existing alert in and to update, alerts are fetched
+        from Grafana if not provided
     """
     if allocation_amount is not None:
         amount = allocation_amount
@@ -63,30 +224,15 @@ def grafana_add_or_update_alert_rule(
             return
     
     if not existing_alert:
-        # get existing user alerts from Grafana
-        try:
-            alerts = get_grafana_config(
-                '/api/v1/provisioning/alert-rules'
-            ).json()
-        except httpx.HTTPStatusError as e:
-            raise HTTPException(
-                status_code=500,
-                detail=f"Failed to get alerts for user {user.username} "
-                        "from Grafana!"
-            )
+        if alert_snapshot is None:
+            alert_snapshot = get_grafana_alert_snapshot()
         # find alert that matches the user, node, resource and notification
-        for alert in alerts:
-            al = alert.get('labels', {})
-            if al.get('username', None) != user.username:
-                continue
-            if al.get('notification_id', None) != str(notification.id):
-                continue
-            if al.get('node_id', None) != str(node.id):
-                continue
-            if al.get('resource_id', None) != str(resource.id):
-                continue
-            existing_alert = alert
-            break
+        existing_alert = alert_snapshot.get_alert(
+            username=user.username,
+            notification_id=notification.id,
+            node_id=node.id,
+            resource_id=resource.id
+        )
 
     contact_point_name = f'{user.username} contact point'
 
@@ -158,11 +304,11 @@ def grafana_add_or_update_alert_rule(
         path = '/api/v1/provisioning/alert-rules'
     
     try:
-        upload_grafana_config(
+        alert = upload_grafana_config(
             config=config,
             path=path,
             method=method
-        )
+        ).json()
     except httpx.HTTPStatusError as e:
         if existing_alert:
             raise HTTPException(
@@ -177,6 +323,11 @@ def grafana_add_or_update_alert_rule(
                        f"for user {user.username} in Grafana!"
             )
 
+    if alert_snapshot is not None:
+        if existing_alert:
+            alert_snapshot.remove(alert=existing_alert)
+        alert_snapshot.add(alert=alert)
+
 def get_tasks_at_timepoint(
     user: User,
     timepoint: datetime,
@@ -195,13 +346,13 @@ def get_tasks_at_timepoint(
         tasks = db_session.query(Task).with_for_update().filter(
             Task.status.in_([TaskStatus.running, TaskStatus.scheduled]),
             Task.owner_id == user.id,
-            Task.start_time <= timepoint
+            Task.during.overlaps(func.tsrange(timepoint, timepoint, '[]'))
         ).all()
     else:
         tasks = db_session.query(Task).filter(
             Task.status.in_([TaskStatus.running, TaskStatus.scheduled]),
             Task.owner_id == user.id,
-            Task.start_time <= timepoint
+            Task.during.overlaps(func.tsrange(timepoint, timepoint, '[]'))
         ).all()
 
     return tasks
@@ -232,9 +383,7 @@ def get_current_required_resources(user: User, db_session: Session) -> dict:
     :param db_session (Session): database session to use
     :return (dict): current required resources
     """
-    timepoint = datetime.now() + timedelta(
-        seconds=get_settings().task_scheduler_precision_seconds
-    )
+    timepoint = datetime.now()
     
     # get current tasks for given user
     tasks = get_tasks_at_timepoint(
@@ -247,60 +396,27 @@ def get_current_required_resources(user: User, db_session: Session) -> dict:
 
 def grafana_get_existing_user_alerts(
     user: User,
-    db_session: Session
+    db_session: Session,
+    alert_snapshot: GrafanaAlertSnapshot | None = None
 ) -> list[dict]:
     """
     Gets existing user alerts from Grafana.
     :param user (User): user to get alerts for
     :param db_session (Session): database session to use
+    :param alert_snapshot (GrafanaAlertSnapshot | None): snapshot of alert
+        rules, alerts are fetched from Grafana if not provided
     :return (list[dict]): existing user alerts from Grafana
     """
-    # get existing user alerts from Grafana
-    try:
-        alerts = get_grafana_config('/api/v1/provisioning/alert-rules').json()
-    except httpx.HTTPStatusError as e:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Failed to get alerts for user {user.username} "
-                    "from Grafana!"
-        )
-    user_alerts = list(filter(
-        lambda a: a.get('labels', {}).get('username', None) == user.username,
-        alerts
-    ))
-    return user_alerts
-
-def filter_existing_user_alert(
-    user_alerts: list[dict],
-    node_id: int,
-    resource_id: int,
-    notification_id: int
-) -> dict | None:
-    """
-    Filters existing user alert with given parameters from Grafana alerts.
-    :precondition: Existing alerts are already filtered by username.
-    :param user_alerts (list[dict]): existing user alerts from Grafana
-    :param node_id (int): node id to filter by
-    :param resource_id (int): resource id to filter by
-    :param notification_id (int): notification id to filter by
-    :return (dict|None): existing alert with given parameters
-    """
-    for alert in user_alerts:
-        al = alert.get('labels', {})
-        if al.get('notification_id', None) != str(notification_id):
-            continue
-        if al.get('node_id', None) != str(node_id):
-            continue
-        if al.get('resource_id', None) != str(resource_id):
-            continue
-        return alert
-    return None
+    if alert_snapshot is None:
+        alert_snapshot = get_grafana_alert_snapshot()
+    return alert_snapshot.get_user_alerts(username=user.username)
 
 def grafana_add_or_update_user_alerts(
     user: User,
     db_session: Session,
     timepoint: datetime = None,
-    lock_rows: bool = False
+    lock_rows: bool = False,
+    alert_snapshot: GrafanaAlertSnapshot | None = None
 ) -> list[HTTPException]:
     """
     Adds or updates Grafana alerts for given user. Also removes alerts that are
@@ -310,12 +426,12 @@ def grafana_add_or_update_user_alerts(
     :param timepoint (datetime): timepoint to get tasks for
         (to update alerts with correct resource amounts)
     :param lock_rows (bool): lock rows in database until update is finished
+    :param alert_snapshot (GrafanaAlertSnapshot | None): snapshot of alert
+        rules, alerts are fetched from Grafana if not provided
     :return (list[HTTPException]): list of errors
     """
     if timepoint is None:
-        timepoint = datetime.now() + timedelta(
-            seconds=get_settings().task_scheduler_precision_seconds
-        )
+        timepoint = datetime.now()
     
     # get alerts / notifications from db
     user_notifications = get_user_notifications_by_type(
@@ -335,9 +451,12 @@ def grafana_add_or_update_user_alerts(
     )
 
     # get existing user alerts from Grafana
+    if alert_snapshot is None:
+        alert_snapshot = get_grafana_alert_snapshot()
     user_alerts = grafana_get_existing_user_alerts(
         user=user,
-        db_session=db_session
+        db_session=db_session,
+        alert_snapshot=alert_snapshot
     )
 
     # get user alert folder from Grafana
@@ -358,8 +477,8 @@ def grafana_add_or_update_user_alerts(
             node = node_provides_resource.node
 
             # filter existing alert
-            existing_alert = filter_existing_user_alert(
-                user_alerts=user_alerts,
+            existing_alert = alert_snapshot.get_alert(
+                username=user.username,
                 node_id=node.id,
                 resource_id=resource.id,
                 notification_id=notification.id
@@ -389,7 +508,8 @@ def grafana_add_or_update_user_alerts(
                     folder_uid=folder['uid'],
                     resource_amount=node_provides_resource.amount,
                     allocation_amount=amount,
-                    existing_alert=existing_alert
+                    existing_alert=existing_alert,
+                    alert_snapshot=alert_snapshot
                 )
             except HTTPException as e:
                 if e not in errors:
@@ -405,8 +525,9 @@ def grafana_add_or_update_user_alerts(
     # remove alerts that are not assigned to user
     for alert in user_alerts:
         try:
-            remove_grafana_config(
-                path=f'/api/v1/provisioning/alert-rules/{alert["uid"]}'
+            grafana_remove_alert_rule(
+                alert=alert,
+                alert_snapshot=alert_snapshot
             )
         except httpx.HTTPStatusError as e:
             er = HTTPException(
@@ -422,29 +543,26 @@ def grafana_add_or_update_user_alerts(
     
     return errors
 
-def grafana_remove_all_user_alerts(user: User) -> None:
+def grafana_remove_all_user_alerts(
+    user: User,
+    alert_snapshot: GrafanaAlertSnapshot | None = None
+) -> None:
     """
     Removes all Grafana alerts for user.
     :param user (User): user to remove alerts for
+    :param alert_snapshot (GrafanaAlertSnapshot | None): snapshot of alert
+        rules, alerts are fetched from Grafana if not provided
     """
     # get user alerts
-    try:
-        alerts = get_grafana_config('/api/v1/provisioning/alert-rules').json()
-    except httpx.HTTPStatusError as e:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Failed to get alerts for user {user.username} "
-                    "in Grafana!"
-        )
+    if alert_snapshot is None:
+        alert_snapshot = get_grafana_alert_snapshot()
     
     # remove user alerts
-    for alert in alerts:
-        if alert.get('labels', {}).get('username', None) != user.username:
-            continue
-
+    for alert in alert_snapshot.get_user_alerts(username=user.username):
         try:
-            remove_grafana_config(
-                path=f'/api/v1/provisioning/alert-rules/{alert["uid"]}'
+            grafana_remove_alert_rule(
+                alert=alert,
+                alert_snapshot=alert_snapshot
             )
         except httpx.HTTPStatusError as e:
             raise HTTPException(
@@ -456,13 +574,16 @@ def grafana_remove_all_user_alerts(user: User) -> None:
 def grafana_add_alert_to_user(
     user: User,
     notification: Notification,
-    db_session: Session
+    db_session: Session,
+    alert_snapshot: GrafanaAlertSnapshot | None = None
 ) -> list[HTTPException]:
     """
     Adds alert to user in Grafana. Userful when new alert is assigned to user.
     :param user (User): user to add alert for
     :param notification (Notification): notification/alert to add
     :param db_session (Session): database session to use
+    :param alert_snapshot (GrafanaAlertSnapshot | None): snapshot of alert
+        rules, alerts are fetched from Grafana if not provided
     :return (list[HTTPException]): list of error messages
     """
     # check if notification is assigned to a resource
@@ -480,10 +601,8 @@ def grafana_add_alert_to_user(
         required_resources = {}
 
     # get existing user alerts from Grafana
-    user_alerts = grafana_get_existing_user_alerts(
-        user=user,
-        db_session=db_session
-    )
+    if alert_snapshot is None:
+        alert_snapshot = get_grafana_alert_snapshot()
 
     # get user alert folder from Grafana
     if notification.type == \
@@ -501,8 +620,8 @@ def grafana_add_alert_to_user(
         node = node_provides_resource.node
 
         # filter existing alert
-        existing_alert = filter_existing_user_alert(
-            user_alerts=user_alerts,
+        existing_alert = alert_snapshot.get_alert(
+            username=user.username,
             node_id=node.id,
             resource_id=resource.id,
             notification_id=notification.id
@@ -526,7 +645,8 @@ def grafana_add_alert_to_user(
                 folder_uid=folder['uid'],
                 resource_amount=node_provides_resource.amount,
                 allocation_amount=amount,
-                existing_alert=existing_alert
+                existing_alert=existing_alert,
+                alert_snapshot=alert_snapshot
             )
         except HTTPException as e:
             if e not in errors:
@@ -540,17 +660,23 @@ def grafana_add_alert_to_user(
 def grafana_remove_alert_from_user(
     user: User,
     notification: Notification,
-    db_session: Session
+    db_session: Session,
+    alert_snapshot: GrafanaAlertSnapshot | None = None
 ) -> None:
     """
     Removes alert from user in Grafana. Userful when alert is removed from user.
     :param user (User): user to remove alert for
     :param notification (Notification): notification/alert to remove
+    :param alert_snapshot (GrafanaAlertSnapshot | None): snapshot of alert
+        rules, alerts are fetched from Grafana if not provided
     """
     # get existing user alerts from Grafana
+    if alert_snapshot is None:
+        alert_snapshot = get_grafana_alert_snapshot()
     user_alerts = grafana_get_existing_user_alerts(
         user=user,
-        db_session=db_session
+        db_session=db_session,
+        alert_snapshot=alert_snapshot
     )
 
     for alert in user_alerts:
@@ -560,8 +686,9 @@ def grafana_remove_alert_from_user(
 
         # remove alert from user
         try:
-            remove_grafana_config(
-                path=f'/api/v1/provisioning/alert-rules/{alert["uid"]}'
+            grafana_remove_alert_rule(
+                alert=alert,
+                alert_snapshot=alert_snapshot
             )
         except httpx.HTTPStatusError as e:
             raise HTTPException(
@@ -572,12 +699,15 @@ def grafana_remove_alert_from_user(
 
 def update_grafana_alert_for_all_users_and_groups(
     notification: Notification,
-    db_session: Session
+    db_session: Session,
+    alert_snapshot: GrafanaAlertSnapshot | None = None
 ) -> list[HTTPException]:
     """
     Updates grafana alert based on notification.
     :param notification (Notification): notification with template to update
     :param db_session (Session): database session to use
+    :param alert_snapshot (GrafanaAlertSnapshot | None): snapshot of alert
+        rules, alerts are fetched from Grafana if not provided
     :return (list[HTTPException]): list of error messages
     """
     # get all users affected by notification
@@ -587,12 +717,15 @@ def update_grafana_alert_for_all_users_and_groups(
             if user not in users:
                 users.append(user)
     
+    if alert_snapshot is None:
+        alert_snapshot = get_grafana_alert_snapshot()
     errors = []
     for user in users:
         e = grafana_add_alert_to_user(
             notification=notification,
             user=user,
-            db_session=db_session
+            db_session=db_session,
+            alert_snapshot=alert_snapshot
         )
         for error in e:
             if error not in errors:
@@ -613,11 +746,13 @@ def grafana_remove_alert_for_group(
     """
     afected_users = get_members_including_subgroups(group=group)
     
+    alert_snapshot = get_grafana_alert_snapshot()
     for user in afected_users:
         grafana_remove_alert_from_user(
             user=user,
             notification=notification,
-            db_session=db_session
+            db_session=db_session,
+            alert_snapshot=alert_snapshot
         )
 
 def grafana_add_alert_to_group(
@@ -634,12 +769,14 @@ def grafana_add_alert_to_group(
     """
     afected_users = get_members_including_subgroups(group=group)
     
+    alert_snapshot = get_grafana_alert_snapshot()
     errors = []
     for user in afected_users:
         e = grafana_add_alert_to_user(
             user=user,
             notification=notification,
-            db_session=db_session
+            db_session=db_session,
+            alert_snapshot=alert_snapshot
         )
         for error in e:
             if error not in errors:
@@ -648,31 +785,28 @@ def grafana_add_alert_to_group(
     return errors
 
 def grafana_remove_alert(
-    notification: Notification
+    notification: Notification,
+    alert_snapshot: GrafanaAlertSnapshot | None = None
 ) -> None:
     """
     Removes alert from Grafana
     :param notification (Notification): notification/alert to remove
+    :param alert_snapshot (GrafanaAlertSnapshot | None): snapshot of alert
+        rules, alerts are fetched from Grafana if not provided
     """
     # get existing alert instances
-    try:
-        alerts = get_grafana_config('/api/v1/provisioning/alert-rules').json()
-    except httpx.HTTPStatusError as e:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Failed to get alerts from Grafana!"
-        )
-    alert_instances = list(filter(
-        lambda a: a.get('labels', {}).get('notification_id', None) == \
-            str(notification.id),
-        alerts
-    ))
+    if alert_snapshot is None:
+        alert_snapshot = get_grafana_alert_snapshot()
+    alert_instances = alert_snapshot.get_notification_alerts(
+        notification_id=notification.id
+    )
 
     # remove alert instances
     for alert in alert_instances:
         try:
-            remove_grafana_config(
-                path=f'/api/v1/provisioning/alert-rules/{alert["uid"]}'
+            grafana_remove_alert_rule(
+                alert=alert,
+                alert_snapshot=alert_snapshot
             )
         except httpx.HTTPStatusError as e:
             raise HTTPException(
@@ -683,33 +817,30 @@ def grafana_remove_alert(
 
 def grafana_remove_alert_for_node(
     node: Node,
-    notification: Notification
+    notification: Notification,
+    alert_snapshot: GrafanaAlertSnapshot | None = None
 ) -> None:
     """
     Removes alert for node.
     :param node (Node): node to remove alert for
     :param notification (Notification): notification/alert to remove
+    :param alert_snapshot (GrafanaAlertSnapshot | None): snapshot of alert
+        rules, alerts are fetched from Grafana if not provided
     """
     # get existing alerts
-    try:
-        alerts = get_grafana_config('/api/v1/provisioning/alert-rules').json()
-    except httpx.HTTPStatusError as e:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Failed to get alerts from Grafana!"
-        )
-    alert_instances = list(filter(
-        lambda a: a.get('labels', {}).get('notification_id', None) == \
-            str(notification.id) and \
-            a.get('labels', {}).get('node_id', None) == str(node.id),
-        alerts
-    ))
+    if alert_snapshot is None:
+        alert_snapshot = get_grafana_alert_snapshot()
+    alert_instances = alert_snapshot.get_notification_alerts(
+        notification_id=notification.id,
+        node_id=node.id
+    )
 
     # remove alert instances
     for alert in alert_instances:
         try:
-            remove_grafana_config(
-                path=f'/api/v1/provisioning/alert-rules/{alert["uid"]}'
+            grafana_remove_alert_rule(
+                alert=alert,
+                alert_snapshot=alert_snapshot
             )
         except httpx.HTTPStatusError as e:
             raise HTTPException(
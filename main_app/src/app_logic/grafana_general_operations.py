@@ -1,6 +1,98 @@
 import httpx
+from urllib.parse import urlparse
 from src.config import get_settings
 from fastapi import HTTPException
+from threading import Lock
+from datetime import datetime
+
+# All requests to Grafana API are sent using single process-wide client.
+# Client keeps pool of open (keep-alive) connections, so the connection
+# is not opened again for each request.
+GRAFANA_CLIENT: httpx.Client | None = None
+GRAFANA_CLIENT_LOCK = Lock()
+
+# Name of the Grafana service account used by the application
+GRAFANA_SERVICE_ACCOUNT_NAME = 'remas'
+
+# Path prefixes of Grafana server admin API, which does not accept
+# service account tokens (user lookup and update included)
+GRAFANA_SERVER_ADMIN_PATHS = (
+    '/api/admin/',
+    '/api/users/'
+)
+
+def is_grafana_server_admin_path(path: str) -> bool:
+    """
+    Checks if request path (possibly prefixed by Grafana URL subpath)
+    belongs to Grafana server admin API.
+    """
+    base_path = urlparse(get_settings().grafana_url).path.rstrip('/')
+    if base_path and path.startswith(base_path):
+        path = path[len(base_path):]
+    path = path.rstrip('/') + '/'
+    return any(path.startswith(prefix) for prefix in GRAFANA_SERVER_ADMIN_PATHS)
+
+class GrafanaAuth(httpx.Auth):
+    """
+    Authenticates requests to Grafana API with service account token,
+    so Grafana does not verify the password hash on each request.
+    Server admin API (/api/admin/..., /api/users/...) does not accept service
+    account tokens, basic auth is used for it and for all requests if token
+    is not set.
+    """
+    def __init__(self, token: str | None, username: str, password: str):
+        self.token = token
+        self.basic_auth = httpx.BasicAuth(username=username, password=password)
+
+    def auth_flow(self, request: httpx.Request):
+        if self.token and not is_grafana_server_admin_path(request.url.path):
+            request.headers['Authorization'] = f'Bearer {self.token}'
+            yield request
+        else:
+            yield from self.basic_auth.auth_flow(request)
+
+def init_grafana_client() -> None:
+    """
+    Initializes Grafana API client.
+    """
+    global GRAFANA_CLIENT
+    with GRAFANA_CLIENT_LOCK:
+        if GRAFANA_CLIENT is not None:
+            return
+        GRAFANA_CLIENT = httpx.Client(
+            auth=GrafanaAuth(
+                token=get_settings().grafana_token,
+                username=get_settings().grafana_username,
+                password=get_settings().grafana_password
+            ),
+            http2=get_settings().grafana_http2,
+            limits=httpx.Limits(
+                max_connections=get_settings().grafana_max_connections,
+                max_keepalive_connections=
+                    get_settings().grafana_max_keepalive_connections,
+                keepalive_expiry=get_settings().grafana_keepalive_seconds
+            ),
+            timeout=get_settings().grafana_timeout_seconds
+        )
+
+def close_grafana_client() -> None:
+    """
+    Closes Grafana API client and its connections.
+    """
+    global GRAFANA_CLIENT
+    with GRAFANA_CLIENT_LOCK:
+        if GRAFANA_CLIENT is not None:
+            GRAFANA_CLIENT.close()
+            GRAFANA_CLIENT = None
+
+def get_grafana_client() -> httpx.Client:
+    """
+    Grafana API client getter. Client is initialized on first use, if it
+    was not initialized on startup (e.g. in scripts).
+    """
+    if GRAFANA_CLIENT is None:
+        init_grafana_client()
+    return GRAFANA_CLIENT
 
 def join_url_path(*args) -> str:
     """
@@ -23,10 +115,9 @@ def upload_grafana_config(
     :param method (str): HTTP method (POST, GET, etc.) (default: POST)
     :return (httpx.Response): response
     """
-    response = httpx.request(
+    response = get_grafana_client().request(
         method=method,
         url=join_url_path(get_settings().grafana_url, path),
-        auth=(get_settings().grafana_username, get_settings().grafana_password),
         json=config
     )
     # Raise error with response message if error has occured
@@ -38,10 +129,9 @@ def remove_grafana_config(path: str) -> None:
     Removes configured entity (like alert rule, dashboard, etc.) from Grafana.
     :param path (str): path to given entity
     """
-    response = httpx.request(
+    response = get_grafana_client().request(
         method='DELETE',
-        url=join_url_path(get_settings().grafana_url, path),
-        auth=(get_settings().grafana_username, get_settings().grafana_password)
+        url=join_url_path(get_settings().grafana_url, path)
     )
     response.raise_for_status()
 
@@ -51,15 +141,66 @@ def get_grafana_config(path: str) -> httpx.Response:
     :param path (str): path on Grafana instance API
     :return (httpx.Response): response
     """
-    response = httpx.request(
+    response = get_grafana_client().request(
         method='GET',
-        url=join_url_path(get_settings().grafana_url, path),
-        auth=(get_settings().grafana_username, get_settings().grafana_password),
+        url=join_url_path(get_settings().grafana_url, path)
     )
     # Raise error with response message if error has occured
     response.raise_for_status()
     return response
 
+def grafana_create_service_account_token() -> str:
+    """
+    Creates token of the application service account in Grafana. Service
+    account is created with Admin role, if it does not exist. Requests are
+    authenticated with basic auth, because the token is not set yet.
+    :return (str): service account token
+    """
+    basic_auth = (
+        get_settings().grafana_username,
+        get_settings().grafana_password
+    )
+    response = get_grafana_client().get(
+        url=join_url_path(
+            get_settings().grafana_url,
+            '/api/serviceaccounts/search'
+        ),
+        params={'query': GRAFANA_SERVICE_ACCOUNT_NAME},
+        auth=basic_auth
+    )
+    response.raise_for_status()
+    accounts = [
+        account for account in response.json().get('serviceAccounts', [])
+        if account.get('name') == GRAFANA_SERVICE_ACCOUNT_NAME
+    ]
+    if accounts:
+        account_id = accounts[0]['id']
+    else:
+        response = get_grafana_client().post(
+            url=join_url_path(
+                get_settings().grafana_url,
+                '/api/serviceaccounts'
+            ),
+            json={'name': GRAFANA_SERVICE_ACCOUNT_NAME, 'role': 'Admin'},
+            auth=basic_auth
+        )
+        response.raise_for_status()
+        account_id = response.json()['id']
+
+    response = get_grafana_client().post(
+        url=join_url_path(
+            get_settings().grafana_url,
+            f'/api/serviceaccounts/{account_id}/tokens'
+        ),
+        json={
+            'name': f'{GRAFANA_SERVICE_ACCOUNT_NAME}-'
+                    f'{datetime.now().strftime("%Y%m%d%H%M%S")}'
+        },
+        auth=basic_auth
+    )
+    response.raise_for_status()
+    return response.json()['key']
+
 def get_folders_from_grafana(folder_names: list[str]) -> list[dict]:
     """
     Gets folders with given names from Grafana.
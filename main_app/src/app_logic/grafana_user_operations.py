@@ -16,7 +16,8 @@ from src.app_logic.grafana_general_operations import (
 from src.app_logic.grafana_alert_operations import (
     grafana_add_or_update_user_alerts,
     grafana_remove_all_user_alerts,
-    get_alert_error
+    get_alert_error,
+    GrafanaAlertSnapshot
 )
 
 
@@ -218,13 +219,16 @@ def grafana_remove_user_contact_point(user: User) -> None:
 def grafana_create_or_update_user(
     user: User,
     db_session: Session,
-    password: str | None = None
+    password: str | None = None,
+    alert_snapshot: GrafanaAlertSnapshot | None = None
 ) -> list[HTTPException]:
     """
     Creates Grafana user or updates existing user.
     :param user (User): user to create Grafana user for
     :param db_session (Session): database session to use
     :param password (str): password for Grafana user
+    :param alert_snapshot (GrafanaAlertSnapshot | None): snapshot of alert
+        rules, alerts are fetched from Grafana if not provided
     :return (list[HTTPException]): list of errors if some alerts failed
     """
     ### Crate user in grafana
@@ -308,7 +312,11 @@ def grafana_create_or_update_user(
     grafana_add_or_update_user_folders(user=user, user_grafana_id=grafana_user_id)
 
     ### Create default user alerts
-    errors = grafana_add_or_update_user_alerts(user=user, db_session=db_session)
+    errors = grafana_add_or_update_user_alerts(
+        user=user,
+        db_session=db_session,
+        alert_snapshot=alert_snapshot
+    )
     
     return errors
 
@@ -0,0 +1,404 @@
+from src.db.models import Group, GroupClosure, User, Limit
+from sqlmodel import select, Session
+from sqlalchemy import (
+    literal,
+    exists,
+    insert,
+    delete,
+    text,
+    union_all,
+    true,
+    CTE,
+    FromClause,
+    Select
+)
+from sqlalchemy.orm import selectinload
+from src.config import get_settings
+
+# Group hierarchy resolution. Ancestors and descendants of a group are
+# resolved with a single query instead of walking the tree one lazy-loaded
+# parent/child at a time. Depending on group_hierarchy_mode setting, query
+# uses recursive CTE or group closure table (GroupClosure).
+# Each selected row contains group id and its distance (depth) from
+# the starting group, starting group has depth 0.
+#
+# Closure table is maintained in both modes, so the mode can be switched
+# without rebuilding it.
+
+# Maximal depth of the group hierarchy. Protects recursive queries from
+# infinite recursion if the hierarchy contains a cycle.
+MAX_GROUP_DEPTH = 100
+
+# Id of the admin group, members of this group and its subgroups are admins
+ADMIN_GROUP_ID = 2
+
+
+def get_group_ancestors_cte(group_id: int) -> CTE:
+    """
+    Returns recursive CTE selecting group and all its ancestors.
+    :param group_id (int): id of the starting group
+    :return (CTE): CTE with columns id, parent_id and depth
+    """
+    ancestors = select(
+        Group.id,
+        Group.parent_id,
+        literal(0).label("depth")
+    ).where(
+        Group.id == group_id
+    ).cte(name="group_ancestors", recursive=True)
+
+    return ancestors.union_all(
+        select(
+            Group.id,
+            Group.parent_id,
+            (ancestors.c.depth + 1).label("depth")
+        ).join(
+            ancestors, Group.id == ancestors.c.parent_id
+        ).where(
+            ancestors.c.depth < MAX_GROUP_DEPTH
+        )
+    )
+
+def get_group_descendants_cte(group_id: int) -> CTE:
+    """
+    Returns recursive CTE selecting group and all its descendants.
+    :param group_id (int): id of the starting group
+    :return (CTE): CTE with columns id and depth
+    """
+    descendants = select(
+        Group.id,
+        literal(0).label("depth")
+    ).where(
+        Group.id == group_id
+    ).cte(name="group_descendants", recursive=True)
+
+    return descendants.union_all(
+        select(
+            Group.id,
+            (descendants.c.depth + 1).label("depth")
+        ).join(
+            descendants, Group.parent_id == descendants.c.id
+        ).where(
+            descendants.c.depth < MAX_GROUP_DEPTH
+        )
+    )
+
+def use_group_closure() -> bool:
+    """
+    Returns True if group hierarchy is resolved using closure table.
+    """
+    return get_settings().group_hierarchy_mode == 'closure'
+
+def get_group_ancestors_selectable(group_id: int) -> FromClause:
+    """
+    Returns selectable with group and all its ancestors.
+    :param group_id (int): id of the starting group
+    :return (FromClause): selectable with columns id and depth
+    """
+    if not use_group_closure():
+        return get_group_ancestors_cte(group_id=group_id)
+    return select(
+        GroupClosure.ancestor_id.label("id"),
+        GroupClosure.depth
+    ).where(
+        GroupClosure.descendant_id == group_id
+    ).subquery(name="group_ancestors")
+
+def get_group_descendants_selectable(group_id: int) -> FromClause:
+    """
+    Returns selectable with group and all its descendants.
+    :param group_id (int): id of the starting group
+    :return (FromClause): selectable with columns id and depth
+    """
+    if not use_group_closure():
+        return get_group_descendants_cte(group_id=group_id)
+    return select(
+        GroupClosure.descendant_id.label("id"),
+        GroupClosure.depth
+    ).where(
+        GroupClosure.ancestor_id == group_id
+    ).subquery(name="group_descendants")
+
+def remove_duplicates(entities: list) -> list:
+    """
+    Removes duplicate entities (groups reached multiple times because
+    of a cycle in the hierarchy) and keeps the first occurrence.
+    :param entities (list): database entities
+    :return (list): entities without duplicates
+    """
+    unique_entities = []
+    seen_ids = set()
+    for entity in entities:
+        if entity.id not in seen_ids:
+            seen_ids.add(entity.id)
+            unique_entities.append(entity)
+    return unique_entities
+
+def get_group_ancestors(
+    group_id: int,
+    db_session: Session,
+    load_limits: bool = False,
+    load_notifications: bool = False
+) -> list[Group]:
+    """
+    Returns group and all its ancestors ordered from the group to the root.
+    :param group_id (int): id of the starting group
+    :param db_session (Session): database session
+    :param load_limits (bool): load limits (including nodes) of the groups
+    :param load_notifications (bool): load notifications of the groups
+    :return (list[Group]): groups ordered by depth, empty if group
+        does not exist
+    """
+    ancestors = get_group_ancestors_selectable(group_id=group_id)
+    options = []
+    if load_limits:
+        options.append(selectinload(Group.limits).selectinload(Limit.nodes))
+    if load_notifications:
+        options.append(selectinload(Group.notifications))
+
+    groups = db_session.scalars(
+        select(Group).join(
+            ancestors, Group.id == ancestors.c.id
+        ).options(*options).order_by(ancestors.c.depth)
+    ).all()
+    return remove_duplicates(entities=groups)
+
+def get_group_descendants(group_id: int, db_session: Session) -> list[Group]:
+    """
+    Returns group and all its descendants ordered by depth.
+    :param group_id (int): id of the starting group
+    :param db_session (Session): database session
+    :return (list[Group]): groups ordered by depth
+    """
+    descendants = get_group_descendants_selectable(group_id=group_id)
+    groups = db_session.scalars(
+        select(Group).join(
+            descendants, Group.id == descendants.c.id
+        ).order_by(descendants.c.depth)
+    ).all()
+    return remove_duplicates(entities=groups)
+
+def get_group_descendant_members(
+    group_id: int,
+    db_session: Session
+) -> list[User]:
+    """
+    Returns members of group and all its descendants. Members of the group
+    are returned first, followed by members of the subgroups.
+    :param group_id (int): id of the starting group
+    :param db_session (Session): database session
+    :return (list[User]): users
+    """
+    descendants = get_group_descendants_selectable(group_id=group_id)
+    users = db_session.scalars(
+        select(User).join(
+            descendants, User.group_id == descendants.c.id
+        ).order_by(descendants.c.depth, User.id)
+    ).all()
+    return remove_duplicates(entities=users)
+
+def get_group_member_ids_select(group_id: int) -> Select:
+    """
+    Returns query selecting ids of members of group and all its descendants.
+    Can be used as a subquery, e.g. in IN clause.
+    :param group_id (int): id of the starting group
+    :return (Select): query selecting user ids
+    """
+    descendants = get_group_descendants_selectable(group_id=group_id)
+    return select(User.id).join(
+        descendants, User.group_id == descendants.c.id
+    )
+
+def is_group_descendant_of(
+    group_id: int,
+    ancestor_id: int,
+    db_session: Session
+) -> bool:
+    """
+    Checks if group is the ancestor group or one of its descendants.
+    :param group_id (int): id of the checked group
+    :param ancestor_id (int): id of the ancestor group
+    :param db_session (Session): database session
+    :return (bool): True if group inherits from the ancestor group
+    """
+    ancestors = get_group_ancestors_selectable(group_id=group_id)
+    return db_session.scalar(
+        select(exists().where(ancestors.c.id == ancestor_id))
+    )
+
+def add_group_closure(
+    group_id: int,
+    parent_id: int | None,
+    db_session: Session
+) -> None:
+    """
+    Adds closure rows of newly created group. Changes are not committed.
+    :param group_id (int): id of the new group
+    :param parent_id (int | None): id of the parent group
+    :param db_session (Session): database session
+    """
+    rows = [select(
+        literal(group_id),
+        literal(group_id),
+        literal(0)
+    )]
+    if parent_id is not None:
+        rows.append(select(
+            GroupClosure.ancestor_id,
+            literal(group_id),
+            GroupClosure.depth + 1
+        ).where(
+            GroupClosure.descendant_id == parent_id
+        ))
+    db_session.execute(
+        insert(GroupClosure).from_select(
+            ['ancestor_id', 'descendant_id', 'depth'],
+            union_all(*rows)
+        )
+    )
+
+def move_group_closure(
+    group_id: int,
+    parent_id: int,
+    db_session: Session
+) -> None:
+    """
+    Updates closure rows when group (with its subtree) is moved under new
+    parent. Changes are not committed.
+    :param group_id (int): id of the moved group
+    :param parent_id (int): id of the new parent group
+    :param db_session (Session): database session
+    """
+    subtree = select(GroupClosure.descendant_id).where(
+        GroupClosure.ancestor_id == group_id
+    )
+    old_ancestors = select(GroupClosure.ancestor_id).where(
+        GroupClosure.descendant_id == group_id,
+        GroupClosure.depth > 0
+    )
+    db_session.execute(
+        delete(GroupClosure).where(
+            GroupClosure.descendant_id.in_(subtree),
+            GroupClosure.ancestor_id.in_(old_ancestors)
+        )
+    )
+
+    new_ancestors = select(
+        GroupClosure.ancestor_id,
+        GroupClosure.depth
+    ).where(
+        GroupClosure.descendant_id == parent_id
+    ).subquery()
+    descendants = select(
+        GroupClosure.descendant_id,
+        GroupClosure.depth
+    ).where(
+        GroupClosure.ancestor_id == group_id
+    ).subquery()
+    db_session.execute(
+        insert(GroupClosure).from_select(
+            ['ancestor_id', 'descendant_id', 'depth'],
+            select(
+                new_ancestors.c.ancestor_id,
+                descendants.c.descendant_id,
+                new_ancestors.c.depth + descendants.c.depth + 1
+            ).join(descendants, true())
+        )
+    )
+
+def move_group_children(
+    group_id: int,
+    parent_id: int,
+    db_session: Session
+) -> None:
+    """
+    Moves child groups (with their subtrees) of the group under new parent,
+    so the group can be deleted without leaving orphaned subgroups or stale
+    closure rows. Changes are not committed.
+    :param group_id (int): id of the group whose children are moved
+    :param parent_id (int): id of the new parent group
+    :param db_session (Session): database session
+    """
+    children = db_session.scalars(
+        select(Group).where(Group.parent_id == group_id)
+    ).all()
+    for child in children:
+        child.parent_id = parent_id
+        move_group_closure(
+            group_id=child.id,
+            parent_id=parent_id,
+            db_session=db_session
+        )
+
+def get_expected_group_closure() -> CTE:
+    """
+    Returns recursive CTE computing closure rows of all groups
+    from group parent references.
+    :return (CTE): CTE with columns ancestor_id, descendant_id and depth
+    """
+    closure = select(
+        Group.id.label("ancestor_id"),
+        Group.id.label("descendant_id"),
+        literal(0).label("depth")
+    ).cte(name="expected_group_closure", recursive=True)
+
+    return closure.union_all(
+        select(
+            closure.c.ancestor_id,
+            Group.id,
+            (closure.c.depth + 1).label("depth")
+        ).join(
+            closure, Group.parent_id == closure.c.descendant_id
+        ).where(
+            closure.c.depth < MAX_GROUP_DEPTH
+        )
+    )
+
+def rebuild_group_closure(db_session: Session) -> None:
+    """
+    Recomputes group closure table from group parent references.
+    :param db_session (Session): database session
+    """
+    db_session.execute(
+        text(f'LOCK TABLE {GroupClosure.__tablename__} IN EXCLUSIVE MODE')
+    )
+    db_session.execute(delete(GroupClosure))
+    closure = get_expected_group_closure()
+    db_session.execute(
+        insert(GroupClosure).from_select(
+            ['ancestor_id', 'descendant_id', 'depth'],
+            select(
+                closure.c.ancestor_id,
+                closure.c.descendant_id,
+                closure.c.depth
+            )
+        )
+    )
+    db_session.commit()
+
+def check_group_closure(db_session: Session) -> list[str]:
+    """
+    Compares group closure table with closure computed from group parent
+    references.
+    :param db_session (Session): database session
+    :return (list[str]): list of differences, empty if closure table
+        is consistent
+    """
+    closure = get_expected_group_closure()
+    expected = {
+        (row.ancestor_id, row.descendant_id): row.depth
+        for row in db_session.execute(select(closure)).all()
+    }
+    stored = {
+        (row.ancestor_id, row.descendant_id): row.depth
+        for row in db_session.scalars(select(GroupClosure)).all()
+    }
+    differences = []
+    for key in sorted(set(expected.keys()) | set(stored.keys())):
+        if expected.get(key) != stored.get(key):
+            differences.append(
+                f"Ancestor {key[0]}, descendant {key[1]}: "
+                f"expected depth {expected.get(key)}, "
+                f"stored depth {stored.get(key)}"
+            )
+    return differences
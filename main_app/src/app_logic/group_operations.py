@@ -9,10 +9,25 @@ from sqlmodel import select, Session
 from sqlalchemy.exc import IntegrityError
 from fastapi import HTTPException, status
 from src.app_logic.grafana_user_operations import grafana_create_or_update_user
-from src.app_logic.grafana_alert_operations import get_alert_error
+from src.app_logic.grafana_alert_operations import (
+    get_alert_error,
+    get_grafana_alert_snapshot
+)
 from src.app_logic.auxiliary_operations import (
     get_members_including_subgroups
 )
+from src.app_logic.limit_operations import invalidate_effective_limits_cache
+from src.app_logic.quota_operations import (
+    remove_users_group_quota_usage,
+    add_users_group_quota_usage,
+    remove_group_quota_usage
+)
+from src.app_logic.group_hierarchy import (
+    add_group_closure,
+    move_group_closure,
+    move_group_children,
+    is_group_descendant_of
+)
 
 def create_group(
     group: Group,
@@ -35,6 +50,12 @@ def create_group(
 
     try:
         db_session.add(group)
+        db_session.flush()
+        add_group_closure(
+            group_id=group.id,
+            parent_id=group.parent_id,
+            db_session=db_session
+        )
         db_session.commit()
     except IntegrityError as e:
         raise HTTPException(
@@ -113,17 +134,43 @@ def delete_group(group_id: int, db_session: Session) -> None:
             detail=f"Group with id {group_id} not found!"
         )
     users = get_members_including_subgroups(group=db_group)
+    # group quota usage includes usage of all subgroup members
+    usage_changes = remove_users_group_quota_usage(
+        user_ids=[user.id for user in users],
+        db_session=db_session
+    )
     gid = 3  # User group
     if db_group.parent_id:
         gid = db_group.parent_id
     for user in db_group.members:
         user.group_id = gid
-    db_session.commit()
+    # subgroups are moved to the same group as members
+    move_group_children(
+        group_id=group_id,
+        parent_id=gid,
+        db_session=db_session
+    )
+    db_session.flush()
+    # remaining closure rows of the group are removed by cascade, group is
+    # expired so its moved members and children are reloaded before delete
+    db_session.expire(db_group)
     db_session.delete(db_group)
+    db_session.flush()
+    add_users_group_quota_usage(
+        usage_changes=usage_changes,
+        db_session=db_session
+    )
+    remove_group_quota_usage(group_id=group_id, db_session=db_session)
+    invalidate_effective_limits_cache(session=db_session)
     db_session.commit()
     # update Grafana alerts for users and subgroups
+    alert_snapshot = get_grafana_alert_snapshot()
     for user in users:
-        grafana_create_or_update_user(user=user, db_session=db_session)
+        grafana_create_or_update_user(
+            user=user,
+            db_session=db_session,
+            alert_snapshot=alert_snapshot
+        )
 
 def add_user_to_group(
     request: UserGroupChangeRequest,
@@ -144,7 +191,17 @@ def add_user_to_group(
             status_code=404,
             detail=f"User with id {request.user_id} not found!"
         )
+    usage_changes = remove_users_group_quota_usage(
+        user_ids=[user.id],
+        db_session=db_session
+    )
     group.members.append(user)
+    db_session.flush()
+    add_users_group_quota_usage(
+        usage_changes=usage_changes,
+        db_session=db_session
+    )
+    invalidate_effective_limits_cache(session=db_session)
     db_session.commit()
     db_session.refresh(group)
     # update user in Grafana
@@ -180,14 +237,41 @@ def change_group_parent(
             status_code=403,
             detail="Cannot change default groups!"
         )
+    if is_group_descendant_of(
+        group_id=request.parent_id,
+        ancestor_id=request.group_id,
+        db_session=db_session
+    ):
+        raise HTTPException(
+            status_code=400,
+            detail="Cannot change group parent to its subgroup!"
+        )
+    users = get_members_including_subgroups(group=group)
+    # group quota usage includes usage of all subgroup members
+    usage_changes = remove_users_group_quota_usage(
+        user_ids=[user.id for user in users],
+        db_session=db_session
+    )
     group.parent_id = request.parent_id
+    move_group_closure(
+        group_id=request.group_id,
+        parent_id=request.parent_id,
+        db_session=db_session
+    )
+    db_session.flush()
+    add_users_group_quota_usage(
+        usage_changes=usage_changes,
+        db_session=db_session
+    )
+    invalidate_effective_limits_cache(session=db_session)
     db_session.commit()
     db_session.refresh(group)
     # update Grafana alerts for users and subgroups
-    users = get_members_including_subgroups(group=group)
+    alert_snapshot = get_grafana_alert_snapshot()
     for user in users:
         grafana_create_or_update_user(
             user=user,
-            db_session=db_session
+            db_session=db_session,
+            alert_snapshot=alert_snapshot
         )
     return group
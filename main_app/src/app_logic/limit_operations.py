@@ -1,10 +1,38 @@
-from src.db.models import Limit, User, Group, Node, Resource
+from src.db.models import Limit, User, Group, Node, Resource, CacheGeneration
 from sqlmodel import select, Session
 from src.schemas.limit_entities import LimitRequest, LimitResponse
 from fastapi import HTTPException, status
 from sqlalchemy.exc import NoResultFound, IntegrityError
 from src.schemas.authentication_entities import CurrentUserInfo
 from src.app_logic.authentication import insufficientPermissionsException
+from src.app_logic.group_hierarchy import get_group_ancestors
+from sqlalchemy.dialects.postgresql import insert
+from threading import Lock
+
+# Cache of resolved effective limits used by task admission. Limits are stored
+# as LimitResponse, so they can be shared between database sessions.
+# Cache is invalidated as a whole whenever limits or group hierarchy change.
+# Generation of the cache is stored in database and incremented in the same
+# transaction as the change, so caches of all processes (API workers, event
+# processor) are invalidated, not only the cache of the changing process.
+#
+# Structure format:
+# {
+#     user_id: {
+#         resource_id: {
+#             node_id: LimitResponse
+#         }
+#     }
+# }
+EFFECTIVE_LIMITS_CACHE: dict[int, dict[int, dict[int, LimitResponse]]] = {}
+# Shared limits of user groups by user id
+SHARED_LIMITS_CACHE: dict[int, list[LimitResponse]] = {}
+# Database generation the cache was filled at, limits resolved at another
+# generation are not stored into the cache.
+EFFECTIVE_LIMITS_CACHE_GENERATION: int = 0
+EFFECTIVE_LIMITS_CACHE_LOCK = Lock()
+# Name of the CacheGeneration row of limits cache
+LIMITS_CACHE_NAME = 'limits'
 
 def get_limit_response(limit: Limit) -> LimitResponse:
     """
@@ -18,7 +46,8 @@ def get_limit_response(limit: Limit) -> LimitResponse:
         user_id=limit.user_id,
         group_id=limit.group_id,
         resource_id=limit.resource_id,
-        node_ids=[node.id for node in limit.nodes]
+        node_ids=[node.id for node in limit.nodes],
+        shared=limit.shared
     )
 
 def get_all_limits(session: Session) -> list[LimitResponse]:
@@ -85,6 +114,11 @@ def add_limit(limit: LimitRequest, session: Session) -> LimitResponse:
             status_code=400,
             detail="Limit must have either user_id or group_id specified!"
         )
+    if limit.shared and not limit.group_id:
+        raise HTTPException(
+            status_code=400,
+            detail="Only group limit can be shared!"
+        )
     user = session.scalars(select(User).where(User.id == limit.user_id)).first()
     group = session.scalars(
         select(Group).where(Group.id == limit.group_id)
@@ -121,10 +155,12 @@ def add_limit(limit: LimitRequest, session: Session) -> LimitResponse:
         user=user,
         group=group,
         resource=resource,
-        nodes=nodes
+        nodes=nodes,
+        shared=limit.shared
     )
     try:
         session.add(new_limit)
+        invalidate_effective_limits_cache(session=session)
         session.commit()
     except IntegrityError as e:
         raise HTTPException(
@@ -154,9 +190,15 @@ def update_limit(limit: LimitRequest, session: Session) -> LimitResponse:
             status_code=400,
             detail="Limit must have either user or group specified!"
         )
+    if limit.shared and not limit.group_id:
+        raise HTTPException(
+            status_code=400,
+            detail="Only group limit can be shared!"
+        )
     db_limit.name = limit.name
     db_limit.description = limit.description
     db_limit.amount = limit.amount
+    db_limit.shared = limit.shared
 
     if limit.user_id:
         try:
@@ -201,6 +243,7 @@ def update_limit(limit: LimitRequest, session: Session) -> LimitResponse:
     db_limit.nodes = nodes
     db_limit.resource = resource
     try:
+        invalidate_effective_limits_cache(session=session)
         session.commit()
     except IntegrityError as e:
         raise HTTPException(
@@ -225,6 +268,7 @@ def remove_limit(limit_id: int, session: Session) -> None:
             detail=f"Limit with id {limit_id} not found!"
         )
     session.delete(limit)
+    invalidate_effective_limits_cache(session=session)
     session.commit()
 
 def get_limit_dict(entity_limits: list[Limit]) -> dict[int, dict[int, Limit]]:
@@ -235,6 +279,8 @@ def get_limit_dict(entity_limits: list[Limit]) -> dict[int, dict[int, Limit]]:
     """
     limits = {}
     for limit in entity_limits:
+        if limit.shared:  # shared limits are not inherited
+            continue
         for node in limit.nodes:
             if limit.resource_id not in limits:
                 limits[limit.resource_id] = {}
@@ -281,27 +327,25 @@ def get_all_group_limits_dict(
     :param session (Session): database session
     :return (dict[int, dict[int, Limit]]): group limits by resource
     """
-    try:
-        group = session.scalars(select(Group).where(Group.id == group_id)).one()
-    except NoResultFound:
+    groups = get_group_ancestors(
+        group_id=group_id,
+        db_session=session,
+        load_limits=True
+    )
+    if not groups:
         raise HTTPException(
             status_code=404,
             detail=f"Group with id {group_id} not found!"
         )
 
-    if group.parent_id:
-        parent_limits = get_all_group_limits_dict(
-            group_id=group.parent_id,
-            session=session
+    # merge from the root group, so limits of subgroups take priority
+    limits = {}
+    for group in reversed(groups):
+        limits = merge_limit_dicts(
+            parent_limits=limits,
+            child_limits=get_limit_dict(entity_limits=group.limits)
         )
-    else:
-        parent_limits = {}
-
-    limits = get_limit_dict(entity_limits=group.limits)
-    return merge_limit_dicts(
-        parent_limits=parent_limits,
-        child_limits=limits
-    )
+    return limits
 
 def get_all_user_limits_dict(
     user_id: int,
@@ -335,6 +379,120 @@ def get_all_user_limits_dict(
         child_limits=limits
     )
 
+def invalidate_effective_limits_cache(session: Session) -> None:
+    """
+    Invalidates resolved effective limits in caches of all processes
+    by incrementing generation of the cache in database.
+    Must be called in the transaction changing limits or group hierarchy,
+    before it is committed.
+    :param session (Session): database session
+    """
+    statement = insert(CacheGeneration).values(
+        name=LIMITS_CACHE_NAME,
+        generation=1
+    )
+    session.execute(statement.on_conflict_do_update(
+        index_elements=['name'],
+        set_={'generation': CacheGeneration.generation + 1}
+    ))
+
+def sync_effective_limits_cache(session: Session) -> int:
+    """
+    Clears the cache if limits were changed (by any process) since the cache
+    was filled.
+    :param session (Session): database session
+    :return (int): current generation of the cache
+    """
+    global EFFECTIVE_LIMITS_CACHE, EFFECTIVE_LIMITS_CACHE_GENERATION
+    global SHARED_LIMITS_CACHE
+    generation = session.scalar(
+        select(CacheGeneration.generation).where(
+            CacheGeneration.name == LIMITS_CACHE_NAME
+        )
+    ) or 0
+    with EFFECTIVE_LIMITS_CACHE_LOCK:
+        if generation != EFFECTIVE_LIMITS_CACHE_GENERATION:
+            EFFECTIVE_LIMITS_CACHE = {}
+            SHARED_LIMITS_CACHE = {}
+            EFFECTIVE_LIMITS_CACHE_GENERATION = generation
+    return generation
+
+def get_effective_user_limits(
+    user_id: int,
+    session: Session
+) -> dict[int, dict[int, LimitResponse]]:
+    """
+    Returns effective user limits (see get_all_user_limits_dict) from cache.
+    On cache miss, limits are resolved from user and its group chain
+    and stored into the cache.
+    Returned structure is shared and must not be modified.
+    :param user_id (int): user id
+    :param session (Session): database session
+    :return (dict[int, dict[int, LimitResponse]]): user limits by resource
+        and node
+    """
+    generation = sync_effective_limits_cache(session=session)
+    with EFFECTIVE_LIMITS_CACHE_LOCK:
+        limits = EFFECTIVE_LIMITS_CACHE.get(user_id)
+    if limits is not None:
+        return limits
+
+    limits = {
+        resource_id: {
+            node_id: get_limit_response(limit=limit)
+            for node_id, limit in nodes.items()
+        }
+        for resource_id, nodes in get_all_user_limits_dict(
+            user_id=user_id,
+            session=session
+        ).items()
+    }
+
+    with EFFECTIVE_LIMITS_CACHE_LOCK:
+        if generation == EFFECTIVE_LIMITS_CACHE_GENERATION:
+            EFFECTIVE_LIMITS_CACHE[user_id] = limits
+    return limits
+
+def get_shared_user_limits(
+    user_id: int,
+    session: Session
+) -> list[LimitResponse]:
+    """
+    Returns shared limits of user group and its ancestors from cache.
+    On cache miss, limits are loaded and stored into the cache.
+    Returned list is shared and must not be modified.
+    :param user_id (int): user id
+    :param session (Session): database session
+    :return (list[LimitResponse]): shared group limits
+    """
+    generation = sync_effective_limits_cache(session=session)
+    with EFFECTIVE_LIMITS_CACHE_LOCK:
+        limits = SHARED_LIMITS_CACHE.get(user_id)
+    if limits is not None:
+        return limits
+
+    user = session.get(User, user_id)
+    if not user:
+        raise HTTPException(
+            status_code=404,
+            detail=f"User with id {user_id} not found!"
+        )
+    limits = [
+        get_limit_response(limit=limit)
+        for group in get_group_ancestors(
+            group_id=user.group_id,
+            db_session=session,
+            load_limits=True
+        )
+        for limit in group.limits
+        if limit.shared
+    ]
+
+    with EFFECTIVE_LIMITS_CACHE_LOCK:
+        if generation == EFFECTIVE_LIMITS_CACHE_GENERATION:
+            SHARED_LIMITS_CACHE[user_id] = limits
+    return limits
+
 def get_all_group_limits_list(
     group_id: int,
     current_user: CurrentUserInfo,
@@ -0,0 +1,310 @@
+from src.config import get_settings
+from src.schemas.notification_entities import NotificationEmail
+from src.db.models import EmailOutbox, EmailStatus
+from src.db.connection import get_db_engine
+from sqlmodel import select, Session
+from datetime import datetime, timedelta
+from threading import Thread, Event as ThreadEvent
+import redmail
+import smtplib
+import functools
+import logging
+import traceback
+
+# Notification emails are sent in batches. All emails of the batch are sent
+# over a single SMTP connection, so the connection (including TLS handshake
+# and authentication) is opened once per batch instead of once per email.
+# Broken connection is reopened and the failed email is sent again. If the
+# connection can't be opened (server is not available, handshake or
+# authentication failed), rest of the batch is not sent.
+#
+# Notification emails are not sent by event processing directly. They are
+# written to the outbox table (EmailOutbox) in the event processing
+# transaction and sent by pool of mail worker threads. Each worker claims
+# a batch of pending emails with FOR UPDATE SKIP LOCKED, so workers (also
+# in other processes) never send the same email. Failed emails are retried
+# with exponentially growing delay until MAIL_MAX_ATTEMPTS is reached.
+
+# Number of attempts to send an email
+MAIL_SEND_ATTEMPTS = 2
+
+
+def is_smtp_configured() -> bool:
+    """
+    Checks if sending emails is enabled and configured. Logs the reason
+    if emails cannot be sent.
+    :return (bool): True if emails can be sent
+    """
+    if not get_settings().smtp_enabled:
+        logging.warning(
+            "SMTP is not enabled, notification will not be sent!"
+        )
+        return False
+    if not (
+        get_settings().smtp_user and
+        get_settings().smtp_password and
+        get_settings().smtp_from_address
+    ):
+        logging.error(
+            "SMTP is enabled, but SMTP_USER, SMTP_PASSWORD "
+            "or SMTP_FROM_ADDRESS is not set! "
+            "Notification will not be sent!"
+        )
+        return False
+    return True
+
+def create_email_sender() -> redmail.EmailSender:
+    """
+    Returns email sender configured from settings.
+    """
+    if get_settings().smtp_starttls_enabled:
+        cls_smtp = smtplib.SMTP
+    else:
+        cls_smtp = smtplib.SMTP_SSL
+    return redmail.EmailSender(
+        host=get_settings().smtp_host,
+        port=get_settings().smtp_port,
+        username=get_settings().smtp_user,
+        password=get_settings().smtp_password,
+        use_starttls=get_settings().smtp_starttls_enabled,
+        # socket timeout, so unresponsive server does not block the sender
+        cls_smtp=functools.partial(
+            cls_smtp,
+            timeout=get_settings().smtp_timeout_seconds
+        )
+    )
+
+class MailDispatcher:
+    """
+    Sends emails over a single SMTP connection. Connection is opened
+    with the first email and closed when the dispatcher is closed.
+    Use as a context manager.
+    """
+    def __init__(self, sender: redmail.EmailSender | None = None):
+        """
+        :param sender (redmail.EmailSender | None): email sender, created
+            from settings if not provided
+        """
+        self.sender = sender or create_email_sender()
+        # error of the last failed email
+        self.last_error: str | None = None
+        # set when the last email failed because connection to the server
+        # could not be (re)opened (including failed authentication),
+        # remaining emails should not be sent
+        self.connection_failed: bool = False
+
+    def __enter__(self) -> 'MailDispatcher':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """
+        Closes the connection, if it is open.
+        """
+        if self.sender.connection is None:
+            return
+        try:
+            self.sender.close()
+        except (smtplib.SMTPException, OSError):
+            # connection is already broken
+            self.sender.connection = None
+
+    def send(self, email: NotificationEmail) -> bool:
+        """
+        Sends email. Reconnects when the connection is broken.
+        :param email (NotificationEmail): email to send
+        :return (bool): True if email was sent
+        """
+        self.last_error = None
+        self.connection_failed = False
+        for attempt in range(1, MAIL_SEND_ATTEMPTS + 1):
+            if self.sender.connection is None:
+                try:
+                    self.sender.connect()
+                except (smtplib.SMTPException, OSError) as e:
+                    # server is not available or handshake (STARTTLS,
+                    # authentication) failed, no email can be sent
+                    logging.debug(traceback.format_exc())
+                    self.last_error = str(e)
+                    self.connection_failed = True
+                    self.close()
+                    logging.error(f"Can't connect to SMTP server: {e}")
+                    break
+            try:
+                self.sender.send(
+                    sender=f'{get_settings().smtp_from_name} '
+                        f'<{get_settings().smtp_from_address}>',
+                    receivers=[email.receiver],
+                    subject=email.subject,
+                    text=email.text
+                )
+                return True
+            except (
+                smtplib.SMTPServerDisconnected,
+                smtplib.SMTPConnectError,
+                OSError
+            ) as e:
+                # broken connection, reconnect and try again
+                logging.warning(
+                    f"SMTP connection failed (attempt {attempt} "
+                    f"of {MAIL_SEND_ATTEMPTS}): {e}"
+                )
+                logging.debug(traceback.format_exc())
+                self.last_error = str(e)
+                self.close()
+            except smtplib.SMTPException as e:
+                # email was rejected, connection can be used for other emails
+                logging.debug(traceback.format_exc())
+                self.last_error = str(e)
+                logging.error(f"Email was rejected by SMTP server: {e}")
+                break
+        logging.error(
+            f"Error sending notification {email.subject} "
+            f"to {email.receiver}!"
+        )
+        return False
+
+# OUTBOX
+# Mail worker threads
+MAIL_WORKERS: list[Thread] = []
+MAIL_WORKERS_STOP = ThreadEvent()
+# Set when new emails are added to the outbox
+MAIL_OUTBOX_WAKEUP = ThreadEvent()
+
+def init_mail_workers() -> None:
+    MAIL_WORKERS_STOP.clear()
+    for i in range(get_settings().mail_workers):
+        worker = Thread(
+            target=run_mail_worker,
+            name=f'mail_worker_{i}',
+            daemon=True
+        )
+        worker.start()
+        MAIL_WORKERS.append(worker)
+
+def shutdown_mail_workers() -> None:
+    MAIL_WORKERS_STOP.set()
+    MAIL_OUTBOX_WAKEUP.set()
+    for worker in MAIL_WORKERS:
+        worker.join()
+    MAIL_WORKERS.clear()
+
+def wake_mail_workers() -> None:
+    """
+    Wakes up mail workers after new emails were committed to the outbox.
+    """
+    MAIL_OUTBOX_WAKEUP.set()
+
+def add_outbox_emails(
+    emails: list[NotificationEmail],
+    db_session: Session
+) -> None:
+    """
+    Adds emails to the outbox. Changes are not committed, so emails are
+    sent only if the caller commits the transaction.
+    :param emails (list[NotificationEmail]): emails to send
+    :param db_session (Session): database session
+    """
+    if not emails or not is_smtp_configured():
+        return
+    db_session.add_all([
+        EmailOutbox(
+            receiver=email.receiver,
+            subject=email.subject,
+            text=email.text
+        )
+        for email in emails
+    ])
+
+def get_retry_delay(attempts: int) -> timedelta:
+    """
+    Returns delay before the next attempt to send an email.
+    :param attempts (int): number of failed attempts
+    :return (timedelta): delay doubled with each failed attempt
+    """
+    return timedelta(
+        seconds=get_settings().mail_retry_delay_seconds * 2 ** (attempts - 1)
+    )
+
+def send_outbox_emails(db_session: Session) -> int:
+    """
+    Sends batch of pending emails from the outbox over a single SMTP
+    connection and records delivery status of each email.
+    :param db_session (Session): database session
+    :return (int): number of processed emails, 0 if there are no pending
+        emails
+    """
+    emails = db_session.scalars(
+        select(EmailOutbox).where(
+            EmailOutbox.status == EmailStatus.pending,
+            EmailOutbox.next_attempt_time <= datetime.now()
+        ).order_by(
+            EmailOutbox.next_attempt_time
+        ).limit(
+            get_settings().mail_batch_size
+        ).with_for_update(skip_locked=True)
+    ).all()
+    if not emails:
+        db_session.commit()
+        return 0
+
+    with MailDispatcher() as dispatcher:
+        for i, email in enumerate(emails):
+            if dispatcher.send(email=NotificationEmail(
+                receiver=email.receiver,
+                subject=email.subject,
+                text=email.text
+            )):
+                email.status = EmailStatus.sent
+                email.sent_time = datetime.now()
+                continue
+            if dispatcher.connection_failed:
+                # server is not available (or rejects the credentials), this
+                # and remaining emails are postponed without counting
+                # the attempt
+                for remaining in emails[i:]:
+                    remaining.last_error = dispatcher.last_error
+                    remaining.next_attempt_time = \
+                        datetime.now() + get_retry_delay(
+                            attempts=max(remaining.attempts, 1)
+                        )
+                logging.error(
+                    f"SMTP server is not available, "
+                    f"{len(emails) - i} notifications were postponed!"
+                )
+                break
+            email.attempts += 1
+            email.last_error = dispatcher.last_error
+            if email.attempts >= get_settings().mail_max_attempts:
+                email.status = EmailStatus.failed
+                logging.error(
+                    f"Notification {email.subject} to {email.receiver} "
+                    f"failed after {email.attempts} attempts!"
+                )
+            else:
+                email.next_attempt_time = datetime.now() + get_retry_delay(
+                    attempts=email.attempts
+                )
+    db_session.commit()
+    return len(emails)
+
+def run_mail_worker() -> None:
+    """
+    Mail worker thread. Sends emails from the outbox until workers are
+    stopped. Waits for new emails when the outbox is drained.
+    """
+    while not MAIL_WORKERS_STOP.is_set():
+        try:
+            with Session(bind=get_db_engine()) as db_session:
+                processed = send_outbox_emails(db_session=db_session)
+        except Exception as e:
+            logging.error(f"Error sending emails from outbox: {e}")
+            logging.debug(traceback.format_exc())
+            processed = 0
+        if not processed:
+            if MAIL_OUTBOX_WAKEUP.wait(
+                timeout=get_settings().mail_poll_seconds
+            ):
+                MAIL_OUTBOX_WAKEUP.clear()
@@ -8,7 +8,8 @@ from src.schemas.node_entities import (
 )
 from src.app_logic.grafana_alert_operations import (
     update_grafana_alert_for_all_users_and_groups,
-    grafana_remove_alert_for_node
+    grafana_remove_alert_for_node,
+    get_grafana_alert_snapshot
 )
 from fastapi import HTTPException, status
 
@@ -66,12 +67,14 @@ def delete_node(node_id: int, db_session: Session) -> None:
             detail=f"Node with id {node_id} not found!"
         )
     # remove all Grafana alerts for node
+    alert_snapshot = get_grafana_alert_snapshot()
     for npr in node.resources:
         resource = npr.resource
         for notification in resource.notifications:
             grafana_remove_alert_for_node(
                 node=node,
-                notification=notification
+                notification=notification,
+                alert_snapshot=alert_snapshot
             )
     db_session.delete(node)
     db_session.commit()
@@ -112,12 +115,14 @@ def update_node(node: Node, db_session: Session) -> NodeResponse:
         )
     db_session.refresh(db_node)
     # update Grafana alerts with new info
+    alert_snapshot = get_grafana_alert_snapshot()
     for npr in db_node.resources:
         resource = npr.resource
         for notification in resource.notifications:
             update_grafana_alert_for_all_users_and_groups(
                 notification=notification,
-                db_session=db_session
+                db_session=db_session,
+                alert_snapshot=alert_snapshot
             )
     return generate_node_response(node=db_node)
 
@@ -157,10 +162,12 @@ def add_resource_to_node(
     db_session.commit()
     db_session.refresh(node)
     # add Grafana alerts for node
+    alert_snapshot = get_grafana_alert_snapshot()
     for notification in resource.notifications:
         update_grafana_alert_for_all_users_and_groups(
             notification=notification,
-            db_session=db_session
+            db_session=db_session,
+            alert_snapshot=alert_snapshot
         )
     return generate_node_response(node=node)
 
@@ -197,9 +204,11 @@ def remove_resource_from_node(
     db_session.commit()
     db_session.refresh(node)
     # remove Grafana alerts for node
+    alert_snapshot = get_grafana_alert_snapshot()
     for notification in resource.notifications:
         grafana_remove_alert_for_node(
             node=node,
-            notification=notification
+            notification=notification,
+            alert_snapshot=alert_snapshot
         )
     return generate_node_response(node=node)
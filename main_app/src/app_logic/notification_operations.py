@@ -459,6 +459,33 @@ def assign_or_unassign_notification(
     db_session.refresh(db_notification)
     return db_notification
 
+def get_notification_event_time(
+    notification: Notification,
+    task: Task
+) -> datetime | None:
+    """
+    Returns time when notification for the task should be send.
+    :param notification (Notification): notification to schedule
+    :param task (Task): task to schedule notification for
+    :return (datetime | None): time of the notification event or None
+        if notification should not be scheduled for the task
+    """
+    if not is_scheduleble_notification(notification):
+        return None
+
+    if notification.type == NotificationType.task_start:
+        # do not schedule notification for start time
+        # if task is has already started
+        if task.status != TaskStatus.scheduled:
+            return None
+        return task.start_time - timedelta(seconds=notification.time_offset)
+
+    # do not schedule notification for end time
+    # if task is has already finished
+    if task.status == TaskStatus.finished:
+        return None
+    return task.end_time - timedelta(seconds=notification.time_offset)
+
 def schedule_notification_events_for_task(
     notification: Notification,
     task: Task,
@@ -469,7 +496,8 @@ def schedule_notification_events_for_task(
     Commit changes in database.
     """
     # check if notification needs to be scheduled
-    if not is_scheduleble_notification(notification):
+    start = get_notification_event_time(notification=notification, task=task)
+    if start is None:
         return
 
     # check if notification is scheduled already
@@ -479,20 +507,6 @@ def schedule_notification_events_for_task(
             scheduled_event = event
             break
     
-    # determine time when notification should be send
-    if notification.type == NotificationType.task_start:
-        # do not schedule notification for start time
-        # if task is has already started
-        if task.status != TaskStatus.scheduled:
-            return
-        start = task.start_time - timedelta(seconds=notification.time_offset)
-    else:
-        # do not schedule notification for end time
-        # if task is has already finished
-        if task.status == TaskStatus.finished:
-            return
-        start = task.end_time - timedelta(seconds=notification.time_offset)
-    
     # schedule the notification
     if scheduled_event:
         # reschedule existing
@@ -0,0 +1,841 @@
+from src.db.models import (
+    Quota,
+    QuotaPeriod,
+    QuotaScope,
+    QuotaUsage,
+    User,
+    Group,
+    Resource,
+    Task,
+    ResourceAllocation
+)
+from sqlmodel import select, Session
+from sqlalchemy import func, delete, text, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import IntegrityError
+from fastapi import HTTPException, status
+from src.schemas.quota_entities import QuotaRequest, QuotaUsageResponse
+from src.app_logic.group_hierarchy import get_group_ancestors
+from datetime import datetime, timedelta
+
+# Quotas limit total usage of a resource (in resource hours) in time windows.
+# Usage of tasks is kept in a ledger (QuotaUsage table) per user and group,
+# resource, period and time window (bucket), so the quota check is a lookup
+# of the ledger entries instead of aggregating task history.
+# Ledger is updated whenever task is scheduled, rescheduled or removed.
+# Group entries contain usage of all members of the group and its subgroups,
+# so when group hierarchy or membership changes, usage of the affected users
+# is moved from their old groups to the new ones.
+#
+# Usage change structure format (resource seconds):
+# {
+#     (resource_id, period, bucket_start): usage
+# }
+
+# Namespaces (first key) of advisory locks used for locking quota owners
+# when checking quotas. Second key of the lock is user or group id.
+QUOTA_USER_LOCK_NAMESPACE = 2
+QUOTA_GROUP_LOCK_NAMESPACE = 3
+
+
+def get_bucket_start(time: datetime, period: QuotaPeriod) -> datetime:
+    """
+    Returns start of the time window of the period containing given time.
+    :param time (datetime): time
+    :param period (QuotaPeriod): period
+    :return (datetime): start of the time window
+    """
+    day_start = time.replace(hour=0, minute=0, second=0, microsecond=0)
+    if period == QuotaPeriod.day:
+        return day_start
+    if period == QuotaPeriod.week:
+        return day_start - timedelta(days=day_start.weekday())
+    return day_start.replace(day=1)
+
+def get_next_bucket_start(bucket_start: datetime, period: QuotaPeriod) -> datetime:
+    """
+    Returns start of the time window following given window.
+    :param bucket_start (datetime): start of the time window
+    :param period (QuotaPeriod): period
+    :return (datetime): start of the next time window
+    """
+    if period == QuotaPeriod.day:
+        return bucket_start + timedelta(days=1)
+    if period == QuotaPeriod.week:
+        return bucket_start + timedelta(days=7)
+    if bucket_start.month == 12:
+        return bucket_start.replace(year=bucket_start.year + 1, month=1)
+    return bucket_start.replace(month=bucket_start.month + 1)
+
+def get_usage_change(
+    resources: dict[int, int],
+    start_time: datetime,
+    end_time: datetime,
+    remove: bool = False
+) -> dict[tuple[int, QuotaPeriod, datetime], int]:
+    """
+    Splits usage of resources in [start_time, end_time) into time windows
+    of all periods.
+    :param resources (dict[int, int]): amounts of used resources by resource
+        id (summed over all nodes)
+    :param start_time (datetime): start of the usage
+    :param end_time (datetime): end of the usage
+    :param remove (bool): return negative usage
+    :return (dict[tuple[int, QuotaPeriod, datetime], int]): usage change
+        in resource seconds
+    """
+    usage_change = {}
+    for period in QuotaPeriod:
+        bucket_start = get_bucket_start(time=start_time, period=period)
+        while bucket_start < end_time:
+            next_bucket_start = get_next_bucket_start(
+                bucket_start=bucket_start,
+                period=period
+            )
+            seconds = int((
+                min(end_time, next_bucket_start) - max(start_time, bucket_start)
+            ).total_seconds())
+            for resource_id, amount in resources.items():
+                usage = amount * seconds
+                usage_change[(resource_id, period, bucket_start)] = \
+                    -usage if remove else usage
+            bucket_start = next_bucket_start
+    return usage_change
+
+def get_resources_total(
+    nodes_resources: dict[int, dict[int, int]]
+) -> dict[int, int]:
+    """
+    Returns total amounts of resources on all nodes.
+    :param nodes_resources (dict[int, dict[int, int]]): amounts by node
+        and resource
+    :return (dict[int, int]): amounts by resource
+    """
+    resources = {}
+    for node_resources in nodes_resources.values():
+        for resource_id, amount in node_resources.items():
+            resources[resource_id] = resources.get(resource_id, 0) + amount
+    return resources
+
+def get_task_usage_change(
+    task: Task,
+    remove: bool = False,
+    since: datetime | None = None
+) -> dict[tuple[int, QuotaPeriod, datetime], int]:
+    """
+    Returns usage change caused by the task.
+    :param task (Task): task
+    :param remove (bool): return negative usage
+    :param since (datetime | None): count only usage after this time
+    :return (dict[tuple[int, QuotaPeriod, datetime], int]): usage change
+    """
+    start_time = task.start_time
+    if since is not None and since > start_time:
+        start_time = since
+    if start_time >= task.end_time:
+        return {}
+    resources = {}
+    for ra in task.resource_allocations:
+        resources[ra.resource_id] = resources.get(ra.resource_id, 0) + ra.amount
+    return get_usage_change(
+        resources=resources,
+        start_time=start_time,
+        end_time=task.end_time,
+        remove=remove
+    )
+
+def merge_usage_changes(
+    *usage_changes: dict[tuple[int, QuotaPeriod, datetime], int]
+) -> dict[tuple[int, QuotaPeriod, datetime], int]:
+    """
+    Returns sum of usage changes.
+    """
+    merged = {}
+    for usage_change in usage_changes:
+        for key, usage in usage_change.items():
+            merged[key] = merged.get(key, 0) + usage
+    return merged
+
+def get_user_usage_owners(
+    user_id: int,
+    db_session: Session
+) -> list[tuple[QuotaScope, int]]:
+    """
+    Returns ledger owners whose usage includes tasks of the user
+    (the user and all its groups).
+    :param user_id (int): user id
+    :param db_session (Session): database session
+    :return (list[tuple[QuotaScope, int]]): scopes and entity ids
+    """
+    user = db_session.get(User, user_id)
+    if user is None:
+        return []
+    return [(QuotaScope.user, user.id)] + [
+        (QuotaScope.group, group.id)
+        for group in get_group_ancestors(
+            group_id=user.group_id,
+            db_session=db_session
+        )
+    ]
+
+def update_owners_quota_usage(
+    owners: list[tuple[QuotaScope, int]],
+    usage_change: dict[tuple[int, QuotaPeriod, datetime], int],
+    db_session: Session
+) -> None:
+    """
+    Adds usage change to the ledger entries of the owners.
+    Changes are not committed.
+    :param owners (list[tuple[QuotaScope, int]]): scopes and entity ids
+    :param usage_change (dict[tuple[int, QuotaPeriod, datetime], int]):
+        usage change
+    :param db_session (Session): database session
+    """
+    values = [
+        {
+            'scope': scope,
+            'entity_id': entity_id,
+            'resource_id': resource_id,
+            'period': period,
+            'bucket_start': bucket_start,
+            'usage': usage
+        }
+        for scope, entity_id in owners
+        for (resource_id, period, bucket_start), usage in usage_change.items()
+        if usage != 0
+    ]
+    if not values:
+        return
+    statement = insert(QuotaUsage).values(values)
+    db_session.execute(statement.on_conflict_do_update(
+        index_elements=[
+            'scope',
+            'entity_id',
+            'resource_id',
+            'period',
+            'bucket_start'
+        ],
+        set_={'usage': QuotaUsage.usage + statement.excluded.usage}
+    ))
+
+def update_quota_usage(
+    user_id: int,
+    usage_change: dict[tuple[int, QuotaPeriod, datetime], int],
+    db_session: Session
+) -> None:
+    """
+    Adds usage change to the ledger entries of the user and its groups.
+    Changes are not committed.
+    :param user_id (int): id of the task owner
+    :param usage_change (dict[tuple[int, QuotaPeriod, datetime], int]):
+        usage change
+    :param db_session (Session): database session
+    """
+    update_owners_quota_usage(
+        owners=get_user_usage_owners(user_id=user_id, db_session=db_session),
+        usage_change=usage_change,
+        db_session=db_session
+    )
+
+def add_task_quota_usage(task: Task, db_session: Session) -> None:
+    """
+    Adds usage of the task to the ledger.
+    :param task (Task): task to add
+    :param db_session (Session): database session
+    """
+    update_quota_usage(
+        user_id=task.owner_id,
+        usage_change=get_task_usage_change(task=task),
+        db_session=db_session
+    )
+
+def remove_task_quota_usage(
+    task: Task,
+    db_session: Session,
+    since: datetime | None = None
+) -> None:
+    """
+    Removes usage of the task from the ledger.
+    Must be called before task times or allocations are changed.
+    :param task (Task): task to remove
+    :param db_session (Session): database session
+    :param since (datetime | None): remove only usage after this time,
+        usage consumed before it stays in the ledger
+    """
+    update_quota_usage(
+        user_id=task.owner_id,
+        usage_change=get_task_usage_change(
+            task=task,
+            remove=True,
+            since=since
+        ),
+        db_session=db_session
+    )
+
+def get_users_usage_changes(
+    user_ids: list[int],
+    db_session: Session,
+    since: datetime | None = None
+) -> dict[int, dict[tuple[int, QuotaPeriod, datetime], int]]:
+    """
+    Returns usage of all tasks of the users.
+    :param user_ids (list[int]): user ids
+    :param db_session (Session): database session
+    :param since (datetime | None): count only usage after this time
+    :return (dict[int, dict[tuple[int, QuotaPeriod, datetime], int]]):
+        usage by user id, users without tasks are omitted
+    """
+    usage_changes = {}
+    if not user_ids:
+        return usage_changes
+    query = select(
+        Task.owner_id,
+        Task.start_time,
+        Task.end_time,
+        ResourceAllocation.resource_id,
+        func.sum(ResourceAllocation.amount).label('amount')
+    ).join(
+        ResourceAllocation, ResourceAllocation.task_id == Task.id
+    ).where(
+        Task.owner_id.in_(user_ids)
+    ).group_by(
+        Task.id,
+        ResourceAllocation.resource_id
+    )
+    if since is not None:
+        query = query.where(Task.end_time > since)
+    for task in db_session.execute(query).all():
+        user_usage_change = usage_changes.setdefault(task.owner_id, {})
+        start_time = task.start_time
+        if since is not None and since > start_time:
+            start_time = since
+        for key, usage in get_usage_change(
+            resources={task.resource_id: task.amount},
+            start_time=start_time,
+            end_time=task.end_time
+        ).items():
+            user_usage_change[key] = user_usage_change.get(key, 0) + usage
+    return usage_changes
+
+def update_users_group_quota_usage(
+    usage_changes: dict[int, dict[tuple[int, QuotaPeriod, datetime], int]],
+    db_session: Session,
+    remove: bool = False
+) -> None:
+    """
+    Adds usage of the users to the ledger entries of their current groups
+    (user entries are not changed). Changes are not committed.
+    :param usage_changes (dict[int, dict[tuple[int, QuotaPeriod, datetime],
+        int]]): usage by user id (see get_users_usage_changes)
+    :param db_session (Session): database session
+    :param remove (bool): subtract the usage instead
+    """
+    for user_id, usage_change in usage_changes.items():
+        update_owners_quota_usage(
+            owners=[
+                (scope, entity_id)
+                for scope, entity_id in get_user_usage_owners(
+                    user_id=user_id,
+                    db_session=db_session
+                )
+                if scope == QuotaScope.group
+            ],
+            usage_change={
+                key: -usage if remove else usage
+                for key, usage in usage_change.items()
+            },
+            db_session=db_session
+        )
+
+def remove_users_group_quota_usage(
+    user_ids: list[int],
+    db_session: Session
+) -> dict[int, dict[tuple[int, QuotaPeriod, datetime], int]]:
+    """
+    Removes usage of all tasks of the users from the ledger entries of their
+    groups. Must be called before group membership or hierarchy changes,
+    returned usage is added to the new groups by add_users_group_quota_usage
+    after the change. Changes are not committed.
+    :param user_ids (list[int]): ids of the affected users
+    :param db_session (Session): database session
+    :return (dict[int, dict[tuple[int, QuotaPeriod, datetime], int]]):
+        removed usage by user id
+    """
+    usage_changes = get_users_usage_changes(
+        user_ids=user_ids,
+        db_session=db_session
+    )
+    update_users_group_quota_usage(
+        usage_changes=usage_changes,
+        db_session=db_session,
+        remove=True
+    )
+    return usage_changes
+
+def add_users_group_quota_usage(
+    usage_changes: dict[int, dict[tuple[int, QuotaPeriod, datetime], int]],
+    db_session: Session
+) -> None:
+    """
+    Adds usage removed by remove_users_group_quota_usage to the ledger
+    entries of the users' new groups. Group changes must be flushed before.
+    Changes are not committed.
+    :param usage_changes (dict[int, dict[tuple[int, QuotaPeriod, datetime],
+        int]]): usage by user id
+    :param db_session (Session): database session
+    """
+    update_users_group_quota_usage(
+        usage_changes=usage_changes,
+        db_session=db_session
+    )
+
+def remove_user_quota_usage(
+    user_id: int,
+    db_session: Session,
+    since: datetime | None = None
+) -> None:
+    """
+    Removes usage of all tasks of deleted user from the ledger entries
+    of its groups and removes ledger entries of the user.
+    Changes are not committed.
+    :param user_id (int): user id
+    :param db_session (Session): database session
+    :param since (datetime | None): remove only usage after this time,
+        usage consumed before it stays in the group entries
+    """
+    update_users_group_quota_usage(
+        usage_changes=get_users_usage_changes(
+            user_ids=[user_id],
+            db_session=db_session,
+            since=since
+        ),
+        db_session=db_session,
+        remove=True
+    )
+    db_session.execute(
+        delete(QuotaUsage).where(
+            (QuotaUsage.scope == QuotaScope.user)
+            & (QuotaUsage.entity_id == user_id)
+        )
+    )
+
+def remove_group_quota_usage(group_id: int, db_session: Session) -> None:
+    """
+    Removes ledger entries of deleted group. Changes are not committed.
+    :param group_id (int): group id
+    :param db_session (Session): database session
+    """
+    db_session.execute(
+        delete(QuotaUsage).where(
+            (QuotaUsage.scope == QuotaScope.group)
+            & (QuotaUsage.entity_id == group_id)
+        )
+    )
+
+def get_quota_owner(quota: Quota) -> tuple[QuotaScope, int]:
+    """
+    Returns ledger owner of the quota.
+    """
+    if quota.user_id:
+        return QuotaScope.user, quota.user_id
+    return QuotaScope.group, quota.group_id
+
+def get_user_quotas(
+    user_id: int,
+    db_session: Session,
+    lock: bool = True
+) -> list[Quota]:
+    """
+    Returns quotas that apply to tasks of the user (quotas of the user
+    and all its groups). Owners of the quotas are locked until the end
+    of the transaction, so concurrent checks of the same quota are serialized.
+    :param user_id (int): user id
+    :param db_session (Session): database session
+    :param lock (bool): lock owners of the quotas (not needed when
+        the usage is not changed)
+    :return (list[Quota]): quotas
+    """
+    owners = get_user_usage_owners(user_id=user_id, db_session=db_session)
+    group_ids = [
+        entity_id for scope, entity_id in owners if scope == QuotaScope.group
+    ]
+    quotas = db_session.scalars(
+        select(Quota).where(
+            (Quota.user_id == user_id) | Quota.group_id.in_(group_ids)
+        )
+    ).all()
+    if not lock:
+        return quotas
+
+    lock_keys = sorted(set([
+        (
+            QUOTA_USER_LOCK_NAMESPACE
+            if scope == QuotaScope.user
+            else QUOTA_GROUP_LOCK_NAMESPACE,
+            entity_id
+        )
+        for scope, entity_id in map(get_quota_owner, quotas)
+    ]))
+    for namespace, entity_id in lock_keys:
+        db_session.execute(
+            select(func.pg_advisory_xact_lock(namespace, entity_id))
+        )
+    return quotas
+
+def get_quota_usage_entries(
+    quotas: list[Quota],
+    usage_change: dict[tuple[int, QuotaPeriod, datetime], int],
+    db_session: Session
+) -> dict[tuple[QuotaScope, int, int, QuotaPeriod, datetime], int]:
+    """
+    Returns ledger entries of the quotas in time windows affected
+    by the usage change.
+    :param quotas (list[Quota]): quotas
+    :param usage_change (dict[tuple[int, QuotaPeriod, datetime], int]):
+        usage change
+    :param db_session (Session): database session
+    :return (dict[tuple[QuotaScope, int, int, QuotaPeriod, datetime], int]):
+        usage by scope, entity id, resource id, period and bucket start
+    """
+    keys = set()
+    for quota in quotas:
+        scope, entity_id = get_quota_owner(quota=quota)
+        for resource_id, period, bucket_start in usage_change.keys():
+            if resource_id == quota.resource_id and period == quota.period:
+                keys.add((scope, entity_id, resource_id, period, bucket_start))
+    if not keys:
+        return {}
+
+    entries = db_session.scalars(
+        select(QuotaUsage).where(
+            tuple_(
+                QuotaUsage.scope,
+                QuotaUsage.entity_id,
+                QuotaUsage.resource_id,
+                QuotaUsage.period,
+                QuotaUsage.bucket_start
+            ).in_(list(keys))
+        )
+    ).all()
+    return {
+        (e.scope, e.entity_id, e.resource_id, e.period, e.bucket_start): e.usage
+        for e in entries
+    }
+
+def check_quotas(
+    quotas: list[Quota],
+    usage_entries: dict[tuple[QuotaScope, int, int, QuotaPeriod, datetime], int],
+    usage_change: dict[tuple[int, QuotaPeriod, datetime], int]
+) -> None:
+    """
+    Checks that usage change does not exceed any of the quotas.
+    :param quotas (list[Quota]): quotas to check
+    :param usage_entries (dict): ledger entries (see get_quota_usage_entries)
+    :param usage_change (dict[tuple[int, QuotaPeriod, datetime], int]):
+        usage change
+    :raises HTTPException: if quota is exceeded
+    """
+    for quota in quotas:
+        scope, entity_id = get_quota_owner(quota=quota)
+        for (resource_id, period, bucket_start), usage in usage_change.items():
+            if resource_id != quota.resource_id or period != quota.period:
+                continue
+            if usage <= 0:  # usage is not increased
+                continue
+            total_usage = usage_entries.get(
+                (scope, entity_id, resource_id, period, bucket_start),
+                0
+            ) + usage
+            if total_usage > quota.amount * 3600:
+                raise HTTPException(
+                    status_code=409,
+                    detail="Task resource allocation exceeds quota! "
+                           f"Exceeded quota: {quota.name}, Limit: "
+                           f"{quota.amount} resource hours per "
+                           f"{quota.period.value} starting "
+                           f"{bucket_start.isoformat()}"
+                )
+
+def check_user_quotas(
+    user_id: int,
+    usage_change: dict[tuple[int, QuotaPeriod, datetime], int],
+    db_session: Session
+) -> None:
+    """
+    Checks that usage change of the user tasks does not exceed any quota
+    of the user or its groups.
+    :param user_id (int): id of the task owner
+    :param usage_change (dict[tuple[int, QuotaPeriod, datetime], int]):
+        usage change
+    :param db_session (Session): database session
+    :raises HTTPException: if quota is exceeded
+    """
+    quotas = get_user_quotas(user_id=user_id, db_session=db_session)
+    if not quotas:
+        return
+    check_quotas(
+        quotas=quotas,
+        usage_entries=get_quota_usage_entries(
+            quotas=quotas,
+            usage_change=usage_change,
+            db_session=db_session
+        ),
+        usage_change=usage_change
+    )
+
+def get_expected_quota_usage(
+    db_session: Session
+) -> dict[tuple[QuotaScope, int, int, QuotaPeriod, datetime], int]:
+    """
+    Computes ledger entries from tasks and resource allocations.
+    :param db_session (Session): database session
+    :return (dict[tuple[QuotaScope, int, int, QuotaPeriod, datetime], int]):
+        usage by scope, entity id, resource id, period and bucket start
+    """
+    owners = {}
+    expected = {}
+    tasks = db_session.execute(
+        select(
+            Task.owner_id,
+            Task.start_time,
+            Task.end_time,
+            ResourceAllocation.resource_id,
+            func.sum(ResourceAllocation.amount).label('amount')
+        ).join(
+            ResourceAllocation, ResourceAllocation.task_id == Task.id
+        ).group_by(
+            Task.id,
+            ResourceAllocation.resource_id
+        )
+    ).all()
+    for task in tasks:
+        if task.owner_id not in owners:
+            owners[task.owner_id] = get_user_usage_owners(
+                user_id=task.owner_id,
+                db_session=db_session
+            )
+        usage_change = get_usage_change(
+            resources={task.resource_id: task.amount},
+            start_time=task.start_time,
+            end_time=task.end_time
+        )
+        for scope, entity_id in owners[task.owner_id]:
+            for (resource_id, period, bucket_start), usage in \
+                    usage_change.items():
+                key = (scope, entity_id, resource_id, period, bucket_start)
+                expected[key] = expected.get(key, 0) + usage
+    return expected
+
+def rebuild_quota_usage(db_session: Session) -> None:
+    """
+    Recomputes quota usage ledger from tasks and resource allocations.
+    Usage consumed by removed tasks can't be recomputed and is dropped.
+    :param db_session (Session): database session
+    """
+    db_session.execute(
+        text(f'LOCK TABLE {QuotaUsage.__tablename__} IN EXCLUSIVE MODE')
+    )
+    db_session.execute(delete(QuotaUsage))
+    values = [
+        {
+            'scope': scope,
+            'entity_id': entity_id,
+            'resource_id': resource_id,
+            'period': period,
+            'bucket_start': bucket_start,
+            'usage': usage
+        }
+        for (scope, entity_id, resource_id, period, bucket_start), usage
+        in get_expected_quota_usage(db_session=db_session).items()
+    ]
+    if values:
+        db_session.execute(insert(QuotaUsage), values)
+    db_session.commit()
+
+def check_quota_usage(db_session: Session) -> list[str]:
+    """
+    Compares quota usage ledger with usage computed from tasks
+    and resource allocations. Usage consumed by removed tasks is kept
+    in the ledger and reported as difference.
+    :param db_session (Session): database session
+    :return (list[str]): list of differences, empty if ledger is consistent
+    """
+    expected = get_expected_quota_usage(db_session=db_session)
+    stored = {
+        (e.scope, e.entity_id, e.resource_id, e.period, e.bucket_start):
+            e.usage
+        for e in db_session.scalars(select(QuotaUsage)).all()
+        if e.usage != 0
+    }
+    differences = []
+    for key in sorted(
+        set(expected.keys()) | set(stored.keys()),
+        key=lambda k: (k[0].value, k[1], k[2], k[3].value, k[4])
+    ):
+        if expected.get(key) != stored.get(key):
+            differences.append(
+                f"{key[0].value.capitalize()} {key[1]}, resource {key[2]}, "
+                f"{key[3].value} {key[4]}: expected {expected.get(key)}, "
+                f"stored {stored.get(key)}"
+            )
+    return differences
+
+def validate_quota_request(quota: QuotaRequest, db_session: Session) -> None:
+    """
+    Checks that quota owner and resource exist.
+    :param quota (QuotaRequest): quota request
+    :param db_session (Session): database session
+    :raises HTTPException: if quota request is invalid
+    """
+    if quota.user_id and quota.group_id:
+        raise HTTPException(
+            status_code=400,
+            detail="Quota can't have both user_id and group_id "
+                   "specified at the same time!"
+        )
+    if not quota.user_id and not quota.group_id:
+        raise HTTPException(
+            status_code=400,
+            detail="Quota must have either user_id or group_id specified!"
+        )
+    if quota.amount < 0:
+        raise HTTPException(
+            status_code=400,
+            detail="Quota amount can't be negative!"
+        )
+    if quota.user_id and not db_session.get(User, quota.user_id):
+        raise HTTPException(
+            status_code=404,
+            detail=f"User with id {quota.user_id} not found!"
+        )
+    if quota.group_id and not db_session.get(Group, quota.group_id):
+        raise HTTPException(
+            status_code=404,
+            detail=f"Group with id {quota.group_id} not found!"
+        )
+    if not db_session.get(Resource, quota.resource_id):
+        raise HTTPException(
+            status_code=404,
+            detail=f"Resource with id {quota.resource_id} not found!"
+        )
+
+def get_all_quotas(db_session: Session) -> list[Quota]:
+    """
+    Returns all quotas.
+    """
+    return db_session.scalars(select(Quota)).all()
+
+def get_quotas_by_user(user_id: int, db_session: Session) -> list[Quota]:
+    """
+    Returns quotas by user id.
+    """
+    return db_session.scalars(
+        select(Quota).where(Quota.user_id == user_id)
+    ).all()
+
+def get_quotas_by_group(group_id: int, db_session: Session) -> list[Quota]:
+    """
+    Returns quotas by group id.
+    """
+    return db_session.scalars(
+        select(Quota).where(Quota.group_id == group_id)
+    ).all()
+
+def get_quota(quota_id: int, db_session: Session) -> Quota:
+    """
+    Returns quota by id.
+    """
+    quota = db_session.get(Quota, quota_id)
+    if not quota:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Quota with id {quota_id} not found!"
+        )
+    return quota
+
+def get_quota_usage(
+    quota_id: int,
+    db_session: Session,
+    time: datetime | None = None
+) -> QuotaUsageResponse:
+    """
+    Returns usage of the quota in the time window containing given time.
+    :param quota_id (int): quota id
+    :param db_session (Session): database session
+    :param time (datetime | None): time, current time if not specified
+    :return (QuotaUsageResponse): quota usage
+    """
+    quota = get_quota(quota_id=quota_id, db_session=db_session)
+    scope, entity_id = get_quota_owner(quota=quota)
+    bucket_start = get_bucket_start(
+        time=time or datetime.now(),
+        period=quota.period
+    )
+    entry = db_session.get(
+        QuotaUsage,
+        (scope, entity_id, quota.resource_id, quota.period, bucket_start)
+    )
+    return QuotaUsageResponse(
+        quota_id=quota.id,
+        bucket_start=bucket_start,
+        used_hours=entry.usage / 3600 if entry else 0,
+        amount=quota.amount
+    )
+
+def add_quota(quota: QuotaRequest, db_session: Session) -> Quota:
+    """
+    Adds quota.
+    """
+    validate_quota_request(quota=quota, db_session=db_session)
+    new_quota = Quota(
+        name=quota.name,
+        description=quota.description,
+        amount=quota.amount,
+        period=quota.period,
+        user_id=quota.user_id,
+        group_id=quota.group_id,
+        resource_id=quota.resource_id
+    )
+    try:
+        db_session.add(new_quota)
+        db_session.commit()
+    except IntegrityError as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Failed to create quota in database due to conflict:"
+                   f"\n{e.orig.pgerror}"
+        )
+    db_session.refresh(new_quota)
+    return new_quota
+
+def update_quota(quota: QuotaRequest, db_session: Session) -> Quota:
+    """
+    Updates quota.
+    """
+    db_quota = get_quota(quota_id=quota.id, db_session=db_session)
+    validate_quota_request(quota=quota, db_session=db_session)
+    db_quota.name = quota.name
+    db_quota.description = quota.description
+    db_quota.amount = quota.amount
+    db_quota.period = quota.period
+    db_quota.user_id = quota.user_id
+    db_quota.group_id = quota.group_id
+    db_quota.resource_id = quota.resource_id
+    try:
+        db_session.commit()
+    except IntegrityError as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Failed to update quota in database due to conflict:"
+                   f"\n{e.orig.pgerror}"
+        )
+    db_session.refresh(db_quota)
+    return db_quota
+
+def remove_quota(quota_id: int, db_session: Session) -> None:
+    """
+    Removes quota.
+    """
+    quota = get_quota(quota_id=quota_id, db_session=db_session)
+    db_session.delete(quota)
+    db_session.commit()
@@ -5,7 +5,8 @@ from src.schemas.resource_entities import AliasRequest
 from fastapi import HTTPException, status
 from src.app_logic.grafana_alert_operations import (
     grafana_remove_alert,
-    update_grafana_alert_for_all_users_and_groups
+    update_grafana_alert_for_all_users_and_groups,
+    get_grafana_alert_snapshot
 )
 
 
@@ -53,8 +54,12 @@ def delete_resource(resource_id: int, db_session: Session) -> None:
         if len(alias.resources) == 1:
             db_session.delete(alias)
     # remove Grafana alerts
+    alert_snapshot = get_grafana_alert_snapshot()
     for notification in resource.notifications:
-        grafana_remove_alert(notification=notification)
+        grafana_remove_alert(
+            notification=notification,
+            alert_snapshot=alert_snapshot
+        )
     db_session.delete(resource)
     db_session.commit()
 
@@ -105,10 +110,12 @@ def update_resource(resource: Resource, db_session: Session) -> Resource:
         )
     db_session.refresh(db_resource)
     # update all Grafana alerts for resource
+    alert_snapshot = get_grafana_alert_snapshot()
     for notification in resource.notifications:
         update_grafana_alert_for_all_users_and_groups(
             notification=notification,
-            db_session=db_session
+            db_session=db_session,
+            alert_snapshot=alert_snapshot
         )
     return db_resource
 
@@ -1,32 +1,83 @@
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import select, update, delete, and_, or_
 from src.db.models import User, Task, TaskStatus, Event, EventType
 from datetime import datetime, timedelta
 from src.config import get_settings
 from src.app_logic.grafana_alert_operations import (
-    grafana_add_or_update_user_alerts
+    grafana_add_or_update_user_alerts,
+    get_grafana_alert_snapshot
 )
-import redmail
+from src.app_logic.capacity_index import remove_tasks_usage
+from src.app_logic.mail_dispatcher import (
+    add_outbox_emails,
+    wake_mail_workers,
+    init_mail_workers,
+    shutdown_mail_workers
+)
+from src.schemas.notification_entities import NotificationEmail
 from string import Template
 import logging
-from apscheduler.schedulers.background import BackgroundScheduler
-from apscheduler.jobstores.base import JobLookupError
-from src.db.connection import get_db_engine
-import smtplib
+from src.db.connection import get_db_engine, EVENT_NOTIFY_CHANNEL
+from threading import Thread, Event as ThreadEvent, Lock
+import heapq
+import select as io_select
+import os
 import traceback
 
+# Event processing is driven by PostgreSQL notifications. Database trigger
+# on the event table sends the earliest time of inserted or updated events
+# to EVENT_NOTIFY_CHANNEL. Scheduler thread listens on the channel, keeps
+# timers of upcoming events and wakes up when the earliest one is due.
+# Only one process (leader) processes events. Leader is the process holding
+# the event processor advisory lock on its listener connection, other
+# processes retry to acquire the lock periodically. Lock is released when
+# the leader stops or its connection fails.
+
+# Key of the advisory lock held by the event processor leader
+EVENT_PROCESSOR_LOCK_NAMESPACE = 4
+EVENT_PROCESSOR_LOCK_KEY = 0
+
+# Events are fired by in-memory timers at their exact time. Timers of
+# upcoming events are loaded for a rolling horizon (time window starting
+# now), so only events within the horizon are kept in memory. Horizon is
+# extended when half of it passes. Notification from the database trigger
+# reloads only events from the notified time to the end of the horizon.
 
-SCHEDULER = None
-JOB_ID = 'process_events'
+# Min-heap of event timers (time, event id)
+EVENT_TIMERS: list[tuple[datetime, int]] = []
+EVENT_TIMERS_LOCK = Lock()
+# Current time of each event in the timers, timers with different time
+# belong to rescheduled events and are skipped
+EVENT_TIMER_TIMES: dict[int, datetime] = {}
+# Events with time up to this time are loaded to the timers
+EVENT_TIMERS_LOADED_UNTIL: datetime | None = None
+# Event id of timers used to retry failed event processing
+RETRY_TIMER_ID = 0
+SCHEDULER_THREAD: Thread | None = None
+SCHEDULER_STOP = ThreadEvent()
+# Pipe used to wake up scheduler thread waiting for notifications
+SCHEDULER_WAKEUP: tuple[int, int] | None = None
 
 def init_scheduler() -> None:
-    global SCHEDULER
-    SCHEDULER = BackgroundScheduler()
-    schedule_next_event_processing(get_db_session_for_scheduler())
-    SCHEDULER.start()
+    global SCHEDULER_THREAD, SCHEDULER_WAKEUP
+    SCHEDULER_STOP.clear()
+    SCHEDULER_WAKEUP = os.pipe()
+    SCHEDULER_THREAD = Thread(
+        target=run_scheduler,
+        name='event_scheduler',
+        daemon=True
+    )
+    SCHEDULER_THREAD.start()
+    init_mail_workers()
 
 def shutdown_scheduler() -> None:
-    global SCHEDULER
-    SCHEDULER.shutdown()
+    SCHEDULER_STOP.set()
+    if SCHEDULER_THREAD:
+        os.write(SCHEDULER_WAKEUP[1], b'\0')
+        SCHEDULER_THREAD.join()
+        for fd in SCHEDULER_WAKEUP:
+            os.close(fd)
+    shutdown_mail_workers()
 
 def get_db_session_for_scheduler() -> Session:
     """
@@ -50,10 +101,11 @@ def log_event_info(event: Event, content: str) -> None:
         f"Notification content: {content}"
     )
 
-def send_notification_on_event(event: Event) -> None:
+def get_notification_email(event: Event) -> NotificationEmail:
     """
-    Sends notification to user when event triggers it:
-    :param event (Event): event to send notification for
+    Returns notification email for the user, when event triggers it.
+    :param event (Event): event to create notification for
+    :return (NotificationEmail): notification email
     """
     content = Template(
         event.notification.notification_template
@@ -70,102 +122,113 @@ def send_notification_on_event(event: Event) -> None:
         task_start=event.task.start_time,
         task_end=event.task.end_time
     )
-    if get_settings().smtp_enabled \
-    and not (
-                get_settings().smtp_user and
-                get_settings().smtp_password and
-                get_settings().smtp_from_address
-            ):
-        logging.error(
-            "SMTP is enabled, but SMTP_USER, SMTP_PASSWORD "
-            "or SMTP_FROM_ADDRESS is not set! "
-            "Notification will not be sent!"
-        )
-    elif get_settings().smtp_enabled:
-        if get_settings().smtp_starttls_enabled:
-            cls_smtp = smtplib.SMTP
-        else:
-            cls_smtp = smtplib.SMTP_SSL
-        try:
-            mailsender = redmail.EmailSender(
-                host=get_settings().smtp_host,
-                port=get_settings().smtp_port,
-                username=get_settings().smtp_user,
-                password=get_settings().smtp_password,
-                use_starttls=get_settings().smtp_starttls_enabled,
-                cls_smtp=cls_smtp
-            )
-            mailsender.send(
-                sender=f'{get_settings().smtp_from_name} '
-                    f'<{get_settings().smtp_from_address}>',
-                receivers=[event.task.owner.email],
-                subject=event.notification.name,
-                text=content
-            )
-        except Exception as e:
-            logging.error(
-                f"Error sending notification {event.notification.name} "
-                f"to {event.task.owner.email}!"
-            )
-            logging.error(traceback.format_exc())
-    else:
-        logging.warning(
-            "SMTP is not enabled, notification will not be sent!"
-        )
-    
     log_event_info(event=event, content=content)
+    return NotificationEmail(
+        receiver=event.task.owner.email,
+        subject=event.notification.name,
+        text=content
+    )
 
-def process_scheduled_events(db_session: Session) -> None:
+# Task status transitions triggered by task events. Event is processed only
+# if the task time is within the processed time window, otherwise the task
+# was rescheduled. Transitions are applied in order, so the task can start
+# and end in the same run.
+TASK_EVENT_TRANSITIONS = {
+    EventType.task_start: (Task.start_time, TaskStatus.running),
+    EventType.task_end: (Task.end_time, TaskStatus.finished)
+}
+
+def get_due_task_events_filter(
+    event_type: EventType,
+    task_time,
+    timepoint: datetime
+):
     """
-    Processes scheduled events
+    Returns filter matching due task events of given type, that were not
+    rescheduled. Filter joins Event and Task tables.
+    :param event_type (EventType): type of the task event
+    :param task_time: task column with time of the event
+    :param timepoint (datetime): end of the processed time window
     """
-    timepoint = datetime.now() + timedelta(
-        seconds=get_settings().task_scheduler_precision_seconds
+    return and_(
+        Event.task_id == Task.id,
+        Event.type == event_type,
+        Event.time <= timepoint,
+        task_time <= timepoint
     )
 
+def process_scheduled_events(db_session: Session) -> None:
+    """
+    Processes scheduled events.
+    Task statuses are changed with single update per event type, processed
+    events are removed with single delete. Notification emails are written
+    to the outbox and sent by mail workers.
+    """
+    # events are fired by timers at their time, so only events that are
+    # already due are processed
+    timepoint = datetime.now()
+
     logging.debug(f"Processing scheduled events at {timepoint}")
 
-    # get events from database within time window
-    events = db_session.query(Event).with_for_update().filter(
-        Event.time <= timepoint
-    ).order_by(
-        Event.time
-    ).all()
+    # ids of users that needs change of alerts in grafana
+    afected_user_ids = set()
+    due_task_events = []
 
-    # list of users that needs change of alerts in grafana
-    afected_users = []
-    # list of events that were processed and can be removed from database
-    processed_events = []
+    for event_type, (task_time, task_status) in TASK_EVENT_TRANSITIONS.items():
+        due_events = get_due_task_events_filter(
+            event_type=event_type,
+            task_time=task_time,
+            timepoint=timepoint
+        )
+        due_task_events.append(due_events)
+        if task_status == TaskStatus.finished:
+            remove_tasks_usage(
+                task_ids=select(Task.id).where(due_events),
+                db_session=db_session
+            )
+        updated_tasks = db_session.execute(
+            update(Task).where(
+                due_events
+            ).values(
+                status=task_status
+            ).returning(
+                Task.owner_id
+            ).execution_options(synchronize_session=False)
+        ).all()
+        afected_user_ids.update(task.owner_id for task in updated_tasks)
 
-    for event in events:
-        savepoint = db_session.begin_nested()
+    # user notification events
+    notification_events = db_session.scalars(
+        select(Event).where(
+            Event.type == EventType.other,
+            Event.time <= timepoint
+        ).options(
+            selectinload(Event.task).selectinload(Task.owner),
+            selectinload(Event.notification)
+        ).order_by(
+            Event.time
+        ).with_for_update()
+    ).all()
+    notification_emails = [
+        get_notification_email(event=event) for event in notification_events
+    ]
 
-        # event is task start or task end
-        if event.type in [EventType.task_start, EventType.task_end]:
-            # update task status
-            task = event.task
-            if event.type == EventType.task_start \
-            and task.start_time <= timepoint: # check if task wasn't rescheduled
-                task.status = TaskStatus.running
-                if task.owner not in afected_users:
-                    afected_users.append(task.owner)
-                processed_events.append(event)
-            elif event.type == EventType.task_end \
-            and task.end_time <= timepoint: # check if task wasn't rescheduled
-                task.status = TaskStatus.finished
-                if task.owner not in afected_users:
-                    afected_users.append(task.owner)
-                processed_events.append(event)
-        
-        # user notification event
-        elif event.type == EventType.other:
-            # send notification
-            send_notification_on_event(event=event)
-            
-            # remove event after processing
-            db_session.delete(event)
-        savepoint.commit()
+    # remove processed events
+    db_session.execute(
+        delete(Event).where(
+            Event.task_id == Task.id,
+            or_(
+                Event.id.in_([event.id for event in notification_events]),
+                *due_task_events
+            )
+        ).execution_options(synchronize_session=False)
+    )
 
+    afected_users = db_session.scalars(
+        select(User).where(User.id.in_(afected_user_ids))
+    ).all()
+    if afected_users:
+        alert_snapshot = get_grafana_alert_snapshot()
     for user in afected_users:
         savepoint = db_session.begin_nested()
 
@@ -174,7 +237,8 @@ def process_scheduled_events(db_session: Session) -> None:
             user=user,
             timepoint=timepoint,
             db_session=db_session,
-            lock_rows=True
+            lock_rows=True,
+            alert_snapshot=alert_snapshot
         )
 
         if errors:
@@ -182,19 +246,18 @@ def process_scheduled_events(db_session: Session) -> None:
                 f"Errors has occured when updating"
                 f" grafana alerts for user {user.username}!"
             )
-
-        # remove events for afected users after alerts have been updated
-        for event in processed_events:
-            if event.task.owner == user:
-                db_session.delete(event)
-            
         savepoint.commit()
     
+    # emails are sent by mail workers after commit, so the event processing
+    # transaction is not held open while waiting for SMTP server
+    add_outbox_emails(emails=notification_emails, db_session=db_session)
     db_session.commit()
+    wake_mail_workers()
 
 def process_scheduled_events_scheduler_job() -> None:
     """
     Function called by the scheduler when events need to be processed.
+    Retry timer is added when processing fails.
     """
     db_session = get_db_session_for_scheduler()
     try:
@@ -202,73 +265,200 @@ def process_scheduled_events_scheduler_job() -> None:
     except Exception as e:
         logging.error(f"Error processing scheduled events: {e}")
         logging.debug(traceback.format_exc())
-        schedule_next_event_processing(
-            db_session=db_session,
-            retry=True
+        add_event_timer(
+            time=datetime.now() + timedelta(
+                seconds=get_settings().task_scheduler_retry_limit_seconds
+            ),
+            event_id=RETRY_TIMER_ID
         )
-    else:
-        schedule_next_event_processing(db_session=db_session)
     db_session.close()
 
-def schedule_next_event_processing(
+def add_event_timer(time: datetime, event_id: int) -> None:
+    """
+    Adds timer firing at the event time.
+    :param time (datetime): event time
+    :param event_id (int): id of the event
+    """
+    with EVENT_TIMERS_LOCK:
+        if event_id != RETRY_TIMER_ID:
+            if EVENT_TIMER_TIMES.get(event_id) == time:
+                return
+            EVENT_TIMER_TIMES[event_id] = time
+        heapq.heappush(EVENT_TIMERS, (time, event_id))
+
+def reset_event_timers() -> None:
+    """
+    Removes all timers, so they can be loaded again.
+    """
+    global EVENT_TIMERS_LOADED_UNTIL
+    with EVENT_TIMERS_LOCK:
+        EVENT_TIMERS.clear()
+        EVENT_TIMER_TIMES.clear()
+        EVENT_TIMERS_LOADED_UNTIL = None
+
+def load_event_timers(
+    end_time: datetime,
     db_session: Session,
-    retry: bool = False,
+    start_time: datetime | None = None
 ) -> None:
     """
-    Schedules next event processing
+    Adds timers of events in the time window.
+    :param end_time (datetime): end of the time window (inclusive)
     :param db_session (Session): database session
-    :param retry (bool): whether to retry processing
-        in seconds
+    :param start_time (datetime | None): start of the time window
+        (inclusive), all events up to the end are loaded if not set
     """
-    global SCHEDULER
-    global JOB_ID
+    query = select(Event.id, Event.time).where(Event.time <= end_time)
+    if start_time is not None:
+        query = query.where(Event.time >= start_time)
+    for event in db_session.execute(query).all():
+        add_event_timer(time=event.time, event_id=event.id)
 
-    if retry:
-        timepoint = datetime.now() + timedelta(
-            seconds=get_settings().task_scheduler_retry_limit_seconds
-        )
-    else:
-        try:
-            next_event = db_session.query(Event).order_by(Event.time).first()
-        except Exception as e:
-            logging.error(f"Error getting next event: {e}")
-            logging.debug(traceback.format_exc())
-            timepoint = datetime.now() + timedelta(
-                seconds=get_settings().task_scheduler_retry_limit_seconds
+def extend_event_timers_horizon(db_session: Session) -> None:
+    """
+    Loads timers of events up to the end of the horizon, when half
+    of the horizon has passed since the last load.
+    :param db_session (Session): database session
+    """
+    global EVENT_TIMERS_LOADED_UNTIL
+    horizon = timedelta(seconds=get_settings().task_scheduler_horizon_seconds)
+    now = datetime.now()
+    if EVENT_TIMERS_LOADED_UNTIL is not None \
+    and EVENT_TIMERS_LOADED_UNTIL - now > horizon / 2:
+        return
+    load_event_timers(
+        start_time=EVENT_TIMERS_LOADED_UNTIL,
+        end_time=now + horizon,
+        db_session=db_session
+    )
+    EVENT_TIMERS_LOADED_UNTIL = now + horizon
+
+def load_notified_event_timers(time: datetime, db_session: Session) -> None:
+    """
+    Loads timers of events created or changed after the notification.
+    Events later than the horizon are loaded when the horizon is extended.
+    :param time (datetime): earliest time of the notified events
+    :param db_session (Session): database session
+    """
+    if EVENT_TIMERS_LOADED_UNTIL is None or time > EVENT_TIMERS_LOADED_UNTIL:
+        return
+    load_event_timers(
+        start_time=time,
+        end_time=EVENT_TIMERS_LOADED_UNTIL,
+        db_session=db_session
+    )
+
+def pop_due_event_timers() -> bool:
+    """
+    Removes all timers that are due.
+    :return (bool): True if any event (or retry) is due
+    """
+    now = datetime.now()
+    due = False
+    with EVENT_TIMERS_LOCK:
+        while EVENT_TIMERS and EVENT_TIMERS[0][0] <= now:
+            time, event_id = heapq.heappop(EVENT_TIMERS)
+            if event_id == RETRY_TIMER_ID:
+                due = True
+            elif EVENT_TIMER_TIMES.get(event_id) == time:
+                del EVENT_TIMER_TIMES[event_id]
+                due = True
+    return due
+
+def get_seconds_to_next_timer() -> float:
+    """
+    Returns number of seconds until the earliest timer or until the horizon
+    needs to be extended. Retry limit is returned at most, so the listener
+    connection is checked periodically.
+    """
+    timeout = get_settings().task_scheduler_retry_limit_seconds
+    now = datetime.now()
+    with EVENT_TIMERS_LOCK:
+        if EVENT_TIMERS:
+            timeout = min(
+                timeout,
+                (EVENT_TIMERS[0][0] - now).total_seconds()
+            )
+        if EVENT_TIMERS_LOADED_UNTIL is not None:
+            horizon = get_settings().task_scheduler_horizon_seconds
+            timeout = min(
+                timeout,
+                (EVENT_TIMERS_LOADED_UNTIL - now).total_seconds() - horizon / 2
+            )
+    return max(timeout, 0)
+
+def listen_for_events() -> None:
+    """
+    Listens for event notifications and processes events when they are due,
+    if this process is the event processor leader.
+    Returns when scheduler is stopped or leader lock is held by another
+    process, raises exception when database connection fails.
+    """
+    connection = get_db_engine().raw_connection()
+    # connection holds session level lock and LISTEN, so it must not be
+    # returned to the pool
+    connection.detach()
+    try:
+        listener = connection.driver_connection
+        listener.autocommit = True
+        with listener.cursor() as cursor:
+            cursor.execute(
+                "SELECT pg_try_advisory_lock(%s, %s)",
+                (EVENT_PROCESSOR_LOCK_NAMESPACE, EVENT_PROCESSOR_LOCK_KEY)
             )
-        else:
-            if not next_event:
+            if not cursor.fetchone()[0]:
+                logging.debug("Event processor is running in another process")
                 return
+            logging.info("Event processor started")
+            cursor.execute(f"LISTEN {EVENT_NOTIFY_CHANNEL}")
 
-            timepoint = next_event.time
+        # events created before listening started (including missed events
+        # of the previous leader)
+        reset_event_timers()
 
-            if timepoint < datetime.now() + timedelta(seconds=10):
-                timepoint = datetime.now() + timedelta(seconds=10)
-    
-    # add next job scheduling
-    try:
-        SCHEDULER.add_job(
-            func=process_scheduled_events_scheduler_job,
-            next_run_time=timepoint,
-            id=JOB_ID
-        )
-    except ConflictingIdError:
-        # job is already scheduled
-        # (could be due to race condition or scheduler and API process)
-        cancel_next_event_processing()
-        schedule_next_event_processing(
-            db_session=db_session,
-            retry=retry
-        )
+        while not SCHEDULER_STOP.is_set():
+            db_session = get_db_session_for_scheduler()
+            extend_event_timers_horizon(db_session=db_session)
+            db_session.close()
 
-def cancel_next_event_processing() -> None:
+            readable, _, _ = io_select.select(
+                [listener, SCHEDULER_WAKEUP[0]],
+                [],
+                [],
+                get_seconds_to_next_timer()
+            )
+            if listener in readable:
+                listener.poll()
+                notified_times = []
+                while listener.notifies:
+                    notification = listener.notifies.pop(0)
+                    notified_times.append(
+                        datetime.fromisoformat(notification.payload)
+                    )
+                if notified_times:
+                    db_session = get_db_session_for_scheduler()
+                    load_notified_event_timers(
+                        time=min(notified_times),
+                        db_session=db_session
+                    )
+                    db_session.close()
+            if pop_due_event_timers():
+                process_scheduled_events_scheduler_job()
+    finally:
+        connection.close()
+
+def run_scheduler() -> None:
     """
-    Cancels next scheduled event processing
+    Scheduler thread. Listens for event notifications until the scheduler
+    is stopped. Tries to become the leader again when database connection
+    fails or another process is the leader.
     """
-    global SCHEDULER
-    global JOB_ID
-    try:
-        SCHEDULER.remove_job(JOB_ID)
-    except JobLookupError:
-        # job is not scheduled
-        pass
+    while not SCHEDULER_STOP.is_set():
+        try:
+            listen_for_events()
+        except Exception as e:
+            logging.error(f"Error listening for scheduled events: {e}")
+            logging.debug(traceback.format_exc())
+        SCHEDULER_STOP.wait(
+            timeout=get_settings().task_scheduler_retry_limit_seconds
+        )
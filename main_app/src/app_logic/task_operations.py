@@ -7,38 +7,122 @@ from src.db.models import (
     TaskStatus,
     TaskTag,
     TaskHasTag,
-    Limit,
-    User
+    User,
+    Resource
 )
 from sqlmodel import select, Session, asc, desc
+from sqlalchemy.orm import selectinload, joinedload
 from sqlalchemy.exc import IntegrityError, NoResultFound
 from src.schemas.task_entities import (
     TaskResponseFull,
     TaskResourceAllocationResponse,
     TaskResponseSimple,
     TaskResponseFullWithOwner,
+    TaskResponseBase,
     CreateTaskRequest,
     ResourceAllocationRequest,
     ResourceScheduleRequest,
     UsagePeriod,
-    ResourceAvailability,
-    TasksPaginationRequest
+    TasksPaginationRequest,
+    FindSlotRequest,
+    TaskSlot,
+    BatchTaskResult,
+    TaskExportRequest,
+    TaskExportFormat
 )
 from src.schemas.user_entities import UserNoPasswordSimple
-from src.app_logic.limit_operations import get_all_user_limits_dict
+from src.schemas.limit_entities import LimitResponse
+from src.app_logic.limit_operations import (
+    get_effective_user_limits,
+    get_shared_user_limits
+)
+from src.app_logic.group_hierarchy import get_group_member_ids_select
+from src.app_logic.capacity_index import (
+    add_usage_interval,
+    get_capacity_index,
+    get_owner_capacity_index,
+    check_capacity,
+    find_free_slots,
+    lock_nodes,
+    add_usage,
+    add_usages,
+    remove_task_usage
+)
+from src.app_logic.availability_engine import get_availability_periods
+from src.app_logic.quota_operations import (
+    get_usage_change,
+    get_resources_total,
+    get_task_usage_change,
+    merge_usage_changes,
+    get_user_quotas,
+    get_quota_usage_entries,
+    check_quotas,
+    check_user_quotas,
+    update_quota_usage,
+    remove_task_quota_usage
+)
 from src.app_logic.notification_operations import (
     get_notifications_by_user_id,
-    schedule_notification_events_for_task
+    schedule_notification_events_for_task,
+    get_notification_event_time
 )
 from src.app_logic.authentication import insufficientPermissionsException
 from src.schemas.authentication_entities import CurrentUserInfo
-from src.app_logic.scheduled_event_processing import (
-    cancel_next_event_processing,
-    schedule_next_event_processing
-)
+from src.db.connection import get_db_engine
+from sqlalchemy import func, insert, tuple_, Select
 from fastapi import HTTPException
-from datetime import datetime
+from datetime import datetime, timedelta
 from copy import deepcopy
+from base64 import urlsafe_b64encode, urlsafe_b64decode
+from collections.abc import Iterator
+from itertools import groupby
+from io import StringIO
+import csv
+import json
+
+# Maximal number of slots returned by slot finder
+MAX_FIND_SLOT_RESULTS = 100
+
+# Maximal number of tasks in single batch request
+MAX_BATCH_SIZE = 1000
+
+# Loader options for task listings. Related objects used in task responses
+# are loaded for all listed tasks at once, so the number of queries does not
+# depend on the number of tasks.
+TASK_SIMPLE_LOAD_OPTIONS = (
+    joinedload(Task.owner),
+)
+TASK_FULL_LOAD_OPTIONS = (
+    selectinload(Task.tags),
+    selectinload(Task.resource_allocations).options(
+        joinedload(ResourceAllocation.node),
+        joinedload(ResourceAllocation.resource)
+    )
+)
+TASK_FULL_WITH_OWNER_LOAD_OPTIONS = \
+    TASK_FULL_LOAD_OPTIONS + TASK_SIMPLE_LOAD_OPTIONS
+
+# Response header with cursor of the next page of tasks
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# Number of rows fetched from server-side cursor at once during task export
+TASK_EXPORT_BATCH_SIZE = 1000
+
+# Columns of task export in CSV format
+TASK_EXPORT_CSV_COLUMNS = (
+    "task_id",
+    "name",
+    "start_time",
+    "end_time",
+    "status",
+    "owner_id",
+    "owner_username",
+    "node_id",
+    "node_name",
+    "resource_id",
+    "resource_name",
+    "amount"
+)
 
 
 def generate_task_response_full(task: Task) -> TaskResponseFull:
@@ -87,7 +171,9 @@ def get_all_tasks(db_session: Session) -> list[TaskResponseSimple]:
     """
     return [
         generate_task_response_simple(task=task)
-        for task in db_session.scalars(select(Task)).all()
+        for task in db_session.scalars(
+            select(Task).options(*TASK_SIMPLE_LOAD_OPTIONS)
+        ).all()
     ]
 
 def get_user_tasks(
@@ -104,7 +190,9 @@ def get_user_tasks(
     return [
         generate_task_response_simple(task=task)
         for task in db_session.scalars(
-            select(Task).where(Task.owner_id == user_id)
+            select(Task).options(
+                *TASK_SIMPLE_LOAD_OPTIONS
+            ).where(Task.owner_id == user_id)
         ).all()
     ]
 
@@ -130,6 +218,80 @@ def get_current_user_group_member_ids(
     
     return user_ids
 
+def encode_task_cursor(task: TaskResponseBase) -> str:
+    """
+    Returns pagination cursor pointing after given task.
+    :param task (TaskResponseBase): last task of the page
+    :return (str): cursor
+    """
+    return urlsafe_b64encode(
+        f"{task.start_time.isoformat()}|{task.id}".encode()
+    ).decode()
+
+def decode_task_cursor(cursor: str) -> (datetime, int):
+    """
+    Returns start time and id of the task the cursor points after.
+    :param cursor (str): cursor
+    :return (datetime, int): start time and id of the task
+    :raises HTTPException: if cursor is invalid
+    """
+    try:
+        start_time, task_id = urlsafe_b64decode(
+            cursor.encode()
+        ).decode().split("|")
+        return datetime.fromisoformat(start_time), int(task_id)
+    except ValueError:
+        raise HTTPException(
+            status_code=400,
+            detail="Invalid pagination cursor!"
+        )
+
+def get_next_task_cursor(
+    tasks: list[TaskResponseBase],
+    pagination: TasksPaginationRequest
+) -> str | None:
+    """
+    Returns cursor of the next page or None if there is no next page.
+    :param tasks (list[TaskResponseBase]): tasks of the current page
+    :param pagination (TasksPaginationRequest): pagination request
+    :return (str | None): cursor of the next page
+    """
+    if not tasks or len(tasks) < pagination.page_size:
+        return None
+    return encode_task_cursor(task=tasks[-1])
+
+def paginate_tasks(
+    query: Select,
+    pagination: TasksPaginationRequest,
+    descending: bool = False
+) -> Select:
+    """
+    Orders tasks by start time and id and selects requested page.
+    If cursor is set, keyset pagination is used, otherwise page number.
+    :param query (Select): query selecting tasks
+    :param pagination (TasksPaginationRequest): pagination request
+    :param descending (bool): order tasks from the latest
+    :return (Select): query selecting the page
+    """
+    if descending:
+        query = query.order_by(desc(Task.start_time), desc(Task.id))
+    else:
+        query = query.order_by(asc(Task.start_time), asc(Task.id))
+
+    if pagination.cursor:
+        start_time, task_id = decode_task_cursor(cursor=pagination.cursor)
+        key = tuple_(Task.start_time, Task.id)
+        if descending:
+            query = query.where(key < tuple_(start_time, task_id))
+        else:
+            query = query.where(key > tuple_(start_time, task_id))
+        return query.limit(pagination.page_size)
+
+    return query.slice(
+        pagination.page_number * pagination.page_size,
+        (pagination.page_number + 1) * pagination.page_size
+    )
+
 def get_active_tasks(
     pagination: TasksPaginationRequest,
     current_user: CurrentUserInfo,
@@ -142,16 +304,12 @@ def get_active_tasks(
     :param db_session: database session
     :return: list of tasks that are scheduled or running
     """
-    tasks = db_session.scalars(
-        select(Task).where(
+    tasks = db_session.scalars(paginate_tasks(
+        query=select(Task).options(*TASK_FULL_WITH_OWNER_LOAD_OPTIONS).where(
             Task.status.in_([TaskStatus.scheduled, TaskStatus.running])
-        ).order_by(
-            asc(Task.start_time)
-        ).slice(
-            pagination.page_number * pagination.page_size,
-            (pagination.page_number + 1) * pagination.page_size
-        )
-    ).all()
+        ),
+        pagination=pagination
+    )).all()
     return [
         generate_task_response_full_with_owner(task=task)
         for task in tasks
@@ -169,16 +327,13 @@ def get_finished_tasks(
     :param db_session: database session
     :return: list of finished tasks
     """
-    tasks = db_session.scalars(
-        select(Task).where(
+    tasks = db_session.scalars(paginate_tasks(
+        query=select(Task).options(*TASK_FULL_WITH_OWNER_LOAD_OPTIONS).where(
             Task.status == TaskStatus.finished
-        ).order_by(
-            desc(Task.start_time)
-        ).slice(
-            pagination.page_number * pagination.page_size,
-            (pagination.page_number + 1) * pagination.page_size
-        )
-    ).all()
+        ),
+        pagination=pagination,
+        descending=True
+    )).all()
     return [
         generate_task_response_full_with_owner(task=task)
         for task in tasks
@@ -196,17 +351,13 @@ def get_active_tasks_for_user(
     if not current_user.is_admin:
         if current_user.user_id != user_id:
             raise insufficientPermissionsException
-    tasks = db_session.scalars(
-        select(Task).where(
+    tasks = db_session.scalars(paginate_tasks(
+        query=select(Task).options(*TASK_FULL_LOAD_OPTIONS).where(
             Task.owner_id == user_id,
             Task.status.in_([TaskStatus.scheduled, TaskStatus.running])
-        ).order_by(
-            asc(Task.start_time)
-        ).slice(
-            pagination.page_number * pagination.page_size,
-            (pagination.page_number + 1) * pagination.page_size
-        )
-    ).all()
+        ),
+        pagination=pagination
+    )).all()
     return [
         generate_task_response_full(task=task)
         for task in tasks
@@ -224,22 +375,145 @@ def get_finished_tasks_for_user(
     if not current_user.is_admin:
         if current_user.user_id != user_id:
             raise insufficientPermissionsException
-    tasks = db_session.scalars(
-        select(Task).where(
+    tasks = db_session.scalars(paginate_tasks(
+        query=select(Task).options(*TASK_FULL_LOAD_OPTIONS).where(
             Task.owner_id == user_id,
             Task.status == TaskStatus.finished
-        ).order_by(
-            desc(Task.start_time)
-        ).slice(
-            pagination.page_number * pagination.page_size,
-            (pagination.page_number + 1) * pagination.page_size
-        )
-    ).all()
+        ),
+        pagination=pagination,
+        descending=True
+    )).all()
     return [
         generate_task_response_full(task=task)
         for task in tasks
     ]
 
+def get_task_export_query(request: TaskExportRequest) -> Select:
+    """
+    Returns query selecting task rows for export joined with owner
+    and resource allocations. Task without allocations has single row
+    with allocation columns set to NULL.
+    :param request (TaskExportRequest): export filters
+    :return (Select): query ordered by task id
+    """
+    query = select(
+        Task.id,
+        Task.name,
+        Task.start_time,
+        Task.end_time,
+        Task.status,
+        User.id.label("owner_id"),
+        User.username.label("owner_username"),
+        ResourceAllocation.node_id,
+        Node.name.label("node_name"),
+        ResourceAllocation.resource_id,
+        Resource.name.label("resource_name"),
+        ResourceAllocation.amount
+    ).join(
+        User, User.id == Task.owner_id
+    ).outerjoin(
+        ResourceAllocation, ResourceAllocation.task_id == Task.id
+    ).outerjoin(
+        Node, Node.id == ResourceAllocation.node_id
+    ).outerjoin(
+        Resource, Resource.id == ResourceAllocation.resource_id
+    )
+
+    if request.start_time is not None:
+        query = query.where(Task.end_time > request.start_time)
+    if request.end_time is not None:
+        query = query.where(Task.start_time < request.end_time)
+    if request.statuses:
+        query = query.where(Task.status.in_(request.statuses))
+
+    return query.order_by(
+        asc(Task.id),
+        asc(ResourceAllocation.node_id),
+        asc(ResourceAllocation.resource_id)
+    )
+
+def generate_task_export_ndjson(rows: Iterator) -> Iterator[str]:
+    """
+    Generates one JSON line per task from export rows ordered by task id.
+    :param rows (Iterator): rows of the task export query
+    :return (Iterator[str]): JSON lines
+    """
+    for _, task_rows in groupby(rows, key=lambda row: row.id):
+        task_rows = list(task_rows)
+        task = task_rows[0]
+        yield json.dumps({
+            "id": task.id,
+            "name": task.name,
+            "start_time": task.start_time.isoformat(),
+            "end_time": task.end_time.isoformat(),
+            "status": task.status.value,
+            "owner": {
+                "id": task.owner_id,
+                "username": task.owner_username
+            },
+            "resources": [
+                {
+                    "node_id": row.node_id,
+                    "node_name": row.node_name,
+                    "resource_id": row.resource_id,
+                    "resource_name": row.resource_name,
+                    "amount": row.amount
+                }
+                for row in task_rows
+                if row.node_id is not None
+            ]
+        }) + "\n"
+
+def generate_task_export_csv(rows: Iterator) -> Iterator[str]:
+    """
+    Generates CSV header and one CSV line per resource allocation.
+    :param rows (Iterator): rows of the task export query
+    :return (Iterator[str]): CSV lines
+    """
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+
+    writer.writerow(TASK_EXPORT_CSV_COLUMNS)
+    for row in rows:
+        writer.writerow((
+            row.id,
+            row.name,
+            row.start_time.isoformat(),
+            row.end_time.isoformat(),
+            row.status.value,
+            row.owner_id,
+            row.owner_username,
+            row.node_id,
+            row.node_name,
+            row.resource_id,
+            row.resource_name,
+            row.amount
+        ))
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+
+def export_tasks(request: TaskExportRequest) -> Iterator[str]:
+    """
+    Streams all tasks matching the request in NDJSON or CSV format.
+    Rows are fetched from server-side cursor in batches, so memory usage
+    does not depend on the number of exported tasks.
+    Export uses its own database session, because request session can be
+    closed before the response is streamed.
+    :param request (TaskExportRequest): export format and filters
+    :return (Iterator[str]): exported lines
+    """
+    with Session(bind=get_db_engine()) as db_session:
+        rows = db_session.execute(
+            get_task_export_query(request=request).execution_options(
+                yield_per=TASK_EXPORT_BATCH_SIZE
+            )
+        )
+        if request.format == TaskExportFormat.csv:
+            yield from generate_task_export_csv(rows=rows)
+        else:
+            yield from generate_task_export_ndjson(rows=rows)
+
 def get_task(
     task_id: int,
     current_user: CurrentUserInfo,
@@ -269,54 +543,6 @@ def get_task(
 
 
 # TASK SCHEDULING
-def modify_required_resources(
-    required_nodes_resources: dict[int, dict[int, int]] | dict[int, dict[int, dict[str, int|list[User]]]],
-    task: Task,
-    add: bool
-) -> None:
-    """
-    Adds/removes required resources for overlaping tasks.
-    Modifies data in place.
-    :param required_nodes_resources (
-        dict[int, dict[int, int]] |
-        dict[int, dict[int, dict[str, int|list[User]]]]):
-        dictionary of required nodes and resources, or usage periods
-    :param task (Task): task to add / remove
-    :param add (bool): whether to add (True) or remove (False)
-    """
-    for ra in task.resource_allocations:
-        if ra.node_id not in required_nodes_resources:
-            continue
-        if ra.resource_id not in required_nodes_resources[ra.node_id]:
-            continue
-        # task scheduling
-        if type(required_nodes_resources[ra.node_id][ra.resource_id]) != dict:
-            if add:
-                required_nodes_resources[ra.node_id][ra.resource_id] += ra.amount
-            else:
-                required_nodes_resources[ra.node_id][ra.resource_id] -= ra.amount
-        # usage periods
-        else:
-            if add:
-                required_nodes_resources[ra.node_id][ra.resource_id]['amount'] += ra.amount
-                required_nodes_resources[ra.node_id][ra.resource_id]['users'].append(task.owner)
-            else:
-                required_nodes_resources[ra.node_id][ra.resource_id]['amount'] -= ra.amount
-                required_nodes_resources[ra.node_id][ra.resource_id]['users'].remove(task.owner)
-
-def check_resource_availability(
-    required_nodes_resources: dict[int, dict[int, int]],
-    node_resources: dict[int, dict[int, int]]
-):
-    """
-    Checks if there is enough resources for the task.
-    """
-    for node_id, resources in required_nodes_resources.items():
-        for resource_id, amount in resources.items():
-            if node_resources[node_id][resource_id] < amount:
-                return False
-    return True
-
 def taskrequest_to_task(
     task: CreateTaskRequest,
     owner_id: int,
@@ -436,12 +662,13 @@ def update_task_scheduling_from_request(
             e.time = task_request.end_time
 
 def check_user_limit(
-    user_limits: dict[int, dict[int, Limit]],
+    user_limits: dict[int, dict[int, LimitResponse]],
     required_nodes_resources: dict[int, dict[int, int]]
 ) -> None:
     """
     Check if user is not restricted from using required resources.
-    :param user_limits (dict[int, dict[int, Limit]]): user limits by resource
+    :param user_limits (dict[int, dict[int, LimitResponse]]): user limits
+        by resource and node
     :param required_nodes_resources (dict[int, dict[int, int]]): required
         resources
     :raises HTTPException: if user is restricted
@@ -462,6 +689,163 @@ def check_user_limit(
                 )
 
 
+def get_limited_nodes_resources(
+    required_nodes_resources: dict[int, dict[int, int]],
+    limit_amounts: dict[int, dict[int, int]]
+) -> dict[int, dict[int, int]]:
+    """
+    Returns required nodes and resources that are restricted by limits.
+    :param required_nodes_resources (dict[int, dict[int, int]]): required
+        nodes and resources
+    :param limit_amounts (dict[int, dict[int, int]]): limit amounts by node
+        and resource
+    :return (dict[int, dict[int, int]]): limited required nodes and resources
+    """
+    limited = {}
+    for node_id, resources in required_nodes_resources.items():
+        for resource_id, amount in resources.items():
+            if resource_id in limit_amounts.get(node_id, {}):
+                if node_id not in limited:
+                    limited[node_id] = {}
+                limited[node_id][resource_id] = amount
+    return limited
+
+def get_limit_usage_checks(
+    user_limits: dict[int, dict[int, LimitResponse]],
+    shared_limits: list[LimitResponse],
+    required_nodes_resources: dict[int, dict[int, int]],
+    start_time: datetime,
+    end_time: datetime,
+    user_id: int,
+    db_session: Session,
+    exclude_task_id: int | None = None
+) -> list[tuple[str, dict[int, dict[int, int]], dict]]:
+    """
+    Returns checks of concurrent usage of tasks against limits. User limits
+    apply to tasks of the user, shared group limits apply to tasks of all
+    members of the group and its subgroups. Usage of the tasks in the time
+    window is loaded into capacity index for each check.
+    :param user_limits (dict[int, dict[int, LimitResponse]]): user limits
+        by resource and node
+    :param shared_limits (list[LimitResponse]): shared limits of user groups
+    :param required_nodes_resources (dict[int, dict[int, int]]): required
+        nodes and resources
+    :param start_time (datetime): start of the time window
+    :param end_time (datetime): end of the time window
+    :param user_id (int): id of the task owner
+    :param db_session (Session): database session
+    :param exclude_task_id (int | None): id of task to skip (task that is
+        being rescheduled)
+    :return (list[tuple[str, dict[int, dict[int, int]], dict]]): name used
+        in error message, limit amounts by node and resource and capacity
+        index of each check
+    """
+    checks = []
+    user_amounts = {}
+    for node_id, resources in required_nodes_resources.items():
+        for resource_id in resources.keys():
+            try:  # check if resource is limited, if not, continue
+                limit = user_limits[resource_id][node_id]
+            except KeyError:
+                continue
+            if node_id not in user_amounts:
+                user_amounts[node_id] = {}
+            user_amounts[node_id][resource_id] = limit.amount
+    if user_amounts:
+        checks.append(("user limits", user_amounts, get_owner_capacity_index(
+            required_nodes_resources=user_amounts,
+            start_time=start_time,
+            end_time=end_time,
+            owner_ids=[user_id],
+            db_session=db_session,
+            exclude_task_id=exclude_task_id
+        )))
+
+    for limit in shared_limits:
+        shared_amounts = {
+            node_id: {limit.resource_id: limit.amount}
+            for node_id in limit.node_ids
+            if limit.resource_id in required_nodes_resources.get(node_id, {})
+        }
+        if not shared_amounts:
+            continue
+        checks.append((
+            f"shared limit {limit.name}",
+            shared_amounts,
+            get_owner_capacity_index(
+                required_nodes_resources=shared_amounts,
+                start_time=start_time,
+                end_time=end_time,
+                owner_ids=get_group_member_ids_select(group_id=limit.group_id),
+                db_session=db_session,
+                exclude_task_id=exclude_task_id
+            )
+        ))
+    return checks
+
+def check_limit_usage(
+    checks: list[tuple[str, dict[int, dict[int, int]], dict]],
+    required_nodes_resources: dict[int, dict[int, int]],
+    start_time: datetime,
+    end_time: datetime
+) -> None:
+    """
+    Check if peak concurrent usage of tasks together with the required
+    resources does not exceed limits.
+    :param checks (list[tuple[str, dict[int, dict[int, int]], dict]]):
+        checks returned by get_limit_usage_checks
+    :param required_nodes_resources (dict[int, dict[int, int]]): required
+        nodes and resources
+    :param start_time (datetime): start of the time window
+    :param end_time (datetime): end of the time window
+    :raises HTTPException: if limit is exceeded
+    """
+    for name, limit_amounts, capacity_index in checks:
+        if not check_capacity(
+            capacity_index=capacity_index,
+            required_nodes_resources=get_limited_nodes_resources(
+                required_nodes_resources=required_nodes_resources,
+                limit_amounts=limit_amounts
+            ),
+            node_resources=limit_amounts,
+            start_time=start_time,
+            end_time=end_time
+        ):
+            raise HTTPException(
+                status_code=409,
+                detail=f"Concurrent usage of tasks exceeds {name}!"
+            )
+
+def add_limit_usage(
+    checks: list[tuple[str, dict[int, dict[int, int]], dict]],
+    required_nodes_resources: dict[int, dict[int, int]],
+    start_time: datetime,
+    end_time: datetime
+) -> None:
+    """
+    Adds usage of accepted task to capacity indexes of the checks.
+    :param checks (list[tuple[str, dict[int, dict[int, int]], dict]]):
+        checks returned by get_limit_usage_checks
+    :param required_nodes_resources (dict[int, dict[int, int]]): required
+        nodes and resources
+    :param start_time (datetime): start of the usage
+    :param end_time (datetime): end of the usage
+    """
+    for _, limit_amounts, capacity_index in checks:
+        for node_id, resources in get_limited_nodes_resources(
+            required_nodes_resources=required_nodes_resources,
+            limit_amounts=limit_amounts
+        ).items():
+            for resource_id, amount in resources.items():
+                add_usage_interval(
+                    capacity_index=capacity_index,
+                    node_id=node_id,
+                    resource_id=resource_id,
+                    start_time=start_time,
+                    end_time=end_time,
+                    amount=amount
+                )
+
 def update_task_resources_from_request(
     task_request: CreateTaskRequest,
     existing_task: Task
@@ -649,7 +1033,7 @@ def schedule_task(
     )
     
     # Check if resource allocation does not exeeds limits
-    user_limits = get_all_user_limits_dict(
+    user_limits = get_effective_user_limits(
         user_id=current_user.user_id,
         session=db_session
     )
@@ -658,65 +1042,81 @@ def schedule_task(
         required_nodes_resources=required_nodes_resources
     )
 
+    # Check if usage of the task does not exceed quotas
+    usage_change = get_usage_change(
+        resources=get_resources_total(
+            nodes_resources=required_nodes_resources
+        ),
+        start_time=task.start_time,
+        end_time=task.end_time
+    )
+    if existing_task:
+        usage_change = merge_usage_changes(
+            usage_change,
+            get_task_usage_change(task=existing_task, remove=True)
+        )
+    check_user_quotas(
+        user_id=current_user.user_id,
+        usage_change=usage_change,
+        db_session=db_session
+    )
+
     # Get provided resource amounts
     get_provided_resources(node_resources=node_resources, db_session=db_session)
     
-    # Find overlapping tasks (excluding current task)
-    overlapping_tasks = db_session.scalars(
-        select(Task).with_for_update().where(
-            Task.status.in_([TaskStatus.scheduled, TaskStatus.running]),
-            Task.start_time < task.end_time,
-            Task.end_time > task.start_time
-        ).where(
-            Task.id != (existing_task.id if existing_task else None)
-        ).order_by(Task.start_time)
-    ).all()
-    overlap_ends = [o for o in overlapping_tasks]
-    overlap_ends.sort(key=lambda o: o.end_time)
+    # Lock required nodes, so no other task can be scheduled on them until
+    # this transaction ends. Nodes of rescheduled task are locked together
+    # with the new ones, so all locks are acquired in sorted order before
+    # the usage is read.
+    node_ids = set(required_nodes_resources.keys())
+    if existing_task:
+        node_ids.update(ra.node_id for ra in existing_task.resource_allocations)
+    lock_nodes(node_ids=list(node_ids), db_session=db_session)
 
     # Check if there are enough resources for the task
-    for t in overlapping_tasks:
-        # if some of the overlapping tasks ends, check if there are enough
-        # resources for all the currently scheduled tasks
-        if len(overlap_ends) and t.start_time >= overlap_ends[0].end_time:
-            if not check_resource_availability(
-                required_nodes_resources=required_nodes_resources,
-                node_resources=node_resources
-            ):
-                raise HTTPException(
-                    status_code=409,
-                    detail="Not enough resources for the task!"
-                )
-        # subtract resources from all the overlapping tasks that ends before
-        # current task starts
-        while len(overlap_ends) and t.start_time >= overlap_ends[0].end_time:
-            modify_required_resources(
-                required_nodes_resources=required_nodes_resources,
-                task=overlap_ends[0],
-                add=False
-            )
-            overlap_ends.pop(0)
-        # add resources from the starting overlapping task to the required
-        # resources
-        modify_required_resources(
-            required_nodes_resources=required_nodes_resources,
-            task=t,
-            add=True
-        )
-    
-    # Check for resource availability at last overlapping time section with
-    # other tasks
-    if not check_resource_availability(
+    capacity_index = get_capacity_index(
+        required_nodes_resources=required_nodes_resources,
+        start_time=task.start_time,
+        end_time=task.end_time,
+        db_session=db_session,
+        exclude_task_id=existing_task.id if existing_task else None
+    )
+    if not check_capacity(
+        capacity_index=capacity_index,
         required_nodes_resources=required_nodes_resources,
-        node_resources=node_resources
+        node_resources=node_resources,
+        start_time=task.start_time,
+        end_time=task.end_time
     ):
         raise HTTPException(
             status_code=409,
             detail="Not enough resources for the task!"
         )
+
+    # Check if concurrent usage of user (and group) tasks does not exceed
+    # limits. Nodes are locked, so the usage can't change until commit.
+    check_limit_usage(
+        checks=get_limit_usage_checks(
+            user_limits=user_limits,
+            shared_limits=get_shared_user_limits(
+                user_id=current_user.user_id,
+                session=db_session
+            ),
+            required_nodes_resources=required_nodes_resources,
+            start_time=task.start_time,
+            end_time=task.end_time,
+            user_id=current_user.user_id,
+            db_session=db_session,
+            exclude_task_id=existing_task.id if existing_task else None
+        ),
+        required_nodes_resources=required_nodes_resources,
+        start_time=task.start_time,
+        end_time=task.end_time
+    )
     
-    # Schedule task
+    # Schedule task. Usage breakpoints are updated under the node locks.
     if existing_task:
+        remove_task_usage(task=existing_task, db_session=db_session)
         update_task_from_request(
             task_request=task,
             existing_task=existing_task
@@ -727,6 +1127,17 @@ def schedule_task(
             owner_id=current_user.user_id,
             db_session=db_session
         )
+    add_usage(
+        nodes_resources=required_nodes_resources,
+        start_time=task.start_time,
+        end_time=task.end_time,
+        db_session=db_session
+    )
+    update_quota_usage(
+        user_id=current_user.user_id,
+        usage_change=usage_change,
+        db_session=db_session
+    )
     try:
         db_session.commit()
     except IntegrityError:
@@ -744,13 +1155,333 @@ def schedule_task(
     )
     db_session.commit()
 
-    # reschedule background job for starting tasks
-    cancel_next_event_processing()
-    schedule_next_event_processing(db_session=db_session)
-
     db_session.refresh(existing_task)
     return generate_task_response_full(task=existing_task)
 
+def validate_batch_task(task: CreateTaskRequest) -> str | None:
+    """
+    Validates task from batch request.
+    :param task (CreateTaskRequest): task to validate
+    :return (str | None): error message or None if task is valid
+    """
+    if task.id:
+        return "Batch request can only create new tasks!"
+    if not task.resource_allocations:
+        return "Task must have at least one resource allocation!"
+    if task.start_time >= task.end_time:
+        return "Task start time must be before its end time!"
+    allocated = set([
+        (ra.node_id, ra.resource_id) for ra in task.resource_allocations
+    ])
+    if len(allocated) != len(task.resource_allocations):
+        return "Task allocates the same node resource multiple times!"
+    return None
+
+def schedule_tasks_batch(
+    tasks: list[CreateTaskRequest],
+    current_user: CurrentUserInfo,
+    db_session: Session
+) -> list[BatchTaskResult]:
+    """
+    Schedules multiple new tasks in single transaction. All tasks are admitted
+    against one snapshot of resource usage (tasks accepted earlier in the
+    batch are added to the snapshot), then tasks, allocations and events
+    are inserted in bulk.
+    :param tasks (list[CreateTaskRequest]): tasks to schedule
+    :param current_user (CurrentUserInfo): currently logged in user information
+    :param db_session (Session): database session
+    :return (list[BatchTaskResult]): result for each task in the request
+    """
+    if not tasks:
+        raise HTTPException(
+            status_code=400,
+            detail="Batch must contain at least one task!"
+        )
+    if len(tasks) > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Batch can contain at most {MAX_BATCH_SIZE} tasks!"
+        )
+
+    results = {}
+    required = {}
+    usage_changes = {}
+    user_limits = get_effective_user_limits(
+        user_id=current_user.user_id,
+        session=db_session
+    )
+    for i, task in enumerate(tasks):
+        detail = validate_batch_task(task=task)
+        if detail:
+            results[i] = BatchTaskResult(
+                index=i,
+                status_code=400,
+                detail=detail
+            )
+            continue
+        required[i], _ = get_node_resources_struct(task=task)
+        try:
+            check_user_limit(
+                user_limits=user_limits,
+                required_nodes_resources=required[i]
+            )
+        except HTTPException as e:
+            results[i] = BatchTaskResult(
+                index=i,
+                status_code=e.status_code,
+                detail=e.detail
+            )
+            del required[i]
+            continue
+        usage_changes[i] = get_usage_change(
+            resources=get_resources_total(nodes_resources=required[i]),
+            start_time=task.start_time,
+            end_time=task.end_time
+        )
+
+    # Quotas are checked against usage of accepted tasks in the batch
+    quotas = get_user_quotas(
+        user_id=current_user.user_id,
+        db_session=db_session
+    ) if required else []
+    quota_usage_entries = get_quota_usage_entries(
+        quotas=quotas,
+        usage_change=merge_usage_changes(*usage_changes.values()),
+        db_session=db_session
+    ) if quotas else {}
+    accepted_usage_change = {}
+
+    # Union of nodes, resources and time windows of all valid tasks
+    all_required_nodes_resources = {}
+    node_resources = {}
+    for task_required in required.values():
+        for node_id, resources in task_required.items():
+            if node_id not in all_required_nodes_resources:
+                all_required_nodes_resources[node_id] = {}
+                node_resources[node_id] = {}
+            for resource_id in resources.keys():
+                all_required_nodes_resources[node_id][resource_id] = 0
+                node_resources[node_id][resource_id] = None
+
+    accepted = []
+    if required:
+        start_time = min([tasks[i].start_time for i in required.keys()])
+        end_time = max([tasks[i].end_time for i in required.keys()])
+        get_provided_resources(
+            node_resources=node_resources,
+            db_session=db_session
+        )
+        lock_nodes(
+            node_ids=list(all_required_nodes_resources.keys()),
+            db_session=db_session
+        )
+        capacity_index = get_capacity_index(
+            required_nodes_resources=all_required_nodes_resources,
+            start_time=start_time,
+            end_time=end_time,
+            db_session=db_session
+        )
+        limit_usage_checks = get_limit_usage_checks(
+            user_limits=user_limits,
+            shared_limits=get_shared_user_limits(
+                user_id=current_user.user_id,
+                session=db_session
+            ),
+            required_nodes_resources=all_required_nodes_resources,
+            start_time=start_time,
+            end_time=end_time,
+            user_id=current_user.user_id,
+            db_session=db_session
+        )
+
+        for i, task_required in required.items():
+            if any([
+                node_resources[node_id][resource_id] is None
+                for node_id, resources in task_required.items()
+                for resource_id in resources.keys()
+            ]):
+                results[i] = BatchTaskResult(
+                    index=i,
+                    status_code=409,
+                    detail="Required resource is not provided by the node!"
+                )
+                continue
+            if not check_capacity(
+                capacity_index=capacity_index,
+                required_nodes_resources=task_required,
+                node_resources=node_resources,
+                start_time=tasks[i].start_time,
+                end_time=tasks[i].end_time
+            ):
+                results[i] = BatchTaskResult(
+                    index=i,
+                    status_code=409,
+                    detail="Not enough resources for the task!"
+                )
+                continue
+            try:
+                check_limit_usage(
+                    checks=limit_usage_checks,
+                    required_nodes_resources=task_required,
+                    start_time=tasks[i].start_time,
+                    end_time=tasks[i].end_time
+                )
+            except HTTPException as e:
+                results[i] = BatchTaskResult(
+                    index=i,
+                    status_code=e.status_code,
+                    detail=e.detail
+                )
+                continue
+            if quotas:
+                task_usage_change = merge_usage_changes(
+                    accepted_usage_change,
+                    usage_changes[i]
+                )
+                try:
+                    check_quotas(
+                        quotas=quotas,
+                        usage_entries=quota_usage_entries,
+                        usage_change=task_usage_change
+                    )
+                except HTTPException as e:
+                    results[i] = BatchTaskResult(
+                        index=i,
+                        status_code=e.status_code,
+                        detail=e.detail
+                    )
+                    continue
+                accepted_usage_change = task_usage_change
+            # accepted task is part of the snapshot for next tasks
+            add_limit_usage(
+                checks=limit_usage_checks,
+                required_nodes_resources=task_required,
+                start_time=tasks[i].start_time,
+                end_time=tasks[i].end_time
+            )
+            for node_id, resources in task_required.items():
+                for resource_id, amount in resources.items():
+                    add_usage_interval(
+                        capacity_index=capacity_index,
+                        node_id=node_id,
+                        resource_id=resource_id,
+                        start_time=tasks[i].start_time,
+                        end_time=tasks[i].end_time,
+                        amount=amount
+                    )
+            accepted.append(i)
+
+    # Accepted tasks are saved together, constraint violation (e.g. node
+    # or resource removed concurrently) rejects the whole batch
+    try:
+        if accepted:
+            task_ids = db_session.scalars(
+                insert(Task).returning(Task.id, sort_by_parameter_order=True),
+                [
+                    {
+                        'name': tasks[i].name,
+                        'description': tasks[i].description,
+                        'start_time': tasks[i].start_time,
+                        'end_time': tasks[i].end_time,
+                        'status': TaskStatus.scheduled,
+                        'owner_id': current_user.user_id
+                    }
+                    for i in accepted
+                ]
+            ).all()
+
+            # notifications are the same for all tasks of the user
+            notifications = {}
+            for group_notifications in get_notifications_by_user_id(
+                user_id=current_user.user_id,
+                current_user=current_user,
+                db_session=db_session
+            ):
+                for notification in group_notifications.notifications:
+                    notifications[notification.id] = notification
+
+            allocations = []
+            events = []
+            for i, task_id in zip(accepted, task_ids):
+                task = tasks[i]
+                for ra in task.resource_allocations:
+                    allocations.append({
+                        'task_id': task_id,
+                        'node_id': ra.node_id,
+                        'resource_id': ra.resource_id,
+                        'amount': ra.amount
+                    })
+                events.append({
+                    'name': f"{task.name} start",
+                    'description': f"Start of {task.name}",
+                    'time': task.start_time,
+                    'type': EventType.task_start,
+                    'task_id': task_id
+                })
+                events.append({
+                    'name': f"{task.name} end",
+                    'description': f"End of {task.name}",
+                    'time': task.end_time,
+                    'type': EventType.task_end,
+                    'task_id': task_id
+                })
+                scheduled_task = Task(
+                    name=task.name,
+                    start_time=task.start_time,
+                    end_time=task.end_time,
+                    status=TaskStatus.scheduled
+                )
+                for notification in notifications.values():
+                    time = get_notification_event_time(
+                        notification=notification,
+                        task=scheduled_task
+                    )
+                    if time is None:
+                        continue
+                    events.append({
+                        'name': f"Task: {task.name}, "
+                                f"notification: {notification.name}",
+                        'description': None,
+                        'time': time,
+                        'type': EventType.other,
+                        'task_id': task_id,
+                        'notification_id': notification.id
+                    })
+                results[i] = BatchTaskResult(
+                    index=i,
+                    status_code=200,
+                    task_id=task_id
+                )
+            db_session.execute(insert(ResourceAllocation), allocations)
+            db_session.execute(insert(Event), events)
+            # single breakpoints update for all accepted tasks, nodes were
+            # locked before admission
+            add_usages(
+                usages=[
+                    (required[i], tasks[i].start_time, tasks[i].end_time)
+                    for i in accepted
+                ],
+                db_session=db_session
+            )
+            update_quota_usage(
+                user_id=current_user.user_id,
+                usage_change=merge_usage_changes(
+                    *[usage_changes[i] for i in accepted]
+                ),
+                db_session=db_session
+            )
+        db_session.commit()
+    except IntegrityError as e:
+        db_session.rollback()
+        raise HTTPException(
+            status_code=409,
+            detail="Failed to save batch tasks in database due to "
+                   "conflict, no task was scheduled:"
+                   f"\n{e.orig.pgerror}"
+        )
+
+    return [results[i] for i in range(len(tasks))]
+
 def remove_task(
     task_id: int,
     current_user: CurrentUserInfo,
@@ -770,6 +1501,18 @@ def remove_task(
             status_code=403,
             detail="Can't remove task owned by another user!"
         )
+    lock_nodes(
+        node_ids=[ra.node_id for ra in task.resource_allocations],
+        db_session=db_session
+    )
+    remove_task_usage(task=task, db_session=db_session)
+    # usage consumed before removal stays in the quota ledger, so removing
+    # finished tasks does not return quota of the time window
+    remove_task_quota_usage(
+        task=task,
+        db_session=db_session,
+        since=datetime.now()
+    )
     db_session.delete(task)
     db_session.commit()
 
@@ -855,112 +1598,6 @@ def remove_tag_from_task(
             detail="Tag is not assigned to the task!"
         )
 
-def get_node_resources_struct_for_multiple_tasks(
-    tasks: list[Task],
-    with_users: bool = True
-) -> dict[int, dict[int, int]] | dict[int, dict[int, dict[str, int|list[User]]]]:
-    """
-    Returns node resources struct for multiple tasks
-    :param tasks (list[Task]): list of tasks
-    :param with_users (bool): whether to include users
-    :return (dict[int, dict[int, int]]): node resources
-    """
-    node_resources = {}
-    for task in tasks:
-        for ra in task.resource_allocations:
-            if ra.node_id not in node_resources:
-                node_resources[ra.node_id] = {}
-            if ra.resource_id not in node_resources[ra.node_id]:
-                if with_users:
-                    node_resources[ra.node_id][ra.resource_id] = {
-                        'amount': 0,
-                        'users': []
-                    }
-                else:
-                    node_resources[ra.node_id][ra.resource_id] = 0
-    return node_resources
-
-def check_same_time_event(
-    time: datetime,
-    tasks: list[Task],
-    ending_tasks: list[Task]
-) -> bool:
-    """
-    Check if the next task start/ends in the same time.
-    :param time (datetime): time to check
-    :param tasks (list[Task]): list of tasks
-    :param ending_tasks (list[Task]): list of ending tasks
-    :return (bool): True if same time, False otherwise
-    """
-    if len(tasks) > 0 and tasks[0].start_time == time:
-        return True
-    if len(ending_tasks) > 0 and ending_tasks[0].end_time == time:
-        return True
-    return False
-
-def check_no_resource_usage(
-    required_nodes_resources: dict[int, dict[int, int]]
-) -> bool:
-    """
-    Checks if there is any resource usage
-    :param required_nodes_resources (dict[int, dict[int, int]]): dictionary of 
-        required nodes and resources
-    :return (bool): True if no resource usage, False otherwise
-    """
-    for node_id, resources in required_nodes_resources.items():
-        for resource_id, amount in resources.items():
-            if amount != 0:
-                return False
-    return True
-
-def get_available_resources(
-    required_nodes_resources: dict[int, dict[int, dict[str, int|list[User]]]],
-    provided_node_resources: dict[int, dict[int, int]]
-) -> list[ResourceAvailability]:
-    """
-    Returns list of available resources
-    :param required_nodes_resources (dict[int, dict[int, dict[str, int|list[User]]]]):
-        dictionary of required nodes and resources and users that uses the resources
-    :param provided_node_resources (dict[int, dict[int, int]]):
-        dictionary of provided nodes and resources
-    :return (list[ResourceAvailability]): list of available resources
-    """
-    available_resources = []
-    for node_id, resources in required_nodes_resources.items():
-        for resource_id, data in resources.items():
-            amount = data['amount']
-            users = data['users']
-            if amount != 0:
-                aa = provided_node_resources[node_id][resource_id] - amount
-                available_resources.append(
-                    ResourceAvailability(
-                        node_id=node_id,
-                        resource_id=resource_id,
-                        amount=aa,
-                        # sorted - allows simple comparison
-                        user_ids=sorted(list(set([user.id for user in users])))
-                    )
-                )
-    return available_resources
-
-def get_period_end_time(
-    tasks: list[Task],
-    ending_tasks: list[Task]
-) -> datetime | None:
-    """
-    Returns period end time
-    :param tasks (list[Task]): list of tasks
-    :param ending_tasks (list[Task]): list of ending tasks
-    :return (datetime | None): period end time
-    """
-    if len(tasks) > 0 and len(ending_tasks) > 0:
-        return min(tasks[0].start_time, ending_tasks[0].end_time)
-    if len(tasks) > 0:
-        return tasks[0].start_time
-    if len(ending_tasks) > 0:
-        return ending_tasks[0].end_time
-    return None
-
 def get_resource_availability_schedule(
     request: ResourceScheduleRequest,
     db_session: Session
@@ -971,114 +1608,195 @@ def get_resource_availability_schedule(
     :param db_session (Session): database session to use
     :return (list[UsagePeriod]): list of usage periods
     """
-    # Query tasks for given time range
-    tasks = db_session.scalars(
-        select(Task).where(
+    # Query allocations of tasks for given time range
+    allocations = db_session.execute(
+        select(
+            Task.owner_id,
+            Task.start_time,
+            Task.end_time,
+            ResourceAllocation.node_id,
+            ResourceAllocation.resource_id,
+            ResourceAllocation.amount
+        ).join(
+            Task, Task.id == ResourceAllocation.task_id
+        ).where(
             Task.status.in_([TaskStatus.scheduled, TaskStatus.running]),
-            Task.start_time <= request.end_time,
-            Task.end_time >= request.start_time
+            Task.during.overlaps(
+                func.tsrange(request.start_time, request.end_time, '[]')
+            )
         ).where(
             # skip task itself to prevent showing its own resources
             # as unavailable (set to None in request to include all tasks)
             Task.id != request.exclude_task_id
-        ).order_by(Task.start_time)
+        ).order_by(Task.start_time, Task.id)
     ).all()
-    ending_tasks = [o for o in tasks]
-    ending_tasks.sort(key=lambda o: o.end_time)
-
-    available_resources_timeline: list[UsagePeriod] = []
-    current_period = None
 
-    # Get required and provided node resources data structure
-    required_nodes_resources = get_node_resources_struct_for_multiple_tasks(
-        tasks=tasks,
-        with_users=True
-    )
-    # Copy structure
-    provided_node_resources = get_node_resources_struct_for_multiple_tasks(
-        tasks=tasks,
-        with_users=False
-    )
     # Get provided node resources amounts
+    provided_node_resources = {}
+    for a in allocations:
+        if a.node_id not in provided_node_resources:
+            provided_node_resources[a.node_id] = {}
+        provided_node_resources[a.node_id][a.resource_id] = None
     get_provided_resources(
         node_resources=provided_node_resources,
         db_session=db_session
     )
-    
-    is_starting_task = False
-
-    # Create availability timeline
-    while len(ending_tasks):
-        # Get ending task data
-        if len(tasks) == 0 \
-        or ending_tasks[0].end_time < tasks[0].start_time:
-            current_task = ending_tasks.pop(0)
-            current_time = current_task.end_time
-            is_starting_task = False
-        
-        # Get starting task data
-        else:
-            current_task = tasks.pop(0)
-            current_time = current_task.start_time
-            is_starting_task = True
-        
-        # Add / remove required resources for current task based on 
-        # whether it is starting or ending
-        modify_required_resources(
-            required_nodes_resources=required_nodes_resources,
-            task=current_task,
-            add=is_starting_task
+
+    return get_availability_periods(
+        allocations=allocations,
+        provided_node_resources=provided_node_resources
+    )
+
+def find_task_slots(
+    request: FindSlotRequest,
+    current_user: CurrentUserInfo,
+    db_session: Session
+) -> list[TaskSlot]:
+    """
+    Finds earliest time slots where task with required resources fits.
+    Usage of required node resources in the whole search window is loaded
+    from usage breakpoints and evaluated in single sweep together with
+    concurrent usage limits of the user. Slots exceeding quotas are skipped.
+    :param request (FindSlotRequest): required resources, duration and
+        search window
+    :param current_user (CurrentUserInfo): currently logged in user information
+    :param db_session (Session): database session
+    :return (list[TaskSlot]): free slots ordered by start time
+    """
+    if not request.resource_allocations:
+        raise HTTPException(
+            status_code=400,
+            detail="Task must have at least one resource allocation!"
+        )
+    if request.duration_seconds <= 0:
+        raise HTTPException(
+            status_code=400,
+            detail="Task duration must be positive!"
+        )
+    if request.search_start_time >= request.search_end_time:
+        raise HTTPException(
+            status_code=400,
+            detail="Search start time must be before search end time!"
+        )
+    if request.max_results < 1 \
+    or request.max_results > MAX_FIND_SLOT_RESULTS:
+        raise HTTPException(
+            status_code=400,
+            detail="Number of results must be between 1 and "
+                   f"{MAX_FIND_SLOT_RESULTS}!"
         )
 
-        # Check if next task starts/ends at the same time and continue
-        # with next iteration if it does        
-        if check_same_time_event(
-            time=current_time,
-            tasks=tasks,
-            ending_tasks=ending_tasks
-        ):
-            continue
-        
-        available_resources = get_available_resources(
+    required_nodes_resources, node_resources = get_node_resources_struct(
+        task=request
+    )
+
+    # Slots exceeding user limits are never usable
+    user_limits = get_effective_user_limits(
+        user_id=current_user.user_id,
+        session=db_session
+    )
+    check_user_limit(
+        user_limits=user_limits,
+        required_nodes_resources=required_nodes_resources
+    )
+
+    get_provided_resources(node_resources=node_resources, db_session=db_session)
+
+    capacity_index = get_capacity_index(
+        required_nodes_resources=required_nodes_resources,
+        start_time=request.search_start_time,
+        end_time=request.search_end_time,
+        db_session=db_session,
+        exclude_task_id=request.exclude_task_id
+    )
+
+    # Concurrent usage of user (and group) tasks must stay within limits
+    limit_constraints = [
+        (
+            limit_capacity_index,
+            get_limited_nodes_resources(
+                required_nodes_resources=required_nodes_resources,
+                limit_amounts=limit_amounts
+            ),
+            limit_amounts
+        )
+        for _, limit_amounts, limit_capacity_index in get_limit_usage_checks(
+            user_limits=user_limits,
+            shared_limits=get_shared_user_limits(
+                user_id=current_user.user_id,
+                session=db_session
+            ),
             required_nodes_resources=required_nodes_resources,
-            provided_node_resources=provided_node_resources
+            start_time=request.search_start_time,
+            end_time=request.search_end_time,
+            user_id=current_user.user_id,
+            db_session=db_session,
+            exclude_task_id=request.exclude_task_id
         )
-        # Check no resource usage (no resources are reported when none are used)
-        if not available_resources:
-            continue
+    ]
 
-        # Get period end time
-        period_end_time = get_period_end_time(
-            tasks=tasks,
-            ending_tasks=ending_tasks
+    # Usage of the slot must not exceed quotas (usage of the rescheduled
+    # task is released). Ledger entries of the whole search window are
+    # loaded once, quota owners are not locked as nothing is scheduled.
+    duration = timedelta(seconds=request.duration_seconds)
+    resources = get_resources_total(nodes_resources=required_nodes_resources)
+    quotas = get_user_quotas(
+        user_id=current_user.user_id,
+        db_session=db_session,
+        lock=False
+    )
+    slot_filter = None
+    if quotas:
+        released_usage_change = {}
+        if request.exclude_task_id:
+            excluded_task = db_session.get(Task, request.exclude_task_id)
+            if excluded_task \
+            and excluded_task.owner_id == current_user.user_id:
+                released_usage_change = get_task_usage_change(
+                    task=excluded_task,
+                    remove=True
+                )
+        quota_usage_entries = get_quota_usage_entries(
+            quotas=quotas,
+            usage_change=get_usage_change(
+                resources=resources,
+                start_time=request.search_start_time,
+                end_time=request.search_end_time
+            ),
+            db_session=db_session
         )
-        # No period end time == this is the last period
-        # data were processed in previous iteration
-        if not period_end_time:
-            continue
 
-        # Create resource snapshot for given time period
-        current_period = UsagePeriod(
-            start_time=current_time,
-            end_time=period_end_time,
-            available_resources=available_resources
-        )
-        available_resources_timeline.append(current_period)
-    
-    # merge consecutive periods with same available resources
-    i = 0
-    while i < len(available_resources_timeline):
-        if i+1 >= len(available_resources_timeline):
-            break
-
-        curent = available_resources_timeline[i]
-        next = available_resources_timeline[i+1]
-
-        if curent.available_resources == next.available_resources \
-        and curent.end_time == next.start_time:
-            curent.end_time = next.end_time
-            available_resources_timeline.pop(i+1)
-        else:
-            i += 1
-    
-    return available_resources_timeline
+        def check_slot_quotas(start_time: datetime) -> bool:
+            try:
+                check_quotas(
+                    quotas=quotas,
+                    usage_entries=quota_usage_entries,
+                    usage_change=merge_usage_changes(
+                        released_usage_change,
+                        get_usage_change(
+                            resources=resources,
+                            start_time=start_time,
+                            end_time=start_time + duration
+                        )
+                    )
+                )
+            except HTTPException:
+                return False
+            return True
+        slot_filter = check_slot_quotas
+
+    start_times = find_free_slots(
+        capacity_index=capacity_index,
+        required_nodes_resources=required_nodes_resources,
+        node_resources=node_resources,
+        search_start_time=request.search_start_time,
+        search_end_time=request.search_end_time,
+        duration=duration,
+        max_results=request.max_results,
+        constraints=limit_constraints,
+        slot_filter=slot_filter
+    )
+    return [
+        TaskSlot(start_time=start_time, end_time=start_time + duration)
+        for start_time in start_times
+    ]
@@ -1,4 +1,4 @@
-from src.db.models import User, Group
+from src.db.models import User, Group, Task
 from src.app_logic.authentication import get_password_hash
 from sqlmodel import select, Session
 from sqlalchemy.exc import IntegrityError
@@ -10,6 +10,9 @@ from src.app_logic.grafana_user_operations import (
     grafana_create_or_update_user,
     grafana_remove_user
 )
+from src.app_logic.capacity_index import remove_tasks_usage
+from src.app_logic.quota_operations import remove_user_quota_usage
+from datetime import datetime
 
 
 def create_user(
@@ -132,5 +135,15 @@ def delete_user(user_id: int, db_session: Session) -> None:
             detail=f"User with id {user_id} not found!"
         )
     grafana_remove_user(user=db_user)
+    remove_tasks_usage(
+        task_ids=select(Task.id).where(Task.owner_id == user_id),
+        db_session=db_session
+    )
+    # usage consumed before deletion stays in the group quota ledger
+    remove_user_quota_usage(
+        user_id=user_id,
+        db_session=db_session,
+        since=datetime.now()
+    )
     db_session.delete(db_user)
     db_session.commit()
@@ -27,17 +27,29 @@ class Settings(BaseSettings):
         120
     )
     # task scheduling
-    # Interval in which scheduler will query tasks in advance. Larger interval
-    # will result in less accurate scheduling but will result in less load on
-    # scheduler.
-    task_scheduler_precision_seconds: int = os.environ.get(
-        'TASK_SCHEDULER_PRECISION_SECONDS',
-        60
+    # Time window for which upcoming events are loaded to scheduler timers.
+    task_scheduler_horizon_seconds: int = os.environ.get(
+        'TASK_SCHEDULER_HORIZON_SECONDS',
+        3600
     )
     task_scheduler_retry_limit_seconds: int = os.environ.get(
         'TASK_SCHEDULER_RETRY_LIMIT_SECONDS',
         120
     )
+    # Event processing. 'leader' runs event processor in API processes, only
+    # one of them (elected using database lock) processes events. 'external'
+    # does not run event processor in API processes, it must be started
+    # separately using run_event_processor.py.
+    event_processor_mode: str = os.environ.get(
+        'EVENT_PROCESSOR_MODE',
+        'leader'
+    )
+    # Resolution of group hierarchy. 'cte' resolves ancestors and descendants
+    # with recursive queries, 'closure' uses precomputed group closure table.
+    group_hierarchy_mode: str = os.environ.get(
+        'GROUP_HIERARCHY_MODE',
+        'cte'
+    )
     # email config required for sending notificatoins
     # about starting and ending events
     smtp_host: str = os.environ.get('SMTP_HOST', 'localhost')
@@ -48,6 +60,17 @@ class Settings(BaseSettings):
     smtp_from_address: str | None = os.environ.get('SMTP_FROM_ADDRESS', smtp_user)
     smtp_from_name: str = os.environ.get('SMTP_FROM_NAME', 'REMAS')
     smtp_starttls_enabled: bool = os.environ.get('SMTP_STARTTLS_ENABLED', False)
+    smtp_timeout_seconds: int = os.environ.get('SMTP_TIMEOUT_SECONDS', 30)
+    # Notification email outbox. Emails are sent by mail workers, failed
+    # emails are retried with exponentially growing delay.
+    mail_workers: int = os.environ.get('MAIL_WORKERS', 2)
+    mail_batch_size: int = os.environ.get('MAIL_BATCH_SIZE', 50)
+    mail_max_attempts: int = os.environ.get('MAIL_MAX_ATTEMPTS', 5)
+    mail_retry_delay_seconds: int = os.environ.get(
+        'MAIL_RETRY_DELAY_SECONDS',
+        60
+    )
+    mail_poll_seconds: int = os.environ.get('MAIL_POLL_SECONDS', 30)
     # grafana config
     grafana_url: str = os.environ.get(
         'GRAFANA_URL',
@@ -55,6 +78,27 @@ class Settings(BaseSettings):
     )
     grafana_username: str = os.environ.get('GRAFANA_USERNAME', 'admin')
     grafana_password: str = os.environ.get('GRAFANA_PASSWORD', 'admin')
+    # Grafana service account token, used instead of username and password
+    # (except for server admin API), created by init_grafana.py --create-token
+    grafana_token: str | None = os.environ.get('GRAFANA_TOKEN', '')
+    # Grafana API client connection pool
+    grafana_http2: bool = os.environ.get('GRAFANA_HTTP2', True)
+    grafana_max_connections: int = os.environ.get(
+        'GRAFANA_MAX_CONNECTIONS',
+        20
+    )
+    grafana_max_keepalive_connections: int = os.environ.get(
+        'GRAFANA_MAX_KEEPALIVE_CONNECTIONS',
+        10
+    )
+    grafana_keepalive_seconds: float = os.environ.get(
+        'GRAFANA_KEEPALIVE_SECONDS',
+        30
+    )
+    grafana_timeout_seconds: float = os.environ.get(
+        'GRAFANA_TIMEOUT_SECONDS',
+        10
+    )
     # required to show correct redirect for frontend
     # if app is running in container, it uses diferent url - ussually docker
     # dns record that does not work outside container
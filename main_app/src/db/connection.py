@@ -1,11 +1,42 @@
 from sqlmodel import SQLModel, create_engine, Session
-from sqlalchemy import Engine
+from sqlalchemy import Engine, text
 from src.config import get_settings
 
 
 # Global object to store database engine
 DB_ENGINE: Engine = None
 
+# Channel used for notifications about new or changed events
+EVENT_NOTIFY_CHANNEL = "remas_event"
+
+# Triggers sending the earliest time of inserted or updated events
+# to EVENT_NOTIFY_CHANNEL, once per statement. Notifications are delivered
+# to listeners when the transaction commits.
+# All statements can be safely executed repeatedly.
+EVENT_NOTIFY_TRIGGERS = [
+    f"""
+    CREATE OR REPLACE FUNCTION notify_event_time() RETURNS trigger AS $$
+    DECLARE
+        next_time timestamp;
+    BEGIN
+        SELECT min(time) INTO next_time FROM new_events;
+        IF next_time IS NOT NULL THEN
+            PERFORM pg_notify('{EVENT_NOTIFY_CHANNEL}', next_time::text);
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS event_insert_notify ON event",
+    "CREATE TRIGGER event_insert_notify AFTER INSERT ON event"
+    " REFERENCING NEW TABLE AS new_events"
+    " FOR EACH STATEMENT EXECUTE FUNCTION notify_event_time()",
+    "DROP TRIGGER IF EXISTS event_update_notify ON event",
+    "CREATE TRIGGER event_update_notify AFTER UPDATE ON event"
+    " REFERENCING NEW TABLE AS new_events"
+    " FOR EACH STATEMENT EXECUTE FUNCTION notify_event_time()"
+]
+
 def init_db_engine() -> None:
     """
     Initializes database engine and sessionmaker.
@@ -37,6 +68,16 @@ def init_db_model(engine: Engine) -> None:
     :param engine: database engine to use
     """
     SQLModel.metadata.create_all(engine)
+    init_db_triggers(engine)
+
+def init_db_triggers(engine: Engine) -> None:
+    """
+    Creates (or replaces) database triggers.
+    :param engine: database engine to use
+    """
+    with engine.begin() as connection:
+        for statement in EVENT_NOTIFY_TRIGGERS:
+            connection.execute(text(statement))
 
 def drop_db_model(engine: Engine) -> None:
     """
@@ -1,10 +1,12 @@
-from typing import Optional
+from typing import Optional, Any
 from sqlmodel import (
     Field,
     SQLModel,
     Relationship
 )
 from sqlalchemy.types import BigInteger
+from sqlalchemy import Column, Computed, Index
+from sqlalchemy.dialects.postgresql import TSRANGE
 import enum
 from datetime import datetime
 
@@ -96,6 +98,27 @@ class Group(SQLModel, table=True):
         link_model=GroupHasNotification
     )
 
+class GroupClosure(SQLModel, table=True):
+    """
+    Closure table of the group hierarchy. Contains row for every group and
+    each of its ancestors (including the group itself with depth 0).
+    """
+    ancestor_id: int = Field(
+        default=None,
+        foreign_key="group.id",
+        primary_key=True,
+        ondelete="CASCADE"
+    )
+    descendant_id: int = Field(
+        default=None,
+        foreign_key="group.id",
+        primary_key=True,
+        ondelete="CASCADE",
+        index=True
+    )
+    # distance between ancestor and descendant
+    depth: int
+
 class NodeIsLimitedBy(SQLModel, table=True):
     """
     Connection table for limit and node.
@@ -251,6 +274,27 @@ class ResourceAllocation(SQLModel, table=True):
     node: Node = Relationship(back_populates="resource_allocations")
     resource: Resource = Relationship(back_populates="resource_allocations")
 
+class NodeResourceUsage(SQLModel, table=True):
+    """
+    NodeResourceUsage is a breakpoint of the resource usage step function.
+    Tells how much of a resource on a node is used by scheduled and running
+    tasks from the time until the next breakpoint.
+    """
+    node_id: int = Field(
+        default=None,
+        foreign_key="node.id",
+        primary_key=True,
+        ondelete="CASCADE"
+    )
+    resource_id: int = Field(
+        default=None,
+        foreign_key="resource.id",
+        primary_key=True,
+        ondelete="CASCADE"
+    )
+    time: datetime = Field(primary_key=True)
+    amount: int = Field(sa_type=BigInteger)
+
 class TaskHasTag(SQLModel, table=True):
     task_id: int = Field(
         default=None,
@@ -274,11 +318,34 @@ class Task(SQLModel, table=True):
     """
     Task is a job that user executes on a node.
     """
+    __table_args__ = (
+        Index("ix_task_during", "during", postgresql_using="gist"),
+        # keyset pagination of task listings
+        Index("ix_task_status_start_time_id", "status", "start_time", "id"),
+        # concurrent usage of tasks of the user
+        Index(
+            "ix_task_owner_id_status_start_time",
+            "owner_id",
+            "status",
+            "start_time"
+        ),
+    )
+
     id: int = Field(default=None, primary_key=True)
     name: str = Field(index=True, nullable=False)
     description: str | None = None
     start_time: datetime = Field(index=True)
     end_time: datetime = Field(index=True)
+    # [start_time, end_time) range computed by the database,
+    # used for overlap queries (&& operator) with GiST index
+    during: Any = Field(
+        default=None,
+        sa_column=Column(
+            TSRANGE,
+            Computed("tsrange(start_time, end_time, '[)')", persisted=True)
+        ),
+        exclude=True
+    )
 
     status: TaskStatus = Field(default=TaskStatus.scheduled, index=True)
 
@@ -403,6 +470,10 @@ class Limit(SQLModel, table=True):
     name: str
     description: str | None = None
     amount: int = Field(sa_type=BigInteger)
+    # Shared limit of a group applies to concurrent usage of all members
+    # of the group and its subgroups together and is not inherited
+    # by the members as their own limit.
+    shared: bool = False
 
     # Either user or group must be set
     user_id: int | None = Field(
@@ -429,6 +500,109 @@ class Limit(SQLModel, table=True):
         link_model=NodeIsLimitedBy
     )
 
+class QuotaPeriod(enum.Enum):
+    day = "day"
+    week = "week"  # weeks start on Monday
+    month = "month"
+
+class Quota(SQLModel, table=True):
+    """
+    Quota limits total usage of a resource on all nodes in each time window
+    (period). Usage is measured in resource hours (amount * duration).
+    User quota applies to tasks of the user, group quota applies to tasks
+    of all members of the group and its subgroups together.
+    """
+    id: int = Field(default=None, primary_key=True)
+    name: str
+    description: str | None = None
+    # Maximal usage in resource hours
+    amount: int = Field(sa_type=BigInteger)
+    period: QuotaPeriod
+
+    # Either user or group must be set
+    user_id: int | None = Field(
+        default=None,
+        foreign_key="user.id",
+        ondelete="CASCADE",
+        index=True
+    )
+    group_id: int | None = Field(
+        default=None,
+        foreign_key="group.id",
+        ondelete="CASCADE",
+        index=True
+    )
+    resource_id: int = Field(
+        default=None,
+        foreign_key="resource.id",
+        ondelete="CASCADE"
+    )
+
+class QuotaScope(enum.Enum):
+    user = "user"
+    group = "group"
+
+class QuotaUsage(SQLModel, table=True):
+    """
+    QuotaUsage is a ledger entry with total usage of a resource by tasks
+    of a user (or of members of a group and its subgroups) in a time window
+    of the period starting at bucket_start. Usage is measured in resource
+    seconds (amount * duration).
+    """
+    scope: QuotaScope = Field(primary_key=True)
+    # user id or group id, depending on the scope
+    entity_id: int = Field(primary_key=True)
+    resource_id: int = Field(
+        default=None,
+        foreign_key="resource.id",
+        primary_key=True,
+        ondelete="CASCADE"
+    )
+    period: QuotaPeriod = Field(primary_key=True)
+    bucket_start: datetime = Field(primary_key=True)
+    usage: int = Field(sa_type=BigInteger)
+
+class EmailStatus(enum.Enum):
+    pending = "pending"
+    sent = "sent"
+    failed = "failed"
+
+class EmailOutbox(SQLModel, table=True):
+    """
+    EmailOutbox is a rendered notification email waiting for delivery.
+    Emails are written in the same transaction as the processed events
+    and sent by mail workers.
+    """
+    __table_args__ = (
+        # pending emails ordered by time of the next attempt
+        Index(
+            "ix_email_outbox_status_next_attempt_time",
+            "status",
+            "next_attempt_time"
+        ),
+    )
+
+    id: int = Field(default=None, primary_key=True)
+    receiver: str
+    subject: str
+    text: str
+    status: EmailStatus = Field(default=EmailStatus.pending)
+    # number of failed delivery attempts
+    attempts: int = Field(default=0)
+    next_attempt_time: datetime = Field(default_factory=datetime.now)
+    created_time: datetime = Field(default_factory=datetime.now)
+    sent_time: datetime | None = None
+    last_error: str | None = None
+
+class CacheGeneration(SQLModel, table=True):
+    """
+    CacheGeneration is a counter of changes of data cached by application
+    processes. It is incremented in the same transaction as the change,
+    so every process can detect that its cache is stale.
+    """
+    name: str = Field(primary_key=True)
+    generation: int = Field(default=0, sa_type=BigInteger)
+
 class ResourcePanelTemplate(SQLModel, table=True):
     """
     Template for Grafana panels for given resource.
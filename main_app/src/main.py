@@ -2,6 +2,10 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 from src.db.connection import init_db_engine
+from src.app_logic.grafana_general_operations import (
+    init_grafana_client,
+    close_grafana_client
+)
 #from src.app_logic.authentication import init_auth
 from src.app_logic.scheduled_event_processing import (
     init_scheduler,
@@ -16,10 +20,12 @@ from src.routes import (
     task_route,
     task_tag_route,
     limit_route,
+    quota_route,
     notification_route,
     authentication_route
 )
 from src.config import get_settings
+from src.app_logic.task_operations import NEXT_CURSOR_HEADER
 import logging
 
 if get_settings().debug:
@@ -30,13 +36,18 @@ if get_settings().debug:
 async def lifespan(app: FastAPI):
     # Startup tasks
     init_db_engine()
+    init_grafana_client()
     #init_auth()
-    init_scheduler()
+    run_event_processor = get_settings().event_processor_mode != 'external'
+    if run_event_processor:
+        init_scheduler()
 
     yield
     
     # Cleanup tasks
-    shutdown_scheduler()
+    if run_event_processor:
+        shutdown_scheduler()
+    close_grafana_client()
 
 
 app = FastAPI(lifespan=lifespan)
@@ -46,7 +57,8 @@ app.add_middleware(
     allow_origins=get_settings().cors_origins,
     allow_credentials=True,
     allow_methods=["*"],
-    allow_headers=["*"]
+    allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER]
 )
 
 @app.get("/")
@@ -74,5 +86,6 @@ app.include_router(resource_alias_route)
 app.include_router(task_route)
 app.include_router(task_tag_route)
 app.include_router(limit_route)
+app.include_router(quota_route)
 app.include_router(notification_route)
 app.include_router(authentication_route)
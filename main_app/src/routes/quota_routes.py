@@ -0,0 +1,116 @@
+from fastapi import APIRouter
+from src.app_logic.quota_operations import (
+    get_all_quotas,
+    get_quotas_by_user,
+    get_quotas_by_group,
+    get_quota,
+    get_quota_usage,
+    add_quota,
+    update_quota,
+    remove_quota
+)
+from src.db.models import Quota
+from src.schemas.quota_entities import QuotaRequest, QuotaUsageResponse
+from src.app_logic.authentication import ensure_admin_permissions
+from . import SessionDep, LoginDep
+
+quota_route = APIRouter(
+    prefix="/quota"
+)
+
+
+@quota_route.get("/user/{user_id}", response_model=list[Quota])
+def get_user_quotas(
+    user_id: int,
+    current_user: LoginDep,
+    session: SessionDep
+) -> list[Quota]:
+    """
+    Returns quotas by user id
+    """
+    ensure_admin_permissions(current_user=current_user)
+    return get_quotas_by_user(user_id=user_id, db_session=session)
+
+@quota_route.get("/group/{group_id}", response_model=list[Quota])
+def get_group_quotas(
+    group_id: int,
+    current_user: LoginDep,
+    session: SessionDep
+) -> list[Quota]:
+    """
+    Returns quotas by group id
+    """
+    ensure_admin_permissions(current_user=current_user)
+    return get_quotas_by_group(group_id=group_id, db_session=session)
+
+@quota_route.get("/{quota_id}/usage", response_model=QuotaUsageResponse)
+def quota_get_usage(
+    quota_id: int,
+    current_user: LoginDep,
+    session: SessionDep
+) -> QuotaUsageResponse:
+    """
+    Returns usage of quota in current time window
+    """
+    ensure_admin_permissions(current_user=current_user)
+    return get_quota_usage(quota_id=quota_id, db_session=session)
+
+@quota_route.get("/{quota_id}", response_model=Quota)
+def quota_get(
+    quota_id: int,
+    current_user: LoginDep,
+    session: SessionDep
+) -> Quota:
+    """
+    Returns quota by id
+    """
+    ensure_admin_permissions(current_user=current_user)
+    return get_quota(quota_id=quota_id, db_session=session)
+
+@quota_route.get("", response_model=list[Quota])
+def quota_get_all(
+    current_user: LoginDep,
+    session: SessionDep
+) -> list[Quota]:
+    """
+    Returns all quotas
+    """
+    ensure_admin_permissions(current_user=current_user)
+    return get_all_quotas(db_session=session)
+
+@quota_route.post("", response_model=Quota)
+def quota_create(
+    quota: QuotaRequest,
+    current_user: LoginDep,
+    session: SessionDep
+) -> Quota:
+    """
+    Creates new quota
+    """
+    ensure_admin_permissions(current_user=current_user)
+    return add_quota(quota=quota, db_session=session)
+
+@quota_route.put("", response_model=Quota)
+def quota_update(
+    quota: QuotaRequest,
+    current_user: LoginDep,
+    session: SessionDep
+) -> Quota:
+    """
+    Updates quota
+    """
+    ensure_admin_permissions(current_user=current_user)
+    return update_quota(quota=quota, db_session=session)
+
+@quota_route.delete("/{quota_id}")
+def quota_delete(
+    quota_id: int,
+    current_user: LoginDep,
+    session: SessionDep
+) -> None:
+    """
+    Deletes quota
+    """
+    ensure_admin_permissions(current_user=current_user)
+    remove_quota(quota_id=quota_id, db_session=session)
+    return {'detail': 'Quota deleted'}
@@ -1,4 +1,5 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Response
+from fastapi.responses import StreamingResponse
 from src.app_logic.task_operations import (
     get_all_tasks,
     get_task,
@@ -11,7 +12,12 @@ from src.app_logic.task_operations import (
     get_active_tasks,
     get_finished_tasks,
     get_active_tasks_for_user,
-    get_finished_tasks_for_user
+    get_finished_tasks_for_user,
+    find_task_slots,
+    schedule_tasks_batch,
+    get_next_task_cursor,
+    export_tasks,
+    NEXT_CURSOR_HEADER
 )
 from src.db.models import Task, TaskHasTag
 from src.schemas.task_entities import (
@@ -21,7 +27,12 @@ from src.schemas.task_entities import (
     UsagePeriod,
     ResourceScheduleRequest,
     TaskResponseFullWithOwner,
-    TasksPaginationRequest
+    TasksPaginationRequest,
+    FindSlotRequest,
+    TaskSlot,
+    BatchTaskResult,
+    TaskExportRequest,
+    TaskExportFormat
 )
 from src.app_logic.authentication import ensure_admin_permissions
 from . import SessionDep, LoginDep
@@ -42,6 +53,24 @@ def get_tasks(
     ensure_admin_permissions(current_user=current_user)
     return get_all_tasks(db_session=session)
 
+@task_route.post("/export", response_class=StreamingResponse)
+def tasks_export(
+    request: TaskExportRequest,
+    current_user: LoginDep
+) -> StreamingResponse:
+    """
+    Streams task history in NDJSON or CSV format.
+    """
+    ensure_admin_permissions(current_user=current_user)
+    if request.format == TaskExportFormat.csv:
+        media_type = "text/csv"
+    else:
+        media_type = "application/x-ndjson"
+    return StreamingResponse(
+        export_tasks(request=request),
+        media_type=media_type
+    )
+
 @task_route.get("/user/{user_id}", response_model=list[TaskResponseSimple])
 def tasks_get_by_user(
     user_id: int,
@@ -61,23 +90,29 @@ def tasks_get_by_user(
 def tasks_get_active_by_user(
     user_id: int,
     pagination: TasksPaginationRequest,
+    response: Response,
     current_user: LoginDep,
     session: SessionDep
 ) -> list[TaskResponseFull]:
     """
     Returns active tasks owned by user.
     """
-    return get_active_tasks_for_user(
+    tasks = get_active_tasks_for_user(
         user_id=user_id,
         pagination=pagination,
         current_user=current_user,
         db_session=session
     )
+    next_cursor = get_next_task_cursor(tasks=tasks, pagination=pagination)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return tasks
 
 @task_route.post("/user/{user_id}/finished", response_model=list[TaskResponseFull])
 def tasks_get_finished_by_user(
     user_id: int,
     pagination: TasksPaginationRequest,
+    response: Response,
     current_user: LoginDep,
     session: SessionDep
 ) -> list[TaskResponseFull]:
@@ -85,42 +120,56 @@ def tasks_get_finished_by_user(
     Returns finished tasks owned by user.
     """
     print('user_id', user_id)
-    return get_finished_tasks_for_user(
+    tasks = get_finished_tasks_for_user(
         user_id=user_id,
         pagination=pagination,
         current_user=current_user,
         db_session=session
     )
+    next_cursor = get_next_task_cursor(tasks=tasks, pagination=pagination)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return tasks
 
 @task_route.post("/finished", response_model=list[TaskResponseFullWithOwner])
 def tasks_get_finished(
     pagination: TasksPaginationRequest,
+    response: Response,
     current_user: LoginDep,
     session: SessionDep
 ) -> list[TaskResponseFull]:
     """
     Returns finished tasks owned by user.
     """
-    return get_finished_tasks(
+    tasks = get_finished_tasks(
         pagination=pagination,
         current_user=current_user,
         db_session=session
     )
+    next_cursor = get_next_task_cursor(tasks=tasks, pagination=pagination)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return tasks
 
 @task_route.post("/active", response_model=list[TaskResponseFullWithOwner])
 def tasks_get_active(
     pagination: TasksPaginationRequest,
+    response: Response,
     current_user: LoginDep,
     session: SessionDep
 ) -> list[TaskResponseFull]:
     """
     Returns active tasks owned by user.
     """
-    return get_active_tasks(
+    tasks = get_active_tasks(
         pagination=pagination,
         current_user=current_user,
         db_session=session
     )
+    next_cursor = get_next_task_cursor(tasks=tasks, pagination=pagination)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return tasks
 
 @task_route.get("/{task_id}", response_model=TaskResponseFull)
 def task_get(
@@ -152,6 +201,22 @@ def task_create(
         db_session=session
     )
 
+@task_route.post("/batch", response_model=list[BatchTaskResult])
+def task_batch_create(
+    tasks: list[CreateTaskRequest],
+    current_user: LoginDep,
+    session: SessionDep
+) -> list[BatchTaskResult]:
+    """
+    Creates multiple new tasks in single transaction.
+    Returns result for each task.
+    """
+    return schedule_tasks_batch(
+        tasks=tasks,
+        current_user=current_user,
+        db_session=session
+    )
+
 @task_route.post("/get_scheduling", response_model=list[UsagePeriod])
 def get_scheduling(
     request: ResourceScheduleRequest,
@@ -166,6 +231,22 @@ def get_scheduling(
         db_session=session
     )
 
+@task_route.post("/find_slot", response_model=list[TaskSlot])
+def find_slot(
+    request: FindSlotRequest,
+    current_user: LoginDep,
+    session: SessionDep
+) -> list[TaskSlot]:
+    """
+    Returns earliest time slots where task with given resources fits
+    (node capacity, concurrent usage limits and quotas of the user).
+    """
+    return find_task_slots(
+        request=request,
+        current_user=current_user,
+        db_session=session
+    )
+
 @task_route.delete("/{task_id}", status_code=200, response_model=dict)
 def task_delete(
     task_id: int,
@@ -11,6 +11,7 @@ class LimitResponse(BaseModel):
     group_id: int | None
     resource_id: int
     node_ids: list[int]
+    shared: bool
     #user: UserNoPasswordSimple | None
     #group: Group | None
     #resource: Resource
@@ -25,3 +26,4 @@ class LimitRequest(BaseModel):
     group_id: int | None = None
     resource_id: int
     node_ids: list[int]
+    shared: bool = False
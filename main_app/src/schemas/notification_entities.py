@@ -11,3 +11,8 @@ class GroupNotifications(BaseModel):
     group_id: int | None
     group_name: str | None
     notifications: list[Notification]
+
+class NotificationEmail(BaseModel):
+    receiver: str
+    subject: str
+    text: str
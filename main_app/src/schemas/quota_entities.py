@@ -0,0 +1,19 @@
+from pydantic import BaseModel
+from src.db.models import QuotaPeriod
+from datetime import datetime
+
+class QuotaRequest(BaseModel):
+    id: int | None = None
+    name: str
+    description: str | None = None
+    amount: int  # resource hours
+    period: QuotaPeriod
+    user_id: int | None = None
+    group_id: int | None = None
+    resource_id: int
+
+class QuotaUsageResponse(BaseModel):
+    quota_id: int
+    bucket_start: datetime
+    used_hours: float
+    amount: int
@@ -5,9 +5,11 @@ from src.db.models import (
     Node,
     Resource,
     Event,
-    User
+    User,
+    TaskStatus
 )
 from datetime import datetime
+import enum
 from pydantic import BaseModel
 from src.schemas.user_entities import UserNoPasswordSimple
 
@@ -49,11 +51,29 @@ class CreateTaskRequest(BaseModel):
     start_time: datetime
     end_time: datetime
 
+class BatchTaskResult(BaseModel):
+    index: int  # position of the task in the request
+    status_code: int
+    task_id: int | None = None
+    detail: str | None = None
+
 class ResourceScheduleRequest(BaseModel):
     start_time: datetime
     end_time: datetime
     exclude_task_id: int | None = None
 
+class FindSlotRequest(BaseModel):
+    resource_allocations: list[ResourceAllocationRequest]
+    duration_seconds: int
+    search_start_time: datetime
+    search_end_time: datetime
+    max_results: int = 1
+    exclude_task_id: int | None = None
+
+class TaskSlot(BaseModel):
+    start_time: datetime
+    end_time: datetime
+
 class ResourceAvailability(ResourceAllocationRequest):
     user_ids: list[int]  # info about users using the resource
 
@@ -63,5 +83,19 @@ class UsagePeriod(BaseModel):
     available_resources: list[ResourceAvailability]
 
 class TasksPaginationRequest(BaseModel):
-    page_number: int
+    page_number: int = 0
     page_size: int
+    # cursor from X-Next-Cursor header of the previous page,
+    # page_number is ignored if cursor is set
+    cursor: str | None = None
+
+class TaskExportFormat(enum.Enum):
+    ndjson = "ndjson"  # one JSON object per task
+    csv = "csv"  # one row per resource allocation
+
+class TaskExportRequest(BaseModel):
+    format: TaskExportFormat = TaskExportFormat.ndjson
+    # only tasks overlapping [start_time, end_time) are exported
+    start_time: datetime | None = None
+    end_time: datetime | None = None
+    statuses: list[TaskStatus] | None = None
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+import httpx
+from src.config import get_settings
+from src.app_logic.grafana_general_operations import GrafanaAuth
+
+# Checks that Grafana requests are authenticated with service account token,
+# except server admin API (admin and user management endpoints), which
+# accepts basic auth only.
+# Does not connect to Grafana, only the authorization header is checked.
+# Run from main_app directory:
+#   python -m tests.grafana_auth_test
+
+TOKEN_PATHS = [
+    '/api/folders',
+    '/api/teams/search',
+    '/api/user',
+    '/api/serviceaccounts/search',
+    '/api/v1/provisioning/alert-rules'
+]
+
+BASIC_AUTH_PATHS = [
+    '/api/admin/users',
+    '/api/admin/users/1/password',
+    '/api/users/lookup',
+    '/api/users/1',
+    '/api/users'
+]
+
+def get_authorization(auth: GrafanaAuth, url: str) -> str:
+    request = httpx.Request('GET', url)
+    return next(auth.auth_flow(request)).headers['Authorization']
+
+def check_paths(base_url: str) -> int:
+    get_settings().grafana_url = base_url
+    auth = GrafanaAuth(token='token', username='admin', password='admin')
+    errors = 0
+    for path in TOKEN_PATHS + BASIC_AUTH_PATHS:
+        url = base_url.rstrip('/') + path
+        authorization = get_authorization(auth=auth, url=url)
+        expected = 'Bearer' if path in TOKEN_PATHS else 'Basic'
+        if not authorization.startswith(expected):
+            print(f'{url}: expected {expected} auth, got {authorization}')
+            errors += 1
+    return errors
+
+def main():
+    errors = 0
+    errors += check_paths(base_url='http://localhost:3000')
+    errors += check_paths(base_url='http://localhost/grafana/')
+
+    # without token, basic auth is used for all requests
+    auth = GrafanaAuth(token=None, username='admin', password='admin')
+    if not get_authorization(
+        auth=auth,
+        url='http://localhost:3000/api/folders'
+    ).startswith('Basic'):
+        print('Basic auth is not used without token')
+        errors += 1
+
+    if errors:
+        print('FAILED')
+        exit(1)
+    print('OK')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+import argparse
+from datetime import datetime
+from time import perf_counter
+from sqlmodel import Session, select
+from src.db.connection import init_db_engine, get_db_engine
+from src.db.models import (
+    Group,
+    User,
+    Limit,
+    Node,
+    Resource
+)
+from src.config import get_settings
+from src.app_logic.group_hierarchy import (
+    add_group_closure,
+    move_group_children,
+    check_group_closure,
+    ADMIN_GROUP_ID
+)
+from src.app_logic.auxiliary_operations import (
+    is_admin,
+    get_members_including_subgroups
+)
+from src.app_logic.limit_operations import (
+    get_all_user_limits_dict,
+    get_limit_dict,
+    merge_limit_dicts
+)
+
+# Compares group hierarchy resolution using Python walk over lazy-loaded
+# relationships, recursive CTE queries and group closure table.
+# Test groups are created as a chain under the admin group in a transaction
+# that is rolled back at the end. Finally a group from the middle of the chain
+# is deleted (its subgroups are moved to its parent) and the group closure
+# table is checked against the group hierarchy.
+# Run from main_app directory:
+#   python -m tests.group_hierarchy_benchmark
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '--depth',
+        help='Number of nested test groups',
+        type=int,
+        default=10
+    )
+    parser.add_argument(
+        '--users',
+        help='Number of test users in each group',
+        type=int,
+        default=5
+    )
+    parser.add_argument(
+        '--repeat',
+        help='Number of repetitions of each operation',
+        type=int,
+        default=100
+    )
+    return parser.parse_args()
+
+def create_test_data(
+    session: Session,
+    depth: int,
+    user_count: int
+) -> list[Group]:
+    """
+    Creates chain of nested groups with users and limits.
+    """
+    suffix = datetime.now().strftime('%Y%m%d%H%M%S')
+    node = Node(name=f'hierarchy_test_node_{suffix}')
+    resource = Resource(name=f'hierarchy_test_resource_{suffix}')
+    session.add_all([node, resource])
+
+    groups = []
+    parent_id = ADMIN_GROUP_ID
+    for i in range(depth):
+        group = Group(name=f'hierarchy_test_group_{suffix}_{i}')
+        group.parent_id = parent_id
+        session.add(group)
+        session.flush()
+        add_group_closure(
+            group_id=group.id,
+            parent_id=parent_id,
+            db_session=session
+        )
+        session.add(Limit(
+            name=f'hierarchy_test_limit_{suffix}_{i}',
+            amount=depth - i,
+            group_id=group.id,
+            resource=resource,
+            nodes=[node]
+        ))
+        for j in range(user_count):
+            session.add(User(
+                email=f'hierarchy_test_{suffix}_{i}_{j}@localhost',
+                username=f'hierarchy_test_{suffix}_{i}_{j}',
+                password='x',
+                uid=200000 + i * user_count + j,
+                group_id=group.id
+            ))
+        groups.append(group)
+        parent_id = group.id
+    session.flush()
+    return groups
+
+def walk_is_admin(user: User) -> bool:
+    """
+    Admin check walking group parents.
+    """
+    group = user.group
+    while group:
+        if group.id == ADMIN_GROUP_ID:
+            return True
+        group = group.parent
+    return False
+
+def walk_members(group: Group) -> list[User]:
+    """
+    Members of group and subgroups walking group children.
+    """
+    members = list(group.members)
+    groups = list(group.children)
+    while groups:
+        group = groups.pop()
+        members += group.members
+        groups += group.children
+    return members
+
+def walk_user_limits(user: User) -> dict:
+    """
+    Effective user limits walking group parents.
+    """
+    groups = []
+    group = user.group
+    while group:
+        groups.append(group)
+        group = group.parent
+    limits = {}
+    for group in reversed(groups):
+        limits = merge_limit_dicts(
+            parent_limits=limits,
+            child_limits=get_limit_dict(entity_limits=group.limits)
+        )
+    return merge_limit_dicts(
+        parent_limits=limits,
+        child_limits=get_limit_dict(entity_limits=user.limits)
+    )
+
+def get_limit_ids(limits: dict) -> dict:
+    """
+    Returns limit ids by resource and node for result comparison.
+    """
+    return {
+        resource_id: {node_id: limit.id for node_id, limit in nodes.items()}
+        for resource_id, nodes in limits.items()
+    }
+
+def measure(session: Session, repeat: int, function) -> (float, object):
+    """
+    Returns average duration of the function in milliseconds and its result.
+    Session is expired before each call, so data are loaded from database.
+    """
+    duration = 0
+    for _ in range(repeat):
+        session.expire_all()
+        start = perf_counter()
+        result = function()
+        duration += perf_counter() - start
+    return duration / repeat * 1000, result
+
+def main():
+    args = parse_args()
+    init_db_engine()
+    settings = get_settings()
+    original_mode = settings.group_hierarchy_mode
+    connection = get_db_engine().connect()
+    transaction = connection.begin()
+    session = Session(bind=connection)
+    errors = 0
+    try:
+        groups = create_test_data(
+            session=session,
+            depth=args.depth,
+            user_count=args.users
+        )
+        top_group_id = groups[0].id
+        user_id = session.scalars(
+            select(User.id).where(User.group_id == groups[-1].id)
+        ).first()
+
+        cases = {
+            'is_admin': (
+                lambda: walk_is_admin(user=session.get(User, user_id)),
+                lambda: is_admin(user=session.get(User, user_id)),
+                lambda result: result
+            ),
+            'members_including_subgroups': (
+                lambda: walk_members(group=session.get(Group, top_group_id)),
+                lambda: get_members_including_subgroups(
+                    group=session.get(Group, top_group_id)
+                ),
+                lambda result: sorted(user.id for user in result)
+            ),
+            'user_limits': (
+                lambda: walk_user_limits(user=session.get(User, user_id)),
+                lambda: get_all_user_limits_dict(
+                    user_id=user_id,
+                    session=session
+                ),
+                get_limit_ids
+            )
+        }
+        for name, (walk, query, normalize) in cases.items():
+            walk_ms, expected = measure(
+                session=session,
+                repeat=args.repeat,
+                function=walk
+            )
+            print(f'{name}: walk {walk_ms:.3f} ms', end='')
+            for mode in ['cte', 'closure']:
+                settings.group_hierarchy_mode = mode
+                mode_ms, result = measure(
+                    session=session,
+                    repeat=args.repeat,
+                    function=query
+                )
+                print(f', {mode} {mode_ms:.3f} ms', end='')
+                if normalize(result) != normalize(expected):
+                    print(f'\n{name} returned different result in {mode} mode!')
+                    errors += 1
+            print()
+
+        # delete group as delete_group does (without Grafana updates)
+        deleted = groups[len(groups) // 2]
+        if deleted.parent_id:
+            for user in deleted.members:
+                user.group_id = deleted.parent_id
+            move_group_children(
+                group_id=deleted.id,
+                parent_id=deleted.parent_id,
+                db_session=session
+            )
+            session.flush()
+            session.expire(deleted)
+            session.delete(deleted)
+            session.flush()
+            differences = check_group_closure(db_session=session)
+            for difference in differences:
+                print(difference)
+            print(f'group_closure after delete: {len(differences)} differences')
+            if differences:
+                errors += 1
+    finally:
+        settings.group_hierarchy_mode = original_mode
+        session.close()
+        transaction.rollback()
+        connection.close()
+
+    if errors:
+        print('FAILED')
+        exit(1)
+    print('OK')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+import argparse
+import smtplib
+import redmail
+from aiosmtpd.controller import Controller
+from aiosmtpd.smtp import AuthResult
+from src.config import get_settings
+from src.schemas.notification_entities import NotificationEmail
+from src.app_logic.mail_dispatcher import MailDispatcher
+
+# Checks that batch of notification emails is sent over a single SMTP
+# connection and that the dispatcher reconnects when the connection breaks.
+# Uses local SMTP server (aiosmtpd), which is restarted in the middle
+# of the second batch. Then checks that the dispatcher reports connection
+# failure (so the outbox batch is postponed) after single connection attempt
+# when the server is stopped and when it rejects the credentials.
+# Requires aiosmtpd (pip install aiosmtpd).
+# Run from main_app directory:
+#   python -m tests.mail_dispatch_test
+
+class CountingHandler:
+    """
+    SMTP server handler counting sessions and received messages.
+    """
+    def __init__(self):
+        self.sessions = 0
+        self.messages = []
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        self.sessions += 1
+        session.host_name = hostname
+        return responses
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append(envelope.rcpt_tos)
+        return '250 Message accepted for delivery'
+
+def reject_authentication(server, session, envelope, mechanism, auth_data):
+    """
+    SMTP server authenticator rejecting all credentials.
+    """
+    return AuthResult(success=False)
+
+def count_connects(sender: redmail.EmailSender) -> list[int]:
+    """
+    Counts connection attempts of the sender.
+    :return (list[int]): single item list with number of attempts
+    """
+    connect = sender.connect
+    connects = [0]
+
+    def counting_connect():
+        connects[0] += 1
+        return connect()
+
+    sender.connect = counting_connect
+    return connects
+
+def check_connection_failure(name: str, sender: redmail.EmailSender) -> int:
+    """
+    Checks that email is not sent and connection failure is reported
+    after single connection attempt.
+    :return (int): number of errors
+    """
+    connects = count_connects(sender=sender)
+    with MailDispatcher(sender=sender) as dispatcher:
+        sent = dispatcher.send(email=get_emails(1)[0])
+        connection_failed = dispatcher.connection_failed
+    print(
+        f'{name}: sent {sent}, connection failed {connection_failed}, '
+        f'{connects[0]} connection attempts'
+    )
+    if sent or not connection_failed or connects[0] != 1:
+        return 1
+    return 0
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '--emails',
+        help='Number of emails in the batch',
+        type=int,
+        default=100
+    )
+    parser.add_argument(
+        '--port',
+        help='Port of the local SMTP server',
+        type=int,
+        default=8025
+    )
+    return parser.parse_args()
+
+def get_emails(count: int) -> list[NotificationEmail]:
+    return [
+        NotificationEmail(
+            receiver=f'mail_test_{i}@localhost',
+            subject='Mail dispatch test',
+            text=f'Test email {i}'
+        )
+        for i in range(count)
+    ]
+
+def main():
+    args = parse_args()
+    get_settings().smtp_from_address = 'remas@localhost'
+    handler = CountingHandler()
+    controller = Controller(handler, hostname='localhost', port=args.port)
+    controller.start()
+    sender = redmail.EmailSender(
+        host='localhost',
+        port=args.port,
+        username=None,
+        password=None,
+        use_starttls=False,
+        cls_smtp=smtplib.SMTP
+    )
+    errors = 0
+    try:
+        # whole batch over single connection
+        sent = 0
+        with MailDispatcher(sender=sender) as dispatcher:
+            for email in get_emails(args.emails):
+                sent += dispatcher.send(email=email)
+        print(
+            f'Batch: sent {sent} of {args.emails} emails, '
+            f'received {len(handler.messages)} in {handler.sessions} sessions'
+        )
+        if sent != args.emails or len(handler.messages) != args.emails \
+        or handler.sessions != 1:
+            errors += 1
+
+        # server restart in the middle of the batch
+        handler.sessions = 0
+        handler.messages = []
+        emails = get_emails(args.emails)
+        half = args.emails // 2
+        sent = 0
+        with MailDispatcher(sender=sender) as dispatcher:
+            for email in emails[:half]:
+                sent += dispatcher.send(email=email)
+            controller.stop()
+            controller = Controller(
+                handler,
+                hostname='localhost',
+                port=args.port
+            )
+            controller.start()
+            for email in emails[half:]:
+                sent += dispatcher.send(email=email)
+        print(
+            f'Reconnect: sent {sent} of {args.emails} emails, '
+            f'received {len(handler.messages)} in {handler.sessions} sessions'
+        )
+        if sent != args.emails or len(handler.messages) != args.emails \
+        or handler.sessions != 2:
+            errors += 1
+    finally:
+        controller.stop()
+
+    # unavailable server
+    errors += check_connection_failure(name='Unavailable server', sender=sender)
+
+    # wrong credentials
+    controller = Controller(
+        handler,
+        hostname='localhost',
+        port=args.port,
+        authenticator=reject_authentication,
+        auth_require_tls=False
+    )
+    controller.start()
+    sender = redmail.EmailSender(
+        host='localhost',
+        port=args.port,
+        username='remas',
+        password='wrong',
+        use_starttls=False,
+        cls_smtp=smtplib.SMTP
+    )
+    try:
+        errors += check_connection_failure(
+            name='Wrong credentials',
+            sender=sender
+        )
+    finally:
+        controller.stop()
+
+    if errors:
+        print('FAILED')
+        exit(1)
+    print('OK')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+import httpx
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+# Concurrency stress test for task scheduling.
+# Sends many parallel task creation requests and checks that resources on
+# the node are never oversubscribed and that tasks on different nodes
+# do not block each other.
+
+API_URL = 'http://localhost:8000'
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '--requests',
+        help='Number of parallel requests per node',
+        type=int,
+        default=50
+    )
+    parser.add_argument(
+        '--capacity',
+        help='Amount of resource provided by each test node',
+        type=int,
+        default=10
+    )
+    parser.add_argument(
+        '--nodes',
+        help='Number of test nodes',
+        type=int,
+        default=4
+    )
+    return parser.parse_args()
+
+def login(username: str, password: str):
+    """
+    Login to REMAS.
+    """
+    response = httpx.post(
+        url=f'{API_URL}/authentication/token',
+        data={'username': username, 'password': password}
+    )
+    return response.json()['access_token']
+
+def create_test_node(token: str, name: str, resource_id: int, amount: int) -> dict:
+    """
+    Creates node providing given amount of resource.
+    """
+    node = httpx.post(
+        url=f'{API_URL}/node',
+        headers={'Authorization': f'Bearer {token}'},
+        json={'name': name, 'description': 'Scheduling stress test node'}
+    )
+    node.raise_for_status()
+    node = node.json()
+    httpx.post(
+        url=f'{API_URL}/node/add_resource',
+        headers={'Authorization': f'Bearer {token}'},
+        json={
+            'node_id': node['id'],
+            'resource_id': resource_id,
+            'amount': amount
+        }
+    ).raise_for_status()
+    return node
+
+def schedule(
+    token: str,
+    name: str,
+    node_id: int,
+    resource_id: int,
+    start_time: datetime,
+    end_time: datetime
+) -> int:
+    """
+    Schedules task using 1 unit of resource and returns response status code.
+    """
+    response = httpx.post(
+        url=f'{API_URL}/task',
+        headers={'Authorization': f'Bearer {token}'},
+        json={
+            'id': None,
+            'name': name,
+            'description': None,
+            'tag_ids': [],
+            'resource_allocations': [{
+                'node_id': node_id,
+                'resource_id': resource_id,
+                'amount': 1
+            }],
+            'start_time': start_time.isoformat(),
+            'end_time': end_time.isoformat()
+        },
+        timeout=60
+    )
+    return response.status_code
+
+def main():
+    args = parse_args()
+    token = login('administrator', 'admin')
+    suffix = datetime.now().strftime('%Y%m%d%H%M%S')
+
+    resource = httpx.post(
+        url=f'{API_URL}/resource',
+        headers={'Authorization': f'Bearer {token}'},
+        json={
+            'name': f'stress_test_resource_{suffix}',
+            'description': 'Scheduling stress test resource'
+        }
+    )
+    resource.raise_for_status()
+    resource = resource.json()
+
+    nodes = [
+        create_test_node(
+            token=token,
+            name=f'stress_test_node_{suffix}_{i}',
+            resource_id=resource['id'],
+            amount=args.capacity
+        )
+        for i in range(args.nodes)
+    ]
+
+    # overlapping time windows, so every task competes with the others
+    start = datetime.now().replace(microsecond=0) + timedelta(days=30)
+    jobs = []
+    for node in nodes:
+        for i in range(args.requests):
+            jobs.append((
+                node['id'],
+                start + timedelta(minutes=i % 5),
+                start + timedelta(hours=1, minutes=i % 7)
+            ))
+
+    print(f'Sending {len(jobs)} parallel requests.')
+    began = datetime.now()
+    with ThreadPoolExecutor(max_workers=len(jobs)) as executor:
+        results = list(executor.map(
+            lambda job: (job[0], schedule(
+                token=token,
+                name=f'stress_test_task_{suffix}',
+                node_id=job[0],
+                resource_id=resource['id'],
+                start_time=job[1],
+                end_time=job[2]
+            )),
+            jobs
+        ))
+    print(f'Finished in {datetime.now() - began}.')
+
+    errors = 0
+    for node in nodes:
+        codes = [code for node_id, code in results if node_id == node['id']]
+        accepted = codes.count(200)
+        rejected = codes.count(409)
+        print(
+            f'Node {node["name"]}: accepted {accepted}, rejected {rejected}, '
+            f'other {len(codes) - accepted - rejected}'
+        )
+        if accepted != min(args.capacity, args.requests) \
+        or accepted + rejected != len(codes):
+            errors += 1
+
+    # check that resources are not oversubscribed at any time
+    schedule_response = httpx.post(
+        url=f'{API_URL}/task/get_scheduling',
+        headers={'Authorization': f'Bearer {token}'},
+        json={
+            'start_time': start.isoformat(),
+            'end_time': (start + timedelta(hours=2)).isoformat()
+        }
+    )
+    schedule_response.raise_for_status()
+    node_ids = [node['id'] for node in nodes]
+    for period in schedule_response.json():
+        for availability in period['available_resources']:
+            if availability['node_id'] in node_ids \
+            and availability['amount'] < 0:
+                print(
+                    f'Node {availability["node_id"]} is oversubscribed '
+                    f'between {period["start_time"]} and {period["end_time"]}!'
+                )
+                errors += 1
+
+    if errors:
+        print('FAILED')
+        exit(1)
+    print('OK')
+
+
+if __name__ == '__main__':
+    main()
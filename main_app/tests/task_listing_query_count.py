@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+import argparse
+from datetime import datetime, timedelta
+from sqlalchemy import event
+from sqlmodel import Session
+from src.db.connection import init_db_engine, get_db_engine
+from src.db.models import (
+    Node,
+    Resource,
+    NodeProvidesResource,
+    ResourceAllocation,
+    Task,
+    TaskTag,
+    TaskStatus,
+    User
+)
+from src.schemas.authentication_entities import CurrentUserInfo
+from src.schemas.task_entities import TasksPaginationRequest
+from src.app_logic.task_operations import (
+    get_all_tasks,
+    get_user_tasks,
+    get_active_tasks,
+    get_finished_tasks,
+    get_active_tasks_for_user,
+    get_finished_tasks_for_user
+)
+
+# Checks that task listing functions load tasks with related objects using
+# fixed number of queries, independent of the number of listed tasks.
+# Test data are created in a transaction that is rolled back at the end.
+# Run from main_app directory:
+#   python -m tests.task_listing_query_count
+
+MAX_QUERIES = 4
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '--tasks',
+        help='Number of test tasks of each status',
+        type=int,
+        default=100
+    )
+    return parser.parse_args()
+
+def create_test_data(session: Session, task_count: int) -> list[User]:
+    """
+    Creates users, nodes, resources, tags and tasks for the test.
+    """
+    suffix = datetime.now().strftime('%Y%m%d%H%M%S')
+    users = [
+        User(
+            name='Query',
+            surname='Test',
+            email=f'query_test_{suffix}_{i}@localhost',
+            username=f'query_test_{suffix}_{i}',
+            password='x',
+            uid=100000 + i
+        )
+        for i in range(3)
+    ]
+    nodes = [Node(name=f'query_test_node_{suffix}_{i}') for i in range(3)]
+    resources = [
+        Resource(name=f'query_test_resource_{suffix}_{i}') for i in range(2)
+    ]
+    session.add_all(users + nodes + resources)
+    session.flush()
+    for node in nodes:
+        for resource in resources:
+            session.add(NodeProvidesResource(
+                node_id=node.id,
+                resource_id=resource.id,
+                amount=1000000
+            ))
+    tags = [
+        TaskTag(name=f'query_test_tag_{suffix}_{i}', user_id=users[0].id)
+        for i in range(3)
+    ]
+    session.add_all(tags)
+
+    start = datetime.now().replace(microsecond=0) + timedelta(days=365)
+    for status in [TaskStatus.scheduled, TaskStatus.finished]:
+        for i in range(task_count):
+            session.add(Task(
+                name=f'query_test_task_{suffix}_{i}',
+                start_time=start + timedelta(hours=i),
+                end_time=start + timedelta(hours=i + 1),
+                status=status,
+                owner_id=users[i % len(users)].id,
+                tags=tags[:i % (len(tags) + 1)],
+                resource_allocations=[
+                    ResourceAllocation(
+                        node_id=node.id,
+                        resource_id=resources[i % len(resources)].id,
+                        amount=1
+                    )
+                    for node in nodes[:i % len(nodes) + 1]
+                ]
+            ))
+    session.flush()
+    # listings must load related objects from the database
+    session.expunge_all()
+    return users
+
+def count_queries(session: Session, function, **kwargs) -> (int, int):
+    """
+    Calls function and returns number of executed queries
+    and number of returned items.
+    """
+    queries = []
+    def before_cursor_execute(conn, cursor, statement, *args):
+        queries.append(statement)
+    connection = session.connection()
+    event.listen(connection, 'before_cursor_execute', before_cursor_execute)
+    try:
+        result = function(db_session=session, **kwargs)
+    finally:
+        event.remove(
+            connection,
+            'before_cursor_execute',
+            before_cursor_execute
+        )
+    session.expunge_all()
+    return len(queries), len(result)
+
+def main():
+    args = parse_args()
+    init_db_engine()
+    connection = get_db_engine().connect()
+    transaction = connection.begin()
+    session = Session(bind=connection)
+    errors = 0
+    try:
+        users = create_test_data(session=session, task_count=args.tasks)
+        admin = CurrentUserInfo(
+            user_id=users[0].id,
+            username=users[0].username,
+            is_admin=True
+        )
+        pagination = TasksPaginationRequest(
+            page_number=0,
+            page_size=args.tasks
+        )
+        cases = [
+            ('get_all_tasks', get_all_tasks, {}),
+            ('get_user_tasks', get_user_tasks, {
+                'user_id': users[0].id,
+                'current_user': admin
+            }),
+            ('get_active_tasks', get_active_tasks, {
+                'pagination': pagination,
+                'current_user': admin
+            }),
+            ('get_finished_tasks', get_finished_tasks, {
+                'pagination': pagination,
+                'current_user': admin
+            }),
+            ('get_active_tasks_for_user', get_active_tasks_for_user, {
+                'user_id': users[0].id,
+                'pagination': pagination,
+                'current_user': admin
+            }),
+            ('get_finished_tasks_for_user', get_finished_tasks_for_user, {
+                'user_id': users[0].id,
+                'pagination': pagination,
+                'current_user': admin
+            })
+        ]
+        for name, function, kwargs in cases:
+            queries, items = count_queries(
+                session=session,
+                function=function,
+                **kwargs
+            )
+            print(f'{name}: {items} tasks, {queries} queries')
+            if queries > MAX_QUERIES:
+                print(f'{name} executed more than {MAX_QUERIES} queries!')
+                errors += 1
+    finally:
+        session.close()
+        transaction.rollback()
+        connection.close()
+
+    if errors:
+        print('FAILED')
+        exit(1)
+    print('OK')
+
+
+if __name__ == '__main__':
+    main()